@@ -1,6 +1,7 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Request, request, jsonify, send_from_directory, g, Response, stream_with_context
 from flask_cors import CORS
 import os
+import time
 from werkzeug.utils import secure_filename
 import json
 from dotenv import load_dotenv
@@ -10,9 +11,18 @@ load_dotenv()
 
 # 导入自定义模块
 from modules.document_processor import process_document
-from modules.bid_analyzer import analyze_bid
+from modules.bid_analyzer import analyze_amendment, analyze_bid
+from modules.amendment import SECTION_INDEX_VERSION
 from modules.solution_generator import generate_solution
-from modules.supplier_finder import find_suppliers
+from modules.supplier_finder import find_suppliers, requirements_from_key_requirements
+from modules.job_queue import JobQueue, QueueFullError
+from modules.llm_client import clean_credential, get_llm_client
+from modules.extraction_cache import compute_file_hash
+from modules.storage import get_storage
+from modules.near_duplicate import find_similar_document, get_near_duplicate_index
+from modules.batch_processor import resolve_server_path, run_batch
+from modules.upload_storage import UploadStore
+from modules import instrumentation
 
 app = Flask(__name__, static_folder='frontend', static_url_path='')
 CORS(app)
@@ -22,8 +32,8 @@ with open('config.json', 'r', encoding='utf-8') as f:
     config = json.load(f)
 
 # 环境变量配置
-WENXIN_API_KEY = os.getenv('WENXIN_API_KEY')
-WENXIN_SECRET_KEY = os.getenv('WENXIN_SECRET_KEY')
+WENXIN_API_KEY = clean_credential(os.getenv('WENXIN_API_KEY'))
+WENXIN_SECRET_KEY = clean_credential(os.getenv('WENXIN_SECRET_KEY'))
 DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
 PORT = int(os.getenv('PORT', 5000))
 HOST = os.getenv('HOST', '0.0.0.0')
@@ -38,6 +48,58 @@ if not os.path.exists(UPLOAD_FOLDER):
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB 最大上传限制
 
+# 上传文件按内容哈希存储，相同内容只保存一份
+upload_store = UploadStore(UPLOAD_FOLDER)
+
+class UploadRequest(Request):
+    """上传文件直接写入上传存储的临时文件并同时计算哈希，保存时改名即可，无需再次复制"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        stream = upload_store.create_temp()
+        g.setdefault('upload_streams', []).append(stream)
+        return stream
+
+app.request_class = UploadRequest
+
+# 业务数据存储（文档、解析结果、方案、供应商结果）
+storage = get_storage()
+
+# 异步任务队列
+jobs_config = config.get('jobs', {})
+job_queue = JobQueue(
+    max_workers=jobs_config.get('max_workers', 4),
+    max_pending=jobs_config.get('max_pending', 100),
+    result_dir=jobs_config.get('result_path', 'data/jobs'),
+    retention_days=jobs_config.get('retention_days', 7)
+)
+
+class RequestError(Exception):
+    """请求参数错误"""
+    
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.teardown_request
+def discard_upload_streams(exc):
+    # 请求中未保存的上传文件（格式不支持、出错等）删除临时文件
+    for stream in g.pop('upload_streams', []):
+        upload_store.discard(stream)
+
+@app.after_request
+def record_request_duration(response):
+    # 只统计API请求，按路由规则汇总（避免任务ID等路径参数产生大量序列）
+    started = g.pop('request_started', None)
+    if started is not None and request.path.startswith('/api/') and request.url_rule is not None:
+        instrumentation.observe_request(request.url_rule.rule, response.status_code,
+                                        time.perf_counter() - started)
+    return response
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -52,73 +114,341 @@ def upload_file():
         return jsonify({'error': '没有选择文件'}), 400
     
     if file and allowed_file(file.filename):
-        # 保存原始文件名用于显示
+        # 原始文件名只作为上传记录的元数据，文件按内容哈希保存一份
         original_filename = file.filename
+        blob = upload_store.save(file.stream, original_filename)
+        upload_id = storage.save_upload(blob['file_hash'], original_filename, blob['file_path'], blob['size'])
+        file_path = blob['file_path']
         
-        # 使用时间戳生成安全的存储文件名，同时保留扩展名
-        import time
-        timestamp = str(int(time.time() * 1000))
-        file_ext = os.path.splitext(original_filename)[1]
-        safe_filename = f"{timestamp}{file_ext}"
-        
-        # 保存文件到两个位置：
-        # 1. 使用时间戳文件名保存（用于后端处理）
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], safe_filename)
-        file.save(file_path)
-        
-        # 2. 同时保存原始文件名的副本（用于保留原始文件）
-        original_file_path = os.path.join(app.config['UPLOAD_FOLDER'], original_filename)
-        import shutil
-        shutil.copy2(file_path, original_file_path)
+        # 处理上传的文档（哈希已在写入时计算）
+        result = process_document(file_path, file_hash=blob['file_hash'])
         
-        # 处理上传的文档
-        result = process_document(file_path)
+        # 入库后续接口可直接使用 document_id
+        document_id = None
+        similar_document = None
+        if result.get('success'):
+            document_id = storage.save_document(
+                result['file_hash'], original_filename, result['file_type'],
+                file_path, result['text_content']
+            )
+            # 近似重复的历史标书：可直接复用其解析结果和技术方案，或作为原版增量解析
+            near_duplicate_index = get_near_duplicate_index(storage.path)
+            if near_duplicate_index is not None:
+                similar_document = find_similar_document(
+                    storage, near_duplicate_index, document_id, result['text_content']
+                )
         
         return jsonify({
             'message': '文件上传成功',
             'filename': original_filename,  # 返回原始文件名用于显示
             'file_path': file_path,
-            'original_file_path': original_file_path,  # 返回原始文件路径
+            'upload_id': upload_id,
+            'deduplicated': blob['deduplicated'],
+            'document_id': document_id,
+            'similar_document': similar_document,
             'processing_result': result
         })
     
     return jsonify({'error': '不支持的文件类型'}), 400
 
-@app.route('/api/analyze', methods=['POST'])
-def analyze_document():
-    """标书解析接口"""
-    data = request.json
-    file_path = data.get('file_path')
+def _parse_id(value, name):
+    """校验ID参数"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RequestError(f'无效的{name}')
+
+def resolve_analysis_request(data):
+    """
+    解析请求：按 document_id 或 file_path 定位文档，未入库的文件先提取并入库
     
+    传入 base_document_id（已解析过的原版文档）时按修订版增量解析
+    """
+    base_document_id = _resolve_base_document(data)
+    if data.get('document_id') is not None:
+        document = storage.get_document(_parse_id(data['document_id'], 'document_id'))
+        if document is None:
+            raise RequestError('文档不存在', 404)
+        return {'document': document, 'refresh': bool(data.get('refresh')), 'base_document_id': base_document_id}
+    
+    file_path = data.get('file_path')
     if not file_path or not os.path.exists(file_path):
-        return jsonify({'error': '文件不存在'}), 400
+        raise RequestError('文件不存在')
     
-    analysis_result = analyze_bid(file_path)
-    return jsonify(analysis_result)
+    document = storage.get_document_by_hash(compute_file_hash(file_path))
+    if document is None:
+        doc_result = process_document(file_path)
+        if not doc_result.get('success'):
+            raise RequestError(doc_result.get('error', '文档处理失败'))
+        document_id = storage.save_document(
+            doc_result['file_hash'], doc_result['file_name'], doc_result['file_type'],
+            file_path, doc_result['text_content']
+        )
+        document = storage.get_document(document_id)
+    else:
+        document = dict(document, file_path=file_path)
+    
+    return {'document': document, 'refresh': bool(data.get('refresh')), 'base_document_id': base_document_id}
 
-@app.route('/api/generate-solution', methods=['POST'])
-def create_solution():
-    """生成技术方案接口"""
-    data = request.json
-    bid_analysis = data.get('bid_analysis')
+def _resolve_base_document(data):
+    """校验修订版解析的原版文档：须已入库且解析过"""
+    if data.get('base_document_id') is None:
+        return None
+    base_document_id = _parse_id(data['base_document_id'], 'base_document_id')
+    if storage.get_document(base_document_id) is None:
+        raise RequestError('原版文档不存在', 404)
+    if storage.get_latest_analysis(base_document_id) is None:
+        raise RequestError('原版文档尚未解析')
+    return base_document_id
+
+def run_analysis(document, refresh=False, base_document_id=None, progress_callback=None):
+    """
+    执行标书解析，已解析过的文档直接返回保存的结果（refresh为真时重新解析）
     
-    if not bid_analysis:
-        return jsonify({'error': '缺少标书解析数据'}), 400
+    指定原版文档时只重新解析与原版相比有变化的段落，原版没有可用的段落索引时完整解析
+    """
+    if not refresh:
+        stored = storage.get_latest_analysis(document['id'])
+        if stored is not None:
+            return stored
     
+    result = None
+    if base_document_id is not None and base_document_id != document['id']:
+        result = _run_amendment_analysis(document, base_document_id, progress_callback)
+    if result is None:
+        result = analyze_bid(document['file_path'], progress_callback)
+    
+    section_index = result.pop('section_index', None)
+    if result.get('success'):
+        # 存储路径为内容哈希，显示和生成方案使用上传时的原始文件名
+        result['document_info']['file_name'] = document['file_name']
+        result['analysis_id'] = storage.save_analysis(document['id'], result, section_index)
+        result['document_id'] = document['id']
+    return result
+
+def _run_amendment_analysis(document, base_document_id, progress_callback=None):
+    """按原版的段落索引增量解析修订版，缺少索引或修订版文本时返回None"""
+    base_analysis = storage.get_latest_analysis(base_document_id)
+    base_index = storage.get_analysis_index(base_analysis['analysis_id']) if base_analysis else None
+    text = storage.get_document_text(document['id'])
+    if not base_index or base_index.get('version') != SECTION_INDEX_VERSION or text is None:
+        return None
+    
+    result = analyze_amendment(text, base_index, progress_callback)
+    if result.get('success'):
+        result['document_info'] = {
+            'file_name': document['file_name'],
+            'file_type': document['file_type'],
+            'text_length': result['metadata']['total_words']
+        }
+        result['amendment'].update(base_document_id=base_document_id,
+                                   base_analysis_id=base_analysis['analysis_id'])
+    return result
+
+def resolve_solution_request(data):
+    """方案生成请求：优先按 analysis_id 读取已保存的解析结果"""
+    if data.get('analysis_id') is not None:
+        analysis_id = _parse_id(data['analysis_id'], 'analysis_id')
+        bid_analysis = storage.get_analysis(analysis_id)
+        if bid_analysis is None:
+            raise RequestError('解析结果不存在', 404)
+        return {'analysis_id': analysis_id, 'bid_analysis': bid_analysis}
+    
+    bid_analysis = data.get('bid_analysis')
+    if not bid_analysis:
+        raise RequestError('缺少标书解析数据')
+    return {'analysis_id': None, 'bid_analysis': bid_analysis}
+
+def run_solution(analysis_id, bid_analysis, progress_callback=None):
+    """生成技术方案并保存"""
     solution = generate_solution(bid_analysis)
-    return jsonify(solution)
+    solution['solution_id'] = storage.save_solution(analysis_id, solution)
+    solution['analysis_id'] = analysis_id
+    return solution
+
+def resolve_supplier_request(data):
+    """供应商查找请求：优先按 solution_id 从已保存的方案生成需求"""
+    if data.get('solution_id') is not None:
+        solution_id = _parse_id(data['solution_id'], 'solution_id')
+        solution = storage.get_solution(solution_id)
+        if solution is None:
+            raise RequestError('技术方案不存在', 404)
+        requirements = requirements_from_key_requirements(
+            solution.get('key_requirements', []),
+            category=solution.get('solution_overview', {}).get('solution_type')
+        )
+        return {'solution_id': solution_id, 'requirements': requirements}
+    
+    requirements = data.get('requirements')
+    if not requirements:
+        raise RequestError('缺少供应商需求数据')
+    if isinstance(requirements, list):
+        # 兼容直接传入技术方案 key_requirements 列表的调用
+        requirements = requirements_from_key_requirements(requirements)
+    return {'solution_id': None, 'requirements': requirements}
+
+def run_supplier_search(solution_id, requirements, progress_callback=None):
+    """查找供应商并保存结果"""
+    suppliers = find_suppliers(requirements)
+    suppliers['supplier_result_id'] = storage.save_supplier_result(solution_id, requirements, suppliers)
+    suppliers['solution_id'] = solution_id
+    return suppliers
+
+# 任务类型 -> (参数解析, 执行函数)，同步接口和异步任务共用
+TASKS = {
+    'analyze': (resolve_analysis_request, run_analysis),
+    'generate_solution': (resolve_solution_request, run_solution),
+    'find_suppliers': (resolve_supplier_request, run_supplier_search)
+}
+
+def task_options(data):
+    """埋点选项：timings 附加阶段耗时，profile 附加cProfile采样（需在配置中开启）"""
+    allow_profiling = config.get('instrumentation', {}).get('allow_profiling', False)
+    return {
+        'timings': bool(data.get('timings')),
+        'profile': bool(data.get('profile')) and allow_profiling
+    }
+
+def execute_task(task_name, kwargs, options, progress_callback=None):
+    """执行任务，按选项把阶段耗时和采样结果附加到结果的 metadata 中"""
+    _, runner = TASKS[task_name]
+    with instrumentation.trace() as trace, instrumentation.profile(options['profile']) as profile_report:
+        with instrumentation.stage(f'task.{task_name}'):
+            result = runner(progress_callback=progress_callback, **kwargs)
+    
+    if options['timings'] or options['profile']:
+        # 已保存的结果可能被缓存共享，复制后再附加
+        metadata = dict(result.get('metadata') or {})
+        if options['timings']:
+            metadata['timings'] = trace.to_dict()
+        if options['profile']:
+            metadata['profile'] = profile_report
+        result = dict(result, metadata=metadata)
+    return result
+
+for task_name in TASKS:
+    job_queue.register(
+        task_name,
+        lambda job, progress, name=task_name: execute_task(name, job['kwargs'], job['options'], progress)
+    )
+
+def run_task(task_name, data):
+    """同步执行任务，返回Flask响应"""
+    resolve, _ = TASKS[task_name]
+    data = data or {}
+    try:
+        kwargs = resolve(data)
+    except RequestError as e:
+        return jsonify({'error': e.message}), e.status
+    return jsonify(execute_task(task_name, kwargs, task_options(data)))
+
+@app.route('/api/analyze', methods=['POST'])
+def analyze_document():
+    """标书解析接口（参数：document_id 或 file_path，修订版可加 base_document_id）"""
+    return run_task('analyze', request.json)
+
+@app.route('/api/generate-solution', methods=['POST'])
+def create_solution():
+    """生成技术方案接口（参数：analysis_id 或 bid_analysis）"""
+    return run_task('generate_solution', request.json)
 
 @app.route('/api/find-suppliers', methods=['POST'])
 def search_suppliers():
-    """寻找供应商接口"""
-    data = request.json
-    requirements = data.get('requirements')
+    """寻找供应商接口（参数：solution_id 或 requirements）"""
+    return run_task('find_suppliers', request.json)
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """提交异步任务接口，立即返回任务ID"""
+    data = request.json or {}
+    job_type = data.get('type')
+    payload = data.get('payload') or {}
     
-    if not requirements:
-        return jsonify({'error': '缺少供应商需求数据'}), 400
+    if job_type not in TASKS:
+        return jsonify({'error': '不支持的任务类型'}), 400
     
-    suppliers = find_suppliers(requirements)
-    return jsonify(suppliers)
+    resolve, _ = TASKS[job_type]
+    try:
+        job = job_queue.submit(job_type, {'kwargs': resolve(payload), 'options': task_options(payload)})
+    except RequestError as e:
+        return jsonify({'error': e.message}), e.status
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    
+    return jsonify({'job_id': job['id'], 'status': job['status']}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查询任务状态和进度接口"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """获取任务结果接口"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    if job['status'] == 'failed':
+        return jsonify({'error': job['error']}), 500
+    if job['status'] != 'succeeded':
+        return jsonify({'status': job['status'], 'progress': job['progress']}), 202
+    return jsonify(job_queue.get_result(job_id))
+
+def _flag(value):
+    """解析布尔参数（JSON布尔值或表单字符串）"""
+    return str(value).lower() in ('1', 'true', 'yes')
+
+@app.route('/api/batch', methods=['POST'])
+def batch_analyze():
+    """
+    批量解析接口：上传ZIP压缩包（表单字段 file），或以JSON参数 path 指定服务器上 batch.source_root 内的目录/压缩包。
+    按完成顺序以NDJSON逐份返回结果，最后一行为汇总记录（含Excel汇总表下载地址）
+    """
+    if 'file' in request.files:
+        upload = request.files['file']
+        if not upload.filename.lower().endswith('.zip'):
+            return jsonify({'error': '批量解析请上传ZIP压缩包'}), 400
+        source = upload_store.save(upload.stream, upload.filename)['file_path']
+        options = request.form
+    else:
+        options = request.json or {}
+        if not options.get('path'):
+            return jsonify({'error': '请上传ZIP压缩包或指定路径'}), 400
+        try:
+            source = resolve_server_path(options['path'], config.get('batch', {}).get('source_root'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    try:
+        records = run_batch(source, storage=storage, refresh=_flag(options.get('refresh')),
+                            include_analysis=_flag(options.get('include_analysis')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def generate():
+        for record in records:
+            if record['type'] == 'summary':
+                record['summary_url'] = f"/api/batch/{record['batch_id']}/summary"
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(generate()), content_type='application/x-ndjson; charset=utf-8')
+
+@app.route('/api/batch/<batch_id>/summary', methods=['GET'])
+def get_batch_summary(batch_id):
+    """下载批量解析的Excel汇总表"""
+    batch_dir = os.path.join(config.get('batch', {}).get('output_path', 'data/batch'), secure_filename(batch_id))
+    if not os.path.exists(os.path.join(batch_dir, 'summary.xlsx')):
+        return jsonify({'error': '汇总表不存在'}), 404
+    return send_from_directory(os.path.abspath(batch_dir), 'summary.xlsx', as_attachment=True,
+                               download_name=f'batch-{batch_id}.xlsx')
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """性能指标接口（Prometheus文本格式）"""
+    return Response(instrumentation.metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 # 服务前端静态文件
 @app.route('/')
@@ -134,8 +464,8 @@ def serve_static(path):
 
 if __name__ == '__main__':
     # 检查必要的配置
-    if not WENXIN_API_KEY:
-        print("⚠️  警告: 未找到 WENXIN_API_KEY 环境变量")
+    if not get_llm_client().has_credentials(WENXIN_API_KEY, WENXIN_SECRET_KEY):
+        print("⚠️  警告: 未配置 WENXIN_API_KEY / WENXIN_SECRET_KEY 环境变量，AI解读将使用本地模拟结果")
         print("   请创建 .env 文件并添加您的API密钥")
     
     print(f"🚀 启动 {config.get('app_name', 'BidSpeed')} v{config.get('version', '1.0.0')}")
@@ -0,0 +1,54 @@
+"""
+批量解析脚本 - 标书速读(BidSpeed)
+
+解析目录或ZIP压缩包中的全部标书，逐份以NDJSON（每行一个JSON）输出到标准输出，
+结束时生成Excel汇总表。结果同时入库，可在网页中按 document_id / analysis_id 继续生成方案
+
+用法:
+    python batch.py 标书目录/ --workers 8 --output 汇总.xlsx > results.ndjson
+    python batch.py 标书.zip --refresh --full
+"""
+import argparse
+import json
+import sys
+
+from modules.batch_processor import run_batch
+from modules.storage import get_storage
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='批量解析目录或ZIP压缩包中的标书')
+    parser.add_argument('source', help='标书目录或ZIP压缩包路径')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认取配置 batch.workers）')
+    parser.add_argument('--output', default=None, help='Excel汇总表路径（默认写入 batch.output_path）')
+    parser.add_argument('--refresh', action='store_true', help='已解析过的文档也重新解析')
+    parser.add_argument('--full', action='store_true', help='输出完整解析结果')
+    parser.add_argument('--no-store', action='store_true', help='结果不入库')
+    args = parser.parse_args()
+
+    try:
+        records = run_batch(
+            args.source,
+            storage=None if args.no_store else get_storage(),
+            workers=args.workers,
+            refresh=args.refresh,
+            include_analysis=args.full,
+            summary_path=args.output
+        )
+        for record in records:
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+            if record['type'] == 'document':
+                mark = '✓' if record['success'] else '✗'
+                print(f"{mark} {record['file']}", file=sys.stderr)
+            else:
+                print(f"\n共 {record['total']} 份，成功 {record['succeeded']} 份，失败 {record['failed']} 份，"
+                      f"耗时 {record['elapsed_seconds']} 秒", file=sys.stderr)
+                print(f"汇总表: {record['summary_file']}", file=sys.stderr)
+    except ValueError as e:
+        print(f"✗ {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
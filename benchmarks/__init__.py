@@ -0,0 +1,4 @@
+"""
+性能基准测试
+合成标书语料生成与全流程各阶段计时
+"""
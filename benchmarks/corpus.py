@@ -0,0 +1,227 @@
+"""
+合成标书语料生成模块
+按指定行数生成带章节标题、技术规格行和评分细则行的标书文本，并输出为TXT、DOCX、PDF
+"""
+import os
+import random
+from typing import Dict, List
+
+from docx import Document
+
+SUPPORTED_FORMATS = ('txt', 'docx', 'pdf')
+
+# PDF每页行数
+PDF_LINES_PER_PAGE = 50
+
+CHAPTER_TITLES = ['项目概况', '技术要求', '功能需求', '商务条款', '评分标准', '投标人须知', '合同条款', '附件']
+
+NUMERALS = '一二三四五六七八九十'
+
+DEVICES = ['服务器', '核心交换机', '防火墙', '负载均衡器', '存储阵列', '数据库软件', '操作系统', '虚拟化平台']
+
+SPEC_TEMPLATES = [
+    '{device}配置：双路CPU，{memory}GB内存，{disk}TB存储',
+    '{device}技术参数：吞吐量不低于{disk}Gbps，并发连接数不少于{memory}万',
+    '{device}规格：{unit}U机架式，冗余电源，{memory}个千兆电口',
+    '{device}性能要求：支持{memory}个节点集群部署，故障切换时间小于{unit}秒'
+]
+
+SCORE_TEMPLATES = [
+    '{index}. 系统架构设计（{score}分）',
+    '{index}. 相关项目经验，每提供一个案例得{score}分',
+    '{index}. 技术团队实力（{score}分）',
+    '{index}. 售后服务方案：响应及时、措施完善得{score}分'
+]
+
+FILLER_TEMPLATES = [
+    '投标人应在投标截止时间前将投标文件密封送达指定地点，逾期送达的投标文件将被拒收。',
+    '本项目采用综合评分法，评标委员会按照招标文件规定的评审因素进行评审。',
+    '中标人应在合同签订后{unit}个月内完成全部设备的安装调试，并通过用户组织的验收。',
+    '投标文件应按照招标文件规定的格式编制，内容完整，字迹清楚，并加盖投标人公章。',
+    '采购人有权对投标人提供的资料进行核实，如发现虚假内容将取消其中标资格。',
+    '付款方式：合同签订后支付{memory}%预付款，验收合格后支付剩余款项。'
+]
+
+
+def generate_lines(line_count: int, seed: int = 0) -> List[str]:
+    """
+    生成合成标书的文本行
+
+    参数:
+        line_count: 行数
+        seed: 随机种子，相同参数生成相同内容
+
+    返回:
+        List[str]: 文本行（含空行）
+    """
+    rng = random.Random(seed)
+    lines = ['某单位信息化系统建设项目招标文件', '']
+    chapter = 0
+    item = 0
+
+    while len(lines) < line_count:
+        roll = rng.random()
+        if roll < 0.02:
+            # 章节标题，前后留空行
+            title = CHAPTER_TITLES[chapter % len(CHAPTER_TITLES)]
+            numeral = NUMERALS[chapter % len(NUMERALS)]
+            lines.extend(['', f'{numeral}、{title}'])
+            chapter += 1
+            item = 0
+            continue
+
+        item += 1
+        values = {
+            'device': rng.choice(DEVICES),
+            'memory': rng.choice([16, 32, 64, 128, 256]),
+            'disk': rng.choice([1, 2, 4, 10, 40]),
+            'unit': rng.randint(1, 6),
+            'index': item,
+            'score': rng.randint(1, 20)
+        }
+        if roll < 0.25:
+            lines.append('   - ' + rng.choice(SPEC_TEMPLATES).format(**values))
+        elif roll < 0.35:
+            lines.append(rng.choice(SCORE_TEMPLATES).format(**values))
+        else:
+            lines.append(rng.choice(FILLER_TEMPLATES).format(**values))
+
+    return lines[:line_count]
+
+
+def write_txt(path: str, lines: List[str]):
+    """输出为UTF-8文本文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+        f.write('\n')
+
+
+def write_docx(path: str, lines: List[str]):
+    """输出为Word文档，每行一个段落"""
+    document = Document()
+    for line in lines:
+        document.add_paragraph(line)
+    document.save(path)
+
+
+def write_pdf(path: str, lines: List[str], lines_per_page: int = PDF_LINES_PER_PAGE):
+    """
+    输出为PDF
+
+    使用Type0/Identity-H字体直接以Unicode码点作为字形编号，并附带ToUnicode映射，
+    文本可被PDF解析器原样提取，无需嵌入字体文件
+    """
+    chars = sorted({ord(c) for line in lines for c in line if ord(c) < 0x10000})
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    cmap_blocks = []
+    for i in range(0, len(chars), 100):
+        block = chars[i:i + 100]
+        entries = '\n'.join(f'<{c:04X}> <{c:04X}>' for c in block)
+        cmap_blocks.append(f'{len(block)} beginbfchar\n{entries}\nendbfchar')
+    cmap = (
+        '/CIDInit /ProcSet findresource begin\n12 dict begin\nbegincmap\n'
+        '/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n'
+        '/CMapName /Adobe-Identity-UCS def\n/CMapType 2 def\n'
+        '1 begincodespacerange\n<0000> <FFFF>\nendcodespacerange\n'
+        + '\n'.join(cmap_blocks)
+        + '\nendcmap\nCMapName currentdict /CMap defineresource pop\nend\nend'
+    ).encode('ascii')
+
+    catalog_id = add(b'')
+    pages_id = add(b'')
+    to_unicode_id = add(_pdf_stream(cmap))
+    cid_font_id = add(b'<< /Type /Font /Subtype /CIDFontType0 /BaseFont /STSong-Light '
+                      b'/CIDSystemInfo << /Registry (Adobe) /Ordering (GB1) /Supplement 2 >> >>')
+    font_id = add(b'<< /Type /Font /Subtype /Type0 /BaseFont /STSong-Light /Encoding /Identity-H '
+                  b'/DescendantFonts [%d 0 R] /ToUnicode %d 0 R >>' % (cid_font_id, to_unicode_id))
+
+    page_ids = []
+    for start in range(0, max(len(lines), 1), lines_per_page):
+        content = ['BT /F1 10 Tf 14 TL 40 800 Td']
+        for line in lines[start:start + lines_per_page]:
+            glyphs = ''.join(f'{ord(c):04X}' for c in line if ord(c) < 0x10000)
+            content.append(f'<{glyphs}> Tj T*')
+        content.append('ET')
+        content_id = add(_pdf_stream('\n'.join(content).encode('ascii')))
+        page_ids.append(add(
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] '
+            b'/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>' % (pages_id, font_id, content_id)
+        ))
+
+    objects[catalog_id - 1] = b'<< /Type /Catalog /Pages %d 0 R >>' % pages_id
+    kids = b' '.join(b'%d 0 R' % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(page_ids))
+
+    output = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+
+    xref_offset = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        output += b'%010d 00000 n \n' % offset
+    output += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        len(objects) + 1, catalog_id, xref_offset)
+
+    with open(path, 'wb') as f:
+        f.write(output)
+
+
+def _pdf_stream(data: bytes) -> bytes:
+    return b'<< /Length %d >>\nstream\n%s\nendstream' % (len(data), data)
+
+
+WRITERS = {
+    'txt': write_txt,
+    'docx': write_docx,
+    'pdf': write_pdf
+}
+
+
+def generate_corpus(output_dir: str, sizes: List[int], formats: List[str] = SUPPORTED_FORMATS,
+                    seed: int = 0) -> List[Dict]:
+    """
+    生成基准测试语料，已存在的文件直接复用
+
+    参数:
+        output_dir: 输出目录
+        sizes: 各文档的行数
+        formats: 输出格式
+        seed: 随机种子
+
+    返回:
+        List[Dict]: 语料文件列表，每项包含 path、format、lines、bytes
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    corpus = []
+
+    for size in sizes:
+        lines = None
+        for file_format in formats:
+            if file_format not in WRITERS:
+                raise ValueError(f'不支持的格式: {file_format}')
+
+            path = os.path.join(output_dir, f'tender_{size}_s{seed}.{file_format}')
+            if not os.path.exists(path):
+                if lines is None:
+                    lines = generate_lines(size, seed)
+                # 先写临时文件，中断时不会留下不完整的语料
+                tmp_path = f'{path}.tmp'
+                WRITERS[file_format](tmp_path, lines)
+                os.replace(tmp_path, path)
+
+            corpus.append({
+                'path': path,
+                'format': file_format,
+                'lines': size,
+                'bytes': os.path.getsize(path)
+            })
+
+    return corpus
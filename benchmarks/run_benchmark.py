@@ -0,0 +1,253 @@
+"""
+全流程性能基准测试
+
+生成合成标书语料，分别计时文档提取、标书解析各阶段、方案生成和供应商查找，
+输出吞吐量、p50/p95延迟和峰值内存（JSON），并可与之前的结果对比
+
+用法（在项目根目录执行）:
+    python -m benchmarks.run_benchmark --sizes 1000,10000 --formats txt,docx,pdf --repeat 5 \\
+        --output benchmarks/results/latest.json --compare benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .corpus import SUPPORTED_FORMATS, generate_corpus
+
+STAGES = [
+    'process_document',
+    'analyzer.scan',
+    'analyzer.ai_analysis',
+    'analyzer.checklist',
+    'solution_generator.generate',
+    'supplier_finder.find',
+    'total'
+]
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """最近秩法计算百分位数"""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(durations: List[float]) -> Dict:
+    """汇总单个阶段的耗时（毫秒）"""
+    return {
+        'p50_ms': round(percentile(durations, 50) * 1000, 3),
+        'p95_ms': round(percentile(durations, 95) * 1000, 3),
+        'mean_ms': round(sum(durations) / len(durations) * 1000, 3),
+        'min_ms': round(min(durations) * 1000, 3)
+    }
+
+
+def peak_rss_mb() -> float:
+    """当前进程（含已结束的子进程）的峰值常驻内存"""
+    import resource
+
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux以KB为单位，macOS以字节为单位
+    if sys.platform == 'darwin':
+        return round(peak / 1024 / 1024, 1)
+    return round(peak / 1024, 1)
+
+
+def run_case(entry: Dict, repeat: int) -> Dict:
+    """
+    在独立进程中对单个语料文件执行全流程计时
+
+    参数:
+        entry: 语料文件信息（见 corpus.generate_corpus）
+        repeat: 重复次数
+
+    返回:
+        Dict: 各阶段耗时汇总、吞吐量和峰值内存
+    """
+    from modules.bid_analyzer import BidAnalyzer
+    from modules.document_processor import process_document, text_as_pages
+    from modules.solution_generator import SolutionGenerator
+    from modules.supplier_finder import SupplierFinder, requirements_from_key_requirements
+
+    analyzer = BidAnalyzer()
+    # 基准测试不调用大模型，AI分析阶段使用本地模拟结果
+    analyzer.api_key = ''
+    generator = SolutionGenerator()
+    finder = SupplierFinder()
+
+    timings = {stage: [] for stage in STAGES}
+    for _ in range(repeat):
+        started = time.perf_counter()
+
+        doc_result = process_document(entry['path'], use_cache=False)
+        if not doc_result.get('success'):
+            raise RuntimeError(doc_result.get('error', '文档处理失败'))
+        text = doc_result['text_content']
+        extracted = time.perf_counter()
+
+        key_sections, tech_specs, scoring_rules, total_chars = analyzer._scan_pages(text_as_pages(text))
+        scanned = time.perf_counter()
+        ai_summary = analyzer._ai_deep_analysis(None)
+        summarized = time.perf_counter()
+        tech_checklist = analyzer._generate_tech_checklist(tech_specs, scoring_rules)
+        checked = time.perf_counter()
+
+        analysis = {
+            'success': True,
+            'key_sections': key_sections,
+            'ai_summary': ai_summary,
+            'tech_specifications': tech_specs,
+            'scoring_rules': scoring_rules,
+            'tech_checklist': tech_checklist,
+            'metadata': {'total_words': total_chars, 'key_points_count': len(tech_checklist)}
+        }
+        solution = generator.generate(analysis)
+        generated = time.perf_counter()
+
+        finder.find(requirements_from_key_requirements(solution['key_requirements']))
+        finished = time.perf_counter()
+
+        timings['process_document'].append(extracted - started)
+        timings['analyzer.scan'].append(scanned - extracted)
+        timings['analyzer.ai_analysis'].append(summarized - scanned)
+        timings['analyzer.checklist'].append(checked - summarized)
+        timings['solution_generator.generate'].append(generated - checked)
+        timings['supplier_finder.find'].append(finished - generated)
+        timings['total'].append(finished - started)
+
+    total_p50 = percentile(timings['total'], 50)
+    return {
+        'format': entry['format'],
+        'lines': entry['lines'],
+        'bytes': entry['bytes'],
+        'repeat': repeat,
+        'stages': {stage: summarize(values) for stage, values in timings.items()},
+        'throughput': {
+            'lines_per_s': round(entry['lines'] / total_p50, 1),
+            'mb_per_s': round(entry['bytes'] / 1024 / 1024 / total_p50, 3)
+        },
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def case_key(case: Dict) -> str:
+    return f"{case['format']}:{case['lines']}"
+
+
+def compare(current: Dict, baseline: Dict) -> List[Dict]:
+    """
+    与基线结果对比各阶段p50耗时
+
+    返回:
+        List[Dict]: 每个用例、阶段的基线值、当前值和变化比例（正数表示变慢）
+    """
+    baseline_cases = {case_key(case): case for case in baseline.get('cases', [])}
+    rows = []
+    for case in current['cases']:
+        base = baseline_cases.get(case_key(case))
+        if base is None:
+            continue
+        for stage, stats in case['stages'].items():
+            base_stats = base['stages'].get(stage)
+            if not base_stats or not base_stats['p50_ms']:
+                continue
+            rows.append({
+                'case': case_key(case),
+                'stage': stage,
+                'baseline_p50_ms': base_stats['p50_ms'],
+                'current_p50_ms': stats['p50_ms'],
+                'change': round(stats['p50_ms'] / base_stats['p50_ms'] - 1, 4)
+            })
+    return rows
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(sizes: List[int], formats: List[str], repeat: int, corpus_dir: str, seed: int = 0) -> Dict:
+    """生成语料并逐个用例执行基准测试"""
+    corpus = generate_corpus(corpus_dir, sizes, formats, seed)
+
+    cases = []
+    # 每个用例使用新的spawn进程，峰值内存互不影响
+    context = multiprocessing.get_context('spawn')
+    for entry in corpus:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            case = executor.submit(run_case, entry, repeat).result()
+        print(f"{case_key(case):>14}  total p50 {case['stages']['total']['p50_ms']:>10.1f} ms  "
+              f"p95 {case['stages']['total']['p95_ms']:>10.1f} ms  "
+              f"{case['throughput']['lines_per_s']:>10.0f} lines/s  rss {case['peak_rss_mb']} MB",
+              file=sys.stderr)
+        cases.append(case)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': seed,
+            'repeat': repeat
+        },
+        'cases': cases
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='标书速读全流程性能基准测试')
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='语料行数，逗号分隔（1000~1000000）')
+    parser.add_argument('--formats', default=','.join(SUPPORTED_FORMATS), help='语料格式，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=5, help='每个用例的重复次数')
+    parser.add_argument('--seed', type=int, default=0, help='语料随机种子')
+    parser.add_argument('--corpus-dir', default='benchmarks/corpus', help='语料目录（已生成的文件会复用）')
+    parser.add_argument('--output', help='结果JSON输出路径，默认输出到标准输出')
+    parser.add_argument('--compare', help='用于对比的基线结果JSON')
+    parser.add_argument('--fail-threshold', type=float,
+                        help='任一阶段p50变慢超过该比例（如0.2）时返回非零退出码')
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    formats = [name.strip() for name in args.formats.split(',') if name.strip()]
+    result = run(sizes, formats, max(args.repeat, 1), args.corpus_dir, args.seed)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            result['comparison'] = compare(result, json.load(f))
+        for row in result['comparison']:
+            print(f"{row['case']:>14}  {row['stage']:<28} {row['baseline_p50_ms']:>10.1f} -> "
+                  f"{row['current_p50_ms']:>10.1f} ms  {row['change']:+.1%}", file=sys.stderr)
+        if args.fail_threshold is not None:
+            regressions = [row for row in result['comparison'] if row['change'] > args.fail_threshold]
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -325,7 +325,11 @@ const app = createApp({
             analyzing.value = true;
             console.log('开始解读标书...'); // 添加调试日志
             try {
-                const response = await axios.post('/api/analyze', { file_path: uploadedFile.value.file_path });
+                // 已入库的文档只传ID
+                const payload = uploadedFile.value.document_id
+                    ? { document_id: uploadedFile.value.document_id }
+                    : { file_path: uploadedFile.value.file_path };
+                const response = await axios.post('/api/analyze', payload);
                 console.log('API Response:', response.data); // 调试日志
                 
                 if (response.data && response.data.success === true) {
@@ -379,6 +383,21 @@ const app = createApp({
             console.log('解读标书完成，analysisResult:', analysisResult.value); // 添加调试日志
         };
 
+        // 优先按ID引用服务端保存的结果；结果已过期（404）时改为提交完整内容
+        const postByReference = async (url, referencePayload, fullPayload) => {
+            if (!referencePayload) {
+                return axios.post(url, fullPayload);
+            }
+            try {
+                return await axios.post(url, referencePayload);
+            } catch (error) {
+                if (error.response && error.response.status === 404) {
+                    return axios.post(url, fullPayload);
+                }
+                throw error;
+            }
+        };
+
         const generateSolution = async () => {
             if (!analysisResult.value) {
                 ElMessage.warning('请先完成标书解读');
@@ -386,7 +405,12 @@ const app = createApp({
             }
             generatingSolution.value = true;
             try {
-                const response = await axios.post('/api/generate-solution', { bid_analysis: analysisResult.value });
+                // 已保存的解析结果只传ID，演示数据仍传完整内容
+                const response = await postByReference(
+                    '/api/generate-solution',
+                    analysisResult.value.analysis_id ? { analysis_id: analysisResult.value.analysis_id } : null,
+                    { bid_analysis: analysisResult.value }
+                );
                 solutionResult.value = response.data;
                 ElMessage.success('技术方案生成完成');
             } catch (error) {
@@ -404,7 +428,11 @@ const app = createApp({
             }
             searchingSuppliers.value = true;
             try {
-                const response = await axios.post('/api/find-suppliers', { requirements: solutionResult.value.key_requirements });
+                const response = await postByReference(
+                    '/api/find-suppliers',
+                    solutionResult.value.solution_id ? { solution_id: solutionResult.value.solution_id } : null,
+                    { requirements: solutionResult.value.key_requirements }
+                );
                 supplierResult.value = response.data;
                 ElMessage.success('供应商查找完成');
             } catch (error) {
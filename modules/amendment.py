@@ -0,0 +1,193 @@
+"""
+补遗/澄清增量解析模块
+解析时按编号标题把全文划分为段落块，记录每块的内容哈希和逐行提取结果（行偏移），
+以及各AI文本块覆盖的行范围，作为段落索引与解析结果一同保存；
+修订版标书与原版段落索引逐块比对后，只有变化的块重新提取和调用AI，其余结果从索引中搬移
+"""
+import difflib
+import hashlib
+from bisect import bisect_right
+from typing import Dict, List, Optional, Set, Tuple
+
+from .chunked_analysis import HEADING_PATTERN
+
+# 段落索引格式版本号，修改分块规则或逐行提取逻辑后需要递增，使旧索引不再复用
+SECTION_INDEX_VERSION = 1
+
+
+def split_lines(text: str) -> List[str]:
+    """按解析时的行号规则切分文本（末尾换行不产生空行）"""
+    lines = text.split('\n')
+    if text.endswith('\n'):
+        lines.pop()
+    return lines
+
+
+def is_block_start(line: str) -> bool:
+    """编号标题（第X章、"一、"等）开始一个新的段落块（参数为去除首尾空白后的行）"""
+    return bool(HEADING_PATTERN.match(line))
+
+
+class BlockRecorder:
+    """解析扫描过程中记录段落块"""
+
+    def __init__(self, max_section_lines: int):
+        """
+        参数:
+            max_section_lines: 每个块中每个章节记录的行数上限（与解析结果中每个章节的保留行数一致）
+        """
+        self.max_section_lines = max_section_lines
+        self.blocks = []
+        self._block = None
+        self._digest = None
+        self._section_counts = {}
+
+    def add_line(self, line_number: int, line: str, current_section: Optional[str]):
+        """
+        加入一行（含空行），遇到编号标题时开始新块
+
+        参数:
+            line_number: 行号（从1开始）
+            line: 去除首尾空白后的行文本
+            current_section: 该行之前所在的章节
+        """
+        if self._block is None or is_block_start(line):
+            self._close(current_section)
+            self._block = {
+                'start': line_number,
+                'line_count': 0,
+                'entry_section': current_section,
+                'section_lines': [],
+                'specs': [],
+                'rules': []
+            }
+            self._digest = hashlib.sha256()
+            self._section_counts = {}
+        self._block['line_count'] += 1
+        self._digest.update(line.encode('utf-8') + b'\n')
+
+    def add_section_line(self, line_number: int, section: str):
+        """记录关键章节行"""
+        if self._section_counts.get(section, 0) < self.max_section_lines:
+            self._section_counts[section] = self._section_counts.get(section, 0) + 1
+            self._block['section_lines'].append([line_number - self._block['start'], section])
+
+    def add_spec(self, line_number: int):
+        """记录技术规范行"""
+        self._block['specs'].append(line_number - self._block['start'])
+
+    def add_rule(self, line_number: int, score: int):
+        """记录评分细则行"""
+        self._block['rules'].append([line_number - self._block['start'], score])
+
+    def finish(self, current_section: Optional[str]) -> List[Dict]:
+        """结束扫描，返回全部段落块"""
+        self._close(current_section)
+        return self.blocks
+
+    def _close(self, current_section: Optional[str]):
+        if self._block is not None:
+            self._block['exit_section'] = current_section
+            self._block['hash'] = self._digest.hexdigest()[:32]
+            self.blocks.append(self._block)
+            self._block = None
+
+
+def split_blocks(lines: List[str]) -> List[Tuple[int, int, str]]:
+    """
+    按与 BlockRecorder 相同的规则划分段落块（不做逐行提取）
+
+    返回:
+        List[Tuple]: (起始行号, 行数, 内容哈希)
+    """
+    blocks = []
+    start, digest = None, None
+    for line_number, raw_line in enumerate(lines, 1):
+        line = raw_line.strip()
+        if start is None or is_block_start(line):
+            if start is not None:
+                blocks.append((start, line_number - start, digest.hexdigest()[:32]))
+            start, digest = line_number, hashlib.sha256()
+        digest.update(line.encode('utf-8') + b'\n')
+    if start is not None:
+        blocks.append((start, len(lines) + 1 - start, digest.hexdigest()[:32]))
+    return blocks
+
+
+def diff_blocks(base_blocks: List[Dict], new_blocks: List[Tuple[int, int, str]]) -> Tuple[Dict[int, int], List[Dict]]:
+    """
+    逐块比对原版与修订版
+
+    返回:
+        Tuple: (修订版块序号 -> 内容相同的原版块序号, 变更列表)
+               变更列表每项含 type（replace/insert/delete）、base_lines、new_lines（起止行号，无对应内容时为None）
+    """
+    matcher = difflib.SequenceMatcher(None, [block['hash'] for block in base_blocks],
+                                      [block[2] for block in new_blocks], autojunk=False)
+    matched = {}
+    changes = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            matched.update(zip(range(j1, j2), range(i1, i2)))
+            continue
+        changes.append({
+            'type': tag,
+            'base_lines': [base_blocks[i1]['start'],
+                           base_blocks[i2 - 1]['start'] + base_blocks[i2 - 1]['line_count'] - 1] if i2 > i1 else None,
+            'new_lines': [new_blocks[j1][0], new_blocks[j2 - 1][0] + new_blocks[j2 - 1][1] - 1] if j2 > j1 else None
+        })
+    return matched, changes
+
+
+def reusable_ai_chunks(base_blocks: List[Dict], ai_chunks: List[Dict], unchanged: Set[int]) -> Tuple[Set[int], Set[int]]:
+    """
+    找出可以复用的AI文本块
+
+    文本块覆盖的段落块都未变化时可以复用；某个段落块还属于不能复用的文本块时，
+    该段落块要重新分析，覆盖它的其他文本块也不再复用，避免同一内容重复送入AI
+
+    参数:
+        base_blocks: 原版段落块
+        ai_chunks: 原版AI文本块（含 lines 起止行号）
+        unchanged: 未变化的原版块序号
+
+    返回:
+        Tuple: (可复用的文本块序号, AI结果已全部可复用的原版块序号)
+    """
+    starts = [block['start'] for block in base_blocks]
+    chunk_blocks = []
+    block_chunks = {}
+    for chunk_id, chunk in enumerate(ai_chunks):
+        first = bisect_right(starts, chunk['lines'][0]) - 1
+        last = bisect_right(starts, chunk['lines'][1]) - 1
+        chunk_blocks.append(range(max(first, 0), last + 1))
+        for block_id in chunk_blocks[-1]:
+            block_chunks.setdefault(block_id, []).append(chunk_id)
+
+    reusable = {chunk_id for chunk_id, blocks in enumerate(chunk_blocks)
+                if all(block_id in unchanged for block_id in blocks)}
+    changed = True
+    while changed:
+        changed = False
+        for chunk_id in list(reusable):
+            if any(other not in reusable
+                   for block_id in chunk_blocks[chunk_id] for other in block_chunks[block_id]):
+                reusable.discard(chunk_id)
+                changed = True
+
+    covered = {block_id for block_id in unchanged
+               if all(chunk_id in reusable for chunk_id in block_chunks.get(block_id, []))}
+    return reusable, covered
+
+
+def relocate_line(line_number: int, base_starts: List[int], new_starts: Dict[int, int]) -> int:
+    """
+    把原版行号换算为修订版行号
+
+    参数:
+        line_number: 原版行号
+        base_starts: 原版各块起始行号
+        new_starts: 未变化的原版块序号 -> 对应修订版块的起始行号
+    """
+    block_id = bisect_right(base_starts, line_number) - 1
+    return new_starts[block_id] + line_number - base_starts[block_id]
@@ -0,0 +1,398 @@
+"""
+批量解析模块
+把目录或ZIP压缩包中的标书分发到进程池，各进程独立完成文本提取和标书解析，
+按完成顺序逐份输出结果，全部完成后生成Excel汇总表
+"""
+import os
+import time
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from openpyxl import Workbook
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+from .bid_analyzer import BidAnalyzer
+from .config_loader import get_config
+from .document_processor import SUPPORTED_EXTENSIONS, disable_parallel_pdf, process_document
+from .extraction_cache import compute_file_hash
+from .llm_client import share_llm_quota
+from .near_duplicate import find_similar_document, get_near_duplicate_index
+
+# 汇总表列：(表头, 结果字段)
+SUMMARY_COLUMNS = [
+    ('文件', 'file'),
+    ('状态', 'status'),
+    ('文档ID', 'document_id'),
+    ('解析结果ID', 'analysis_id'),
+    ('字符数', 'text_length'),
+    ('技术规范数', 'tech_spec_count'),
+    ('评分细则数', 'scoring_rule_count'),
+    ('清单条目数', 'key_points_count'),
+    ('高优先级条目数', 'high_priority_count'),
+    ('相似文档ID', 'similar_document_id'),
+    ('相似度', 'similarity'),
+    ('耗时（秒）', 'elapsed_seconds'),
+    ('错误信息', 'error')
+]
+
+# 汇总表中需要加宽的列：结果字段 -> 列宽
+COLUMN_WIDTHS = {'file': 48, 'error': 40}
+
+# 每个工作进程同时排队的文档数，避免一次性提交全部文档占用内存
+TASKS_PER_WORKER = 2
+
+
+def resolve_server_path(path: str, source_root: Optional[str]) -> str:
+    """
+    校验接口传入的服务器路径：只允许 batch.source_root 目录之内的目录或压缩包（解析符号链接后判断）
+
+    参数:
+        path: 请求中的路径（相对路径按 source_root 解析）
+        source_root: 允许批量解析的根目录，为空时不接受服务器路径
+
+    返回:
+        str: 解析后的绝对路径
+    """
+    if not source_root:
+        raise ValueError('未配置批量解析目录（batch.source_root），请上传ZIP压缩包')
+    root = os.path.realpath(source_root)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if resolved != root and not resolved.startswith(root + os.sep):
+        raise ValueError('路径不在允许的批量解析目录内')
+    if not os.path.exists(resolved):
+        raise ValueError('路径不存在')
+    return resolved
+
+
+def collect_batch_files(source: str, extract_dir: str) -> Tuple[List[str], str]:
+    """
+    收集待解析的标书文件
+
+    参数:
+        source: 目录或ZIP压缩包路径（目录递归查找）
+        extract_dir: ZIP压缩包的解压目录
+
+    返回:
+        Tuple: (按相对路径排序的文件列表, 计算相对路径的根目录)
+    """
+    batch_config = get_config('batch')
+    max_files = batch_config.get('max_files', 500)
+    if os.path.isdir(source):
+        root = source
+    elif zipfile.is_zipfile(source):
+        _extract_zip(source, extract_dir, max_files, batch_config.get('max_extracted_mb', 1024) * 1024 * 1024)
+        root = extract_dir
+    else:
+        raise ValueError('批量解析只支持目录或ZIP压缩包')
+
+    files = []
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names[:] = sorted(name for name in dir_names if not _is_skipped(name))
+        for file_name in sorted(file_names):
+            if _is_batch_file(file_name):
+                files.append(os.path.join(dir_path, file_name))
+
+    if len(files) > max_files:
+        raise ValueError(f'文件数量超过上限（{max_files}份）')
+    return files, root
+
+
+def _is_skipped(name: str) -> bool:
+    """跳过隐藏文件/目录和macOS压缩包附带的 __MACOSX 目录"""
+    return name.startswith(('.', '__MACOSX'))
+
+
+def _is_batch_file(file_name: str) -> bool:
+    return not _is_skipped(file_name) and os.path.splitext(file_name)[1].lower() in SUPPORTED_EXTENSIONS
+
+
+def _extract_zip(zip_path: str, target_dir: str, max_files: int, max_bytes: int):
+    """
+    解压ZIP压缩包中的标书文件
+
+    只解压支持的文件类型；写入任何文件之前先按目录检查文件数和解压后总大小，
+    拒绝超出上限的压缩包和解压到目标目录之外的条目
+    """
+    target_root = os.path.realpath(target_dir)
+    with zipfile.ZipFile(zip_path) as archive:
+        entries = []
+        total_size = 0
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            name = info.filename
+            if not info.flag_bits & 0x800:
+                # Windows中文系统打包的文件名为GBK编码，zipfile按cp437解码
+                try:
+                    name = name.encode('cp437').decode('gbk')
+                except (UnicodeEncodeError, UnicodeDecodeError):
+                    pass
+
+            target_path = os.path.realpath(os.path.join(target_root, name))
+            if not target_path.startswith(target_root + os.sep):
+                raise ValueError(f'压缩包包含非法路径: {name}')
+
+            parts = os.path.relpath(target_path, target_root).split(os.sep)
+            if any(_is_skipped(part) for part in parts[:-1]) or not _is_batch_file(parts[-1]):
+                continue
+
+            entries.append((info, target_path))
+            total_size += info.file_size
+            if len(entries) > max_files:
+                raise ValueError(f'文件数量超过上限（{max_files}份）')
+            if total_size > max_bytes:
+                raise ValueError(f'压缩包解压后超过大小上限（{max_bytes // (1024 * 1024)}MB）')
+
+        # 读取时 zipfile 按目录中的 file_size 截断并校验CRC，实际写入量不会超过上面统计的大小
+        for info, target_path in entries:
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            with archive.open(info) as source, open(target_path, 'wb') as target:
+                while True:
+                    chunk = source.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+
+
+def analyze_file(file_path: str) -> Dict:
+    """
+    提取并解析单份标书（在工作进程中执行）
+
+    返回:
+        Dict: success 为真时包含提取结果 document 和解析结果 analysis，否则包含 error
+    """
+    started = time.perf_counter()
+    try:
+        document = process_document(file_path)
+        if not document.get('success'):
+            return {'success': False, 'error': document.get('error', '文档处理失败'),
+                    'elapsed_seconds': round(time.perf_counter() - started, 3)}
+
+        analysis = BidAnalyzer().analyze(document['text_content'])
+        if not analysis.get('success'):
+            return {'success': False, 'error': analysis.get('error', '标书解析失败'),
+                    'elapsed_seconds': round(time.perf_counter() - started, 3)}
+        return {'success': True, 'document': document, 'analysis': analysis,
+                'elapsed_seconds': round(time.perf_counter() - started, 3)}
+    except Exception as e:
+        return {'success': False, 'error': f'标书解析失败: {str(e)}',
+                'elapsed_seconds': round(time.perf_counter() - started, 3)}
+
+
+def _init_worker(workers: int):
+    """
+    工作进程初始化：文档之间已经并行，关闭单份PDF的页级并行；
+    每个进程各自创建大模型客户端，按进程数分摊QPS配额，避免总请求速率超过配额
+    """
+    disable_parallel_pdf()
+    share_llm_quota(workers)
+
+
+class BatchProcessor:
+    """批量标书解析"""
+
+    def __init__(self, workers: Optional[int] = None, storage=None):
+        """
+        参数:
+            workers: 进程数，默认取 config.json 的 batch.workers（0表示CPU核数）
+            storage: 业务数据存储（BidStorage），提供时解析结果入库，并复用已解析过的文档
+        """
+        configured = int(get_config('batch').get('workers', 0))
+        self.workers = workers or configured or os.cpu_count() or 1
+        self.storage = storage
+
+    def run(self, files: List[str], root: str, refresh: bool = False,
+            include_analysis: bool = False) -> Iterator[Dict]:
+        """
+        解析文件列表，按完成顺序逐份输出结果记录
+
+        参数:
+            files: 文件路径列表
+            root: 计算结果中相对路径的根目录
+            refresh: 为真时已解析过的文档也重新解析
+            include_analysis: 结果记录中是否附带完整解析结果
+
+        返回:
+            Iterator[Dict]: 结果记录（type 为 document）
+        """
+        pending_files = []
+        for file_path in files:
+            reused = None if refresh else self._load_stored(file_path)
+            if reused is not None:
+                document, analysis = reused
+                yield self._record(file_path, root, {'success': True, 'analysis': analysis, 'elapsed_seconds': 0},
+                                   document['id'], analysis.get('analysis_id'), document['text_length'],
+                                   include_analysis, reused=True)
+            else:
+                pending_files.append(file_path)
+
+        if not pending_files:
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.workers,)) as executor:
+            queue = iter(pending_files)
+            running = {}
+
+            def submit_next():
+                file_path = next(queue, None)
+                if file_path is not None:
+                    running[executor.submit(analyze_file, file_path)] = file_path
+
+            for _ in range(self.workers * TASKS_PER_WORKER):
+                submit_next()
+
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path = running.pop(future)
+                    submit_next()
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        outcome = {'success': False, 'error': f'工作进程异常: {str(e)}', 'elapsed_seconds': None}
+                    yield self._save(file_path, root, outcome, include_analysis)
+
+    def _load_stored(self, file_path: str) -> Optional[Tuple[Dict, Dict]]:
+        """查找已入库且已解析过的相同文档，返回 (文档, 解析结果)"""
+        if self.storage is None:
+            return None
+        document = self.storage.get_document_by_hash(compute_file_hash(file_path))
+        if document is None:
+            return None
+        analysis = self.storage.get_latest_analysis(document['id'])
+        return (document, analysis) if analysis is not None else None
+
+    def _save(self, file_path: str, root: str, outcome: Dict, include_analysis: bool) -> Dict:
+        """解析结果入库并生成结果记录"""
+        if not outcome['success']:
+            return self._record(file_path, root, outcome, None, None, None, include_analysis)
+
+        document = outcome['document']
+        section_index = outcome['analysis'].pop('section_index', None)
+        document_id = analysis_id = similar = None
+        if self.storage is not None:
+            document_id = self.storage.save_document(
+                document['file_hash'], os.path.basename(file_path), document['file_type'],
+                file_path, document['text_content']
+            )
+            # 先查找再保存本次结果，同一批中的近似重复标书也能互相识别
+            index = get_near_duplicate_index(self.storage.path)
+            if index is not None:
+                similar = find_similar_document(self.storage, index, document_id, document['text_content'])
+            analysis_id = self.storage.save_analysis(document_id, outcome['analysis'], section_index)
+        record = self._record(file_path, root, outcome, document_id, analysis_id, document['text_length'],
+                              include_analysis)
+        if similar is not None:
+            record.update(similar_document_id=similar['document_id'], similarity=similar['similarity'])
+        return record
+
+    @staticmethod
+    def _record(file_path: str, root: str, outcome: Dict, document_id: Optional[int], analysis_id: Optional[int],
+                text_length: Optional[int], include_analysis: bool, reused: bool = False) -> Dict:
+        """生成单份文档的结果记录"""
+        record = {
+            'type': 'document',
+            'file': os.path.relpath(file_path, root),
+            'success': outcome['success'],
+            'status': '已解析' if reused else ('成功' if outcome['success'] else '失败'),
+            'reused': reused,
+            'document_id': document_id,
+            'analysis_id': analysis_id,
+            'elapsed_seconds': outcome.get('elapsed_seconds')
+        }
+        if not outcome['success']:
+            record['error'] = outcome.get('error')
+            return record
+
+        analysis = outcome['analysis']
+        checklist = analysis.get('tech_checklist', [])
+        record.update({
+            'text_length': text_length,
+            'tech_spec_count': len(analysis.get('tech_specifications', [])),
+            'scoring_rule_count': len(analysis.get('scoring_rules', [])),
+            'key_points_count': len(checklist),
+            'high_priority_count': sum(1 for item in checklist if item.get('priority') == 'high')
+        })
+        if include_analysis:
+            record['analysis'] = analysis
+        return record
+
+
+def write_summary(records: List[Dict], output_path: str):
+    """把结果记录写入Excel汇总表（第一个工作表为逐份结果，第二个为统计）"""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = '解析结果'
+    sheet.append([header for header, _ in SUMMARY_COLUMNS])
+    for record in records:
+        sheet.append([record.get(field) for _, field in SUMMARY_COLUMNS])
+    for cell in sheet[1]:
+        cell.font = Font(bold=True)
+    sheet.freeze_panes = 'A2'
+    letters = {field: get_column_letter(index) for index, (_, field) in enumerate(SUMMARY_COLUMNS, 1)}
+    for field, width in COLUMN_WIDTHS.items():
+        sheet.column_dimensions[letters[field]].width = width
+
+    stats = workbook.create_sheet('统计')
+    succeeded = sum(1 for record in records if record['success'])
+    for row in [('文档总数', len(records)), ('成功', succeeded), ('失败', len(records) - succeeded),
+                ('复用已有结果', sum(1 for record in records if record['reused']))]:
+        stats.append(row)
+
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    workbook.save(output_path)
+
+
+def run_batch(source: str, storage=None, workers: Optional[int] = None, refresh: bool = False,
+              include_analysis: bool = False, summary_path: Optional[str] = None) -> Iterator[Dict]:
+    """
+    批量解析入口函数
+
+    在返回前收集文件（来源无效时直接抛出ValueError），返回的迭代器按完成顺序输出各文档的结果记录，
+    最后输出一条 type 为 summary 的汇总记录（含Excel汇总表路径）
+
+    参数:
+        source: 目录或ZIP压缩包路径
+        storage: 业务数据存储，提供时结果入库
+        workers: 进程数
+        refresh: 为真时已解析过的文档也重新解析
+        include_analysis: 结果记录中是否附带完整解析结果
+        summary_path: Excel汇总表路径，默认写入 batch.output_path 下本批次的目录
+
+    返回:
+        Iterator[Dict]: 结果记录
+    """
+    batch_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    batch_dir = os.path.join(get_config('batch').get('output_path', 'data/batch'), batch_id)
+    files, root = collect_batch_files(source, os.path.join(batch_dir, 'files'))
+    processor = BatchProcessor(workers, storage)
+    return _iter_batch(processor, batch_id, files, root, refresh, include_analysis,
+                       summary_path or os.path.join(batch_dir, 'summary.xlsx'))
+
+
+def _iter_batch(processor: BatchProcessor, batch_id: str, files: List[str], root: str, refresh: bool,
+                include_analysis: bool, summary_path: str) -> Iterator[Dict]:
+    """逐份输出结果记录，结束后写入汇总表并输出汇总记录"""
+    started = time.perf_counter()
+    records = []
+    for record in processor.run(files, root, refresh, include_analysis):
+        records.append({key: value for key, value in record.items() if key != 'analysis'})
+        yield record
+
+    write_summary(records, summary_path)
+    succeeded = sum(1 for record in records if record['success'])
+    yield {
+        'type': 'summary',
+        'batch_id': batch_id,
+        'total': len(records),
+        'succeeded': succeeded,
+        'failed': len(records) - succeeded,
+        'reused': sum(1 for record in records if record['reused']),
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+        'summary_file': summary_path
+    }
@@ -2,30 +2,97 @@
 标书解析模块
 使用AI进行标书内容的智能解读和总结
 """
+import os
 import re
 import json
-import requests
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .amendment import (SECTION_INDEX_VERSION, BlockRecorder, diff_blocks, relocate_line, reusable_ai_chunks,
+                        split_blocks, split_lines)
+from .document_processor import SUPPORTED_EXTENSIONS, iter_document_pages, load_cached_text, text_as_pages
+from .chunked_analysis import ChunkedAIAnalysis, is_heading
+from .config_loader import get_config
+from .instrumentation import record_volume, stage
+from .keyword_matcher import KeywordMatcher
+from .llm_client import clean_credential, get_llm_client
+from .rule_index import RuleIndex
+
+# 章节关键词（按顺序匹配，先命中者优先）
+SECTION_KEYWORDS = {
+    '项目概况': ['项目概况', '项目背景', '采购需求'],
+    '技术要求': ['技术要求', '技术规格', '技术参数', '功能需求'],
+    '商务条款': ['商务要求', '付款方式', '交货期'],
+    '评分标准': ['评分', '打分', '评审', '权重'],
+    '合同条款': ['合同', '违约', '质保']
+}
+
+SECTION_NAMES = list(SECTION_KEYWORDS)
+
+# 技术规范行关键词
+SPEC_KEYWORDS = ['配置', '参数', '规格', '要求']
+
+MAX_SECTION_LINES = 20  # 每个章节保留的行数
+MAX_TECH_SPECS = 50     # 技术规范返回数量上限（技术条款清单包含全部技术规范行）
+
+
+def _build_line_matcher():
+    """
+    编译逐行匹配器：章节关键词、技术规范关键词和分值在同一个正则中一次扫描完成
+
+    返回:
+        Tuple: (编译后的正则, 关键词 -> (章节序号, 是否技术规范关键词))
+    """
+    matcher = KeywordMatcher(
+        [keyword for keywords in SECTION_KEYWORDS.values() for keyword in keywords] + SPEC_KEYWORDS
+    )
+    
+    # 匹配到的关键词可能包含其他关键词（如"技术要求"包含"要求"），预先合并其分类
+    keyword_tags = {}
+    for keyword in matcher.keywords:
+        contained = matcher.expand(keyword)
+        ranks = [rank for rank, name in enumerate(SECTION_NAMES)
+                 if any(k in contained for k in SECTION_KEYWORDS[name])]
+        keyword_tags[keyword] = (
+            min(ranks) if ranks else None,
+            any(k in contained for k in SPEC_KEYWORDS)
+        )
+    
+    pattern = re.compile(f'(?=(?P<keyword>{matcher.pattern})|(?P<score>\\d+)\\s*分)')
+    return pattern, keyword_tags
+
+
+LINE_PATTERN, KEYWORD_TAGS = _build_line_matcher()
+
 
 class BidAnalyzer:
     """标书解析器"""
     
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, secret_key=None):
         """
         初始化解析器
         
         参数:
-            api_key: 文心一言API密钥（从环境变量或配置文件读取）
+            api_key: 文心一言API Key（从环境变量或配置文件读取）
+            secret_key: 文心一言Secret Key（从环境变量或配置文件读取）
         """
-        self.api_key = api_key or self._load_api_key()
-        self.api_url = "https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/completions_pro"
+        self.api_key = clean_credential(api_key or self._load_credential('WENXIN_API_KEY', 'api_key'))
+        self.secret_key = clean_credential(secret_key or self._load_credential('WENXIN_SECRET_KEY', 'secret_key'))
+        # 共享客户端：复用连接池，统一限流和重试
+        self.llm_client = get_llm_client()
+        # 密钥不完整时不调用AI，使用本地模拟结果
+        if not self.llm_client.has_credentials(self.api_key, self.secret_key):
+            self.api_key = ''
+        # AI分析时每个文本块的token上限
+        self.chunk_tokens = get_config('ai_service').get('chunk_tokens', 2000)
     
-    def _load_api_key(self):
-        """从配置文件加载API密钥"""
+    def _load_credential(self, env_name, config_key):
+        """从环境变量或配置文件加载密钥"""
+        if os.getenv(env_name):
+            return os.getenv(env_name)
         try:
             with open('config.json', 'r', encoding='utf-8') as f:
                 config = json.load(f)
-                return config.get('api_key', '')
+                return config.get(config_key, '')
         except:
             return ''
     
@@ -39,104 +106,295 @@ class BidAnalyzer:
         返回:
             Dict: 包含解析结果的字典
         """
-        # 提取关键信息
-        key_sections = self._extract_key_sections(text_content)
+        return self.analyze_pages(text_as_pages(text_content))
+    
+    def analyze_pages(self, pages: Iterable[Dict],
+                      progress_callback: Optional[Callable[[float], None]] = None) -> Dict:
+        """
+        逐页分析标书内容，内存占用只与单页大小和解析结果有关
         
-        # 使用AI进行深度解读
-        ai_analysis = self._ai_deep_analysis(text_content, key_sections)
+        参数:
+            pages: 页记录序列（见 document_processor.iter_document_pages），
+                   每页文本需以完整的行结束
+            progress_callback: 进度回调，参数为0~1之间的完成比例
         
-        # 提取技术规范
-        tech_specs = self._extract_tech_specifications(text_content)
+        返回:
+            Dict: 包含解析结果的字典
+        """
+        report_progress = progress_callback or (lambda value: None)
+        
+        # 配置了API密钥时，扫描过程中按章节切块并发提交AI分析
+        ai_job = None
+        if self.api_key:
+            ai_job = ChunkedAIAnalysis(self.llm_client, self.api_key, self.chunk_tokens, self.secret_key)
         
-        # 提取评分细则
-        scoring_rules = self._extract_scoring_rules(text_content)
+        # 单次遍历提取关键章节、技术规范和评分细则，同时记录段落索引
+        recorder = BlockRecorder(MAX_SECTION_LINES)
+        try:
+            with stage('analyzer.scan'):
+                key_sections, tech_specs, scoring_rules, total_chars = self._scan_pages(pages, ai_job, recorder)
+            report_progress(0.4)
+            
+            # 使用AI进行深度解读
+            with stage('analyzer.ai_analysis'):
+                ai_analysis = self._ai_deep_analysis(ai_job)
+        finally:
+            # 读取或扫描中途出错时也要关闭AI分析线程池
+            if ai_job is not None:
+                ai_job.close()
+        report_progress(0.9)
         
-        # 生成结构化清单
-        tech_checklist = self._generate_tech_checklist(tech_specs, scoring_rules)
+        section_index = self._section_index(recorder.blocks, ai_job, ai_analysis)
+        return self._build_result(key_sections, tech_specs, scoring_rules, ai_analysis, total_chars, section_index)
+    
+    def analyze_amendment(self, text_content: str, base_index: Dict,
+                          progress_callback: Optional[Callable[[float], None]] = None) -> Dict:
+        """
+        增量解析修订版标书（补遗/澄清）
+        
+        修订版与原版的段落索引逐块比对：内容未变且所在章节未变的块直接搬移原版的提取结果，
+        原版AI文本块覆盖的段落都未变时复用其AI结果，其余段落重新提取并送入AI分析
+        
+        参数:
+            text_content: 修订版全文
+            base_index: 原版解析结果的段落索引（见 analyze_pages 返回的 section_index）
+            progress_callback: 进度回调，参数为0~1之间的完成比例
+        
+        返回:
+            Dict: 与 analyze_pages 相同结构的结果，另含 amendment（变更和复用情况）
+        """
+        report_progress = progress_callback or (lambda value: None)
+        lines = split_lines(text_content)
+        base_blocks = base_index['blocks']
+        base_starts = [block['start'] for block in base_blocks]
+        
+        with stage('analyzer.amendment_diff'):
+            new_blocks = split_blocks(lines)
+            matched, changes = diff_blocks(base_blocks, new_blocks)
+            new_starts = {base_id: new_blocks[new_id][0] for new_id, base_id in matched.items()}
+            
+            ai_job = None
+            reused_chunks = []
+            ai_covered = set()
+            if self.api_key:
+                ai_job = ChunkedAIAnalysis(self.llm_client, self.api_key, self.chunk_tokens, self.secret_key)
+                base_chunks = base_index.get('ai_chunks') or []
+                reusable, ai_covered = reusable_ai_chunks(base_blocks, base_chunks, set(matched.values()))
+                reused_chunks = [{
+                    'lines': [relocate_line(line, base_starts, new_starts) for line in base_chunks[chunk_id]['lines']],
+                    'result': base_chunks[chunk_id]['result']
+                } for chunk_id in sorted(reusable)]
+        
+        # 逐块搬移或重新提取：块内容相同但进入时所在章节不同（前文修改了章节标题）时也要重新提取
+        try:
+            records = []
+            rescanned = 0
+            ai_pending = False
+            current_section = None
+            with stage('analyzer.scan'):
+                for new_id, (start, line_count, _) in enumerate(new_blocks):
+                    base_id = matched.get(new_id)
+                    need_ai = ai_job is not None and base_id not in ai_covered
+                    # 送入AI的文本块不跨越复用的段落
+                    if ai_pending and not need_ai:
+                        ai_job.flush()
+                    ai_pending = need_ai
+                
+                    if base_id is not None and not need_ai and base_blocks[base_id]['entry_section'] == current_section:
+                        record = dict(base_blocks[base_id], start=start)
+                    else:
+                        recorder = BlockRecorder(MAX_SECTION_LINES)
+                        block_text = '\n'.join(lines[start - 1:start - 1 + line_count]) + '\n'
+                        self._scan_pages(text_as_pages(block_text), ai_job if need_ai else None, recorder,
+                                         current_section=current_section, first_line=start)
+                        record = recorder.blocks[0]
+                        rescanned += 1
+                    records.append(record)
+                    current_section = record['exit_section']
+                key_sections, tech_specs, scoring_rules = self._collect_blocks(records, lines)
+            report_progress(0.4)
+            
+            with stage('analyzer.ai_analysis'):
+                if ai_job is None:
+                    ai_analysis = self._mock_ai_analysis()
+                else:
+                    ai_analysis = self._ai_deep_analysis(ai_job, reused_chunks)
+        finally:
+            if ai_job is not None:
+                ai_job.close()
+        report_progress(0.9)
+        
+        section_index = self._section_index(records, ai_job, ai_analysis)
+        result = self._build_result(key_sections, tech_specs, scoring_rules, ai_analysis, len(text_content),
+                                    section_index)
+        result['amendment'] = {
+            'changes': changes,
+            'total_blocks': len(new_blocks),
+            'reused_blocks': len(new_blocks) - rescanned,
+            'rescanned_blocks': rescanned,
+            'reused_ai_chunks': len(reused_chunks),
+            'analyzed_ai_chunks': len(ai_job.chunker.chunk_lines) if ai_job is not None else 0
+        }
+        return result
+    
+    def _build_result(self, key_sections: Dict, tech_specs: List[Dict], scoring_rules: List[Dict],
+                      ai_analysis: Dict, total_chars: int, section_index: Dict) -> Dict:
+        """生成结构化清单并组装解析结果"""
+        with stage('analyzer.checklist'):
+            tech_checklist = self._generate_tech_checklist(tech_specs, scoring_rules)
         
         return {
             'success': True,
             'key_sections': key_sections,
             'ai_summary': ai_analysis,
-            'tech_specifications': tech_specs,
+            'tech_specifications': tech_specs[:MAX_TECH_SPECS],
             'scoring_rules': scoring_rules,
             'tech_checklist': tech_checklist,
             'metadata': {
-                'total_words': len(text_content),
+                'total_words': total_chars,
                 'key_points_count': len(tech_checklist)
-            }
+            },
+            # 段落索引供修订版增量解析使用，入库时单独保存（不随解析结果返回）
+            'section_index': section_index
         }
     
-    def _extract_key_sections(self, text: str) -> Dict:
-        """提取关键章节"""
-        sections = {
-            '项目概况': [],
-            '技术要求': [],
-            '商务条款': [],
-            '评分标准': [],
-            '合同条款': []
-        }
+    def _section_index(self, blocks: List[Dict], ai_job: Optional[ChunkedAIAnalysis], ai_analysis: Dict) -> Dict:
+        """段落索引：各段落块的提取结果，以及AI分析成功时各文本块的结果"""
+        ai_chunks = None
+        if ai_job is not None and 'error' not in ai_analysis:
+            ai_chunks = ai_job.chunk_results
+        return {'version': SECTION_INDEX_VERSION, 'blocks': blocks, 'ai_chunks': ai_chunks}
+    
+    def _collect_blocks(self, blocks: List[Dict], lines: List[str]) -> Tuple[Dict, List[Dict], List[Dict]]:
+        """按段落块记录的行偏移从全文中取出关键章节、技术规范和评分细则"""
+        sections = {section: [] for section in SECTION_KEYWORDS}
+        specs = []
+        rules = []
+        for block in blocks:
+            start = block['start']
+            for offset, section in block['section_lines']:
+                if len(sections[section]) < MAX_SECTION_LINES:
+                    sections[section].append(lines[start - 1 + offset].strip())
+            for offset in block['specs']:
+                specs.append({
+                    'line_number': start + offset,
+                    'content': lines[start - 1 + offset].strip(),
+                    'category': '技术规格'
+                })
+            for offset, score in block['rules']:
+                rules.append({
+                    'line_number': start + offset,
+                    'content': lines[start - 1 + offset].strip(),
+                    'score': score
+                })
+        return sections, specs, rules
+    
+    def _scan_pages(self, pages: Iterable[Dict], ai_job: Optional[ChunkedAIAnalysis] = None,
+                    recorder: Optional[BlockRecorder] = None, current_section: Optional[str] = None,
+                    first_line: int = 1) -> Tuple[Dict, List[Dict], List[Dict], int]:
+        """
+        逐行扫描文本，同时收集关键章节、技术规范和评分细则
         
-        # 使用关键词匹配提取章节
-        keywords_map = {
-            '项目概况': ['项目概况', '项目背景', '采购需求'],
-            '技术要求': ['技术要求', '技术规格', '技术参数', '功能需求'],
-            '商务条款': ['商务要求', '付款方式', '交货期'],
-            '评分标准': ['评分', '打分', '评审', '权重'],
-            '合同条款': ['合同', '违约', '质保']
-        }
+        参数:
+            pages: 页记录序列
+            ai_job: 分块AI分析任务，非空时全文各行同时送入分块
+            recorder: 段落块记录器，非空时同时记录各段落块的提取结果
+            current_section: 扫描开始时所在的章节（从文档中间开始扫描时使用）
+            first_line: 第一行的行号
         
-        lines = text.split('\n')
-        current_section = None
+        返回:
+            Tuple: (关键章节, 技术规范, 评分细则, 总字符数)
+        """
+        sections = {section: [] for section in SECTION_KEYWORDS}
+        specs = []
+        rules = []
+        total_chars = 0
+        line_number = first_line - 1
         
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
+        for page in pages:
+            total_chars += len(page['text'])
+            lines = page['text'].split('\n')
+            if page['text'].endswith('\n'):
+                lines.pop()
             
-            # 检测章节标题
-            for section, keywords in keywords_map.items():
-                if any(keyword in line for keyword in keywords):
-                    current_section = section
-                    break
-            
-            # 添加内容到对应章节
-            if current_section and len(line) > 10:
-                sections[current_section].append(line)
-        
-        # 限制每个章节的内容长度
-        for section in sections:
-            sections[section] = sections[section][:20]  # 保留前20行
+            for raw_line in lines:
+                line_number += 1
+                line = raw_line.strip()
+                if recorder is not None:
+                    recorder.add_line(line_number, line, current_section)
+                if not line:
+                    continue
+                
+                section, is_spec, score = self._match_line(line)
+                if ai_job is not None:
+                    ai_job.add_line(line, is_heading(line, section), line_number)
+                
+                # 关键章节
+                current_section = section or current_section
+                if current_section and len(line) > 10:
+                    if recorder is not None:
+                        recorder.add_section_line(line_number, current_section)
+                    if len(sections[current_section]) < MAX_SECTION_LINES:
+                        sections[current_section].append(line)
+                
+                # 技术规范
+                if is_spec:
+                    specs.append({
+                        'line_number': line_number,
+                        'content': line,
+                        'category': '技术规格'
+                    })
+                    if recorder is not None:
+                        recorder.add_spec(line_number)
+                
+                # 评分细则（包含分值的行）
+                if score is not None:
+                    rules.append({
+                        'line_number': line_number,
+                        'content': line,
+                        'score': score
+                    })
+                    if recorder is not None:
+                        recorder.add_rule(line_number, score)
         
-        return sections
+        if recorder is not None:
+            recorder.finish(current_section)
+        record_volume('analyzer.scan', lines=line_number - first_line + 1, chars=total_chars)
+        return sections, specs, rules, total_chars
     
-    def _ai_deep_analysis(self, text: str, key_sections: Dict) -> Dict:
-        """使用AI进行深度分析"""
-        # 构建提示词
-        prompt = f"""请对以下标书内容进行专业分析，包括：
-1. 核心需求总结（200字以内）
-2. 关键技术要点（列举5-10个）
-3. 重要时间节点
-4. 潜在风险点
-5. 建议关注事项
-
-标书关键章节：
-{json.dumps(key_sections, ensure_ascii=False, indent=2)[:2000]}
-
-请以JSON格式返回分析结果。"""
+    def _match_line(self, line: str) -> Tuple[Optional[str], bool, Optional[int]]:
+        """
+        单次扫描一行文本
+        
+        返回:
+            Tuple: (命中的章节名, 是否技术规范行, 第一个分值)
+        """
+        section_rank = None
+        is_spec = False
+        score = None
         
-        # 调用AI API（这里使用模拟数据，实际需要配置真实API）
-        if not self.api_key:
+        for match in LINE_PATTERN.finditer(line):
+            keyword = match.group('keyword')
+            if keyword:
+                rank, spec = KEYWORD_TAGS[keyword]
+                if rank is not None and (section_rank is None or rank < section_rank):
+                    section_rank = rank
+                is_spec = is_spec or spec
+            elif score is None:
+                score = int(match.group('score'))
+        
+        section = SECTION_NAMES[section_rank] if section_rank is not None else None
+        return section, is_spec, score
+    
+    def _ai_deep_analysis(self, ai_job: Optional[ChunkedAIAnalysis],
+                          reused_chunks: Optional[List[Dict]] = None) -> Dict:
+        """使用AI进行深度分析（汇总各文本块的分析结果，reused_chunks 为复用的原版文本块结果）"""
+        # 未配置API密钥时使用模拟数据
+        if ai_job is None:
             return self._mock_ai_analysis()
         
         try:
-            # TODO: 实际集成文心一言API
-            # response = requests.post(self.api_url, json={
-            #     'messages': [{'role': 'user', 'content': prompt}]
-            # }, headers={'Authorization': f'Bearer {self.api_key}'})
-            # return response.json()
-            
-            return self._mock_ai_analysis()
+            return ai_job.finish(reused_chunks)
         except Exception as e:
             return {
                 'error': f'AI分析失败: {str(e)}',
@@ -171,67 +429,21 @@ class BidAnalyzer:
             ]
         }
     
-    def _extract_tech_specifications(self, text: str) -> List[Dict]:
-        """提取技术规范"""
-        specs = []
-        
-        # 使用正则提取技术参数
-        param_patterns = [
-            r'(\d+)\s*(核|路|GB|TB|Mbps|台|套)',
-            r'(CPU|内存|硬盘|带宽|处理器)[:：]\s*([^\n]+)',
-        ]
-        
-        lines = text.split('\n')
-        for i, line in enumerate(lines):
-            if any(keyword in line for keyword in ['配置', '参数', '规格', '要求']):
-                specs.append({
-                    'line_number': i + 1,
-                    'content': line.strip(),
-                    'category': '技术规格'
-                })
-        
-        return specs[:50]  # 限制返回数量
-    
-    def _extract_scoring_rules(self, text: str) -> List[Dict]:
-        """提取评分细则"""
-        rules = []
-        
-        lines = text.split('\n')
-        for i, line in enumerate(lines):
-            # 查找包含分值的行
-            if re.search(r'\d+\s*分', line):
-                rules.append({
-                    'line_number': i + 1,
-                    'content': line.strip(),
-                    'score': self._extract_score(line)
-                })
-        
-        return rules
-    
-    def _extract_score(self, text: str) -> int:
-        """从文本中提取分值"""
-        match = re.search(r'(\d+)\s*分', text)
-        return int(match.group(1)) if match else 0
-    
     def _generate_tech_checklist(self, specs: List[Dict], rules: List[Dict]) -> List[Dict]:
         """生成技术条款清单"""
         checklist = []
         
-        # 合并技术规格和评分规则
-        for spec in specs[:20]:
+        # 评分细则建一次倒排索引，每条技术规格按共有词查找最相近的细则
+        rule_index = RuleIndex(rules)
+        for spec in specs:
+            rule = rule_index.match(spec['content'])
             item = {
                 'item': spec['content'],
                 'page': spec['line_number'],
-                'score': 0,
+                'score': rule['score'] if rule else 0,
                 'priority': 'medium'
             }
             
-            # 匹配对应的评分
-            for rule in rules:
-                if any(word in rule['content'] for word in spec['content'].split()[:3]):
-                    item['score'] = rule['score']
-                    break
-            
             # 根据分值设置优先级
             if item['score'] >= 10:
                 item['priority'] = 'high'
@@ -251,33 +463,69 @@ class BidAnalyzer:
         return checklist
 
 
-def analyze_bid(file_path: str) -> Dict:
+def analyze_bid(file_path: str, progress_callback: Optional[Callable[[float], None]] = None) -> Dict:
     """
     标书分析入口函数
     
+    提取缓存未命中时逐页流式解析，内存占用只与单页大小有关；
+    命中缓存时缓存中保存的是完整文本，解析期间整份文本都在内存中
+    
     参数:
         file_path: 标书文件路径
+        progress_callback: 进度回调，参数为0~1之间的完成比例
     
     返回:
         Dict: 分析结果
     """
-    from .document_processor import process_document
-    
-    # 先处理文档提取文本
-    doc_result = process_document(file_path)
-    
-    if not doc_result.get('success'):
-        return doc_result
+    file_extension = os.path.splitext(file_path)[1].lower()
+    if file_extension not in SUPPORTED_EXTENSIONS:
+        return {
+            'success': False,
+            'error': '不支持的文件格式'
+        }
     
-    # 使用分析器进行解析
     analyzer = BidAnalyzer()
-    analysis_result = analyzer.analyze(doc_result['text_content'])
+    
+    try:
+        # 上传时已提取过的文档直接使用缓存文本，否则逐页流式解析
+        text_content = load_cached_text(file_path)
+        if text_content is not None:
+            pages = text_as_pages(text_content)
+        else:
+            pages = iter_document_pages(file_path)
+        analysis_result = analyzer.analyze_pages(pages, progress_callback)
+    except Exception as e:
+        return {
+            'success': False,
+            'error': f'文档处理失败: {str(e)}'
+        }
     
     # 合并文档信息
     analysis_result['document_info'] = {
-        'file_name': doc_result['file_name'],
-        'file_type': doc_result['file_type'],
-        'text_length': doc_result['text_length']
+        'file_name': os.path.basename(file_path),
+        'file_type': file_extension,
+        'text_length': analysis_result['metadata']['total_words']
     }
     
-    return analysis_result
\ No newline at end of file
+    return analysis_result
+
+def analyze_amendment(text_content: str, base_index: Dict,
+                      progress_callback: Optional[Callable[[float], None]] = None) -> Dict:
+    """
+    修订版标书增量解析入口函数
+    
+    参数:
+        text_content: 修订版全文
+        base_index: 原版解析结果的段落索引
+        progress_callback: 进度回调，参数为0~1之间的完成比例
+    
+    返回:
+        Dict: 分析结果（含 amendment 变更信息，不含 document_info）
+    """
+    try:
+        return BidAnalyzer().analyze_amendment(text_content, base_index, progress_callback)
+    except Exception as e:
+        return {
+            'success': False,
+            'error': f'文档处理失败: {str(e)}'
+        }
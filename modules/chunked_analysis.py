@@ -0,0 +1,261 @@
+"""
+分块AI分析模块
+按章节边界把全文切分为不超过token预算的文本块，各块并发调用大模型（map），
+再把各块结果合并为统一的AI分析结构（reduce）
+"""
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .instrumentation import submit
+
+# 一级标题：第X章/第X部分、"一、"等
+HEADING_PATTERN = re.compile(r'^(第[一二三四五六七八九十百零\d]+[章节篇部分]|[一二三四五六七八九十]+[、.．])')
+
+CJK_PATTERN = re.compile(r'[㐀-鿿豈-﫿]')
+
+MAP_PROMPT = """以下是一份标书的部分内容，请对这部分内容进行专业分析，包括：
+1. 核心需求总结（200字以内）
+2. 关键技术要点（列举5-10个）
+3. 重要时间节点
+4. 潜在风险点
+5. 建议关注事项
+
+标书内容：
+{content}
+
+请以JSON格式返回分析结果，没有相关内容的项返回空值。"""
+
+# 合并后各列表项保留的条目数
+MAX_MERGED_ITEMS = 20
+MAX_SUMMARY_LENGTH = 500
+
+
+def estimate_tokens(text: str) -> int:
+    """估算文本token数：中文约1字1个token，其他字符约4个1个token"""
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def parse_ai_result(result: str) -> Dict:
+    """解析AI返回的JSON文本（兼容包裹在```json代码块中的返回）"""
+    text = result.strip()
+    if text.startswith('```'):
+        text = text.split('\n', 1)[1] if '\n' in text else ''
+        text = text.rsplit('```', 1)[0]
+
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        parsed = None
+
+    if isinstance(parsed, dict):
+        return parsed
+    return {'核心需求总结': result.strip()}
+
+
+def merge_ai_summaries(results: List[Dict]) -> Dict:
+    """
+    合并各文本块的分析结果
+
+    文本项去重后拼接，列表项去重合并，字典项按键合并（先出现的优先）
+
+    参数:
+        results: 按文档顺序排列的分块分析结果
+
+    返回:
+        Dict: 与单次分析相同结构的结果
+    """
+    merged = {}
+    texts = {}
+    for result in results:
+        for key, value in result.items():
+            if not value:
+                continue
+
+            if isinstance(value, dict):
+                entries = merged.setdefault(key, {})
+                if isinstance(entries, dict):
+                    for name, item in value.items():
+                        entries.setdefault(name, item)
+            elif isinstance(value, list):
+                items = merged.setdefault(key, [])
+                if isinstance(items, list):
+                    for item in value:
+                        if item not in items and len(items) < MAX_MERGED_ITEMS:
+                            items.append(item)
+            else:
+                parts = texts.setdefault(key, [])
+                if str(value) not in parts:
+                    parts.append(str(value))
+
+    for key, parts in texts.items():
+        merged.setdefault(key, '；'.join(parts)[:MAX_SUMMARY_LENGTH])
+
+    # 保持各项首次出现的顺序
+    order = list(dict.fromkeys(key for result in results for key in result))
+    return {key: merged[key] for key in order if key in merged}
+
+
+def is_heading(line: str, section: Optional[str]) -> bool:
+    """判断一行是否为可切分的章节标题（编号标题，或命中章节关键词的短行）"""
+    return bool(HEADING_PATTERN.match(line)) or (section is not None and len(line) <= 30)
+
+
+class SectionChunker:
+    """按章节边界切分文本块"""
+
+    def __init__(self, token_budget: int):
+        """
+        参数:
+            token_budget: 每个文本块的token上限
+        """
+        self.token_budget = token_budget
+        # 已输出各文本块的起止行号（调用 add_line 时传入行号才有意义）
+        self.chunk_lines = []
+        self._chunk = []
+        self._chunk_lines = []
+        self._chunk_tokens = 0
+        self._section = []
+        self._section_lines = []
+        self._section_tokens = 0
+
+    def add_line(self, line: str, heading: bool = False, line_number: Optional[int] = None) -> List[str]:
+        """
+        加入一行文本
+
+        参数:
+            line: 行文本
+            heading: 是否为章节标题（标题处可以切分）
+            line_number: 行号，用于记录各文本块覆盖的行范围
+
+        返回:
+            List[str]: 本次凑满的文本块
+        """
+        completed = []
+        if heading:
+            completed.extend(self._close_section())
+
+        for piece in self._split_long_line(line):
+            tokens = estimate_tokens(piece) + 1
+            # 单个章节超出预算时，在行边界处切分
+            if self._section and self._section_tokens + tokens > self.token_budget:
+                completed.extend(self._close_section())
+            self._section.append(piece)
+            self._section_lines.append(line_number)
+            self._section_tokens += tokens
+
+        return completed
+
+    def finish(self) -> List[str]:
+        """输出剩余的文本块"""
+        completed = self._close_section()
+        if self._chunk:
+            completed.append(self._emit_chunk())
+        return completed
+
+    def _close_section(self) -> List[str]:
+        """把当前章节并入文本块，块满时输出"""
+        completed = []
+        if not self._section:
+            return completed
+
+        if self._chunk and self._chunk_tokens + self._section_tokens > self.token_budget:
+            completed.append(self._emit_chunk())
+
+        self._chunk.extend(self._section)
+        self._chunk_lines.extend(self._section_lines)
+        self._chunk_tokens += self._section_tokens
+        self._section = []
+        self._section_lines = []
+        self._section_tokens = 0
+        return completed
+
+    def _emit_chunk(self) -> str:
+        """输出当前文本块并记录其行范围"""
+        chunk = '\n'.join(self._chunk)
+        self.chunk_lines.append([self._chunk_lines[0], self._chunk_lines[-1]])
+        self._chunk = []
+        self._chunk_lines = []
+        self._chunk_tokens = 0
+        return chunk
+
+    def _split_long_line(self, line: str) -> List[str]:
+        """超出预算的单行按字符切开"""
+        if estimate_tokens(line) < self.token_budget:
+            return [line]
+        step = max(self.token_budget // 2, 1)
+        return [line[i:i + step] for i in range(0, len(line), step)]
+
+
+class ChunkedAIAnalysis:
+    """分块并发的AI分析"""
+
+    def __init__(self, llm_client, api_key: str, token_budget: int = 2000, secret_key: str = ''):
+        """
+        参数:
+            llm_client: 大模型客户端（见 llm_client.LLMClient）
+            api_key: API Key
+            token_budget: 每个文本块的token上限
+            secret_key: Secret Key
+        """
+        self.llm_client = llm_client
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.chunker = SectionChunker(token_budget)
+        # 线程池在提交第一个文本块时创建
+        self._executor = None
+        self._futures = []
+        # finish() 后为各文本块的分析结果：lines（起止行号）、result
+        self.chunk_results = None
+
+    def add_line(self, line: str, heading: bool = False, line_number: Optional[int] = None):
+        """加入一行文本，凑满的文本块立即提交分析"""
+        for chunk in self.chunker.add_line(line, heading, line_number):
+            self._submit(chunk)
+
+    def flush(self):
+        """提交尚未凑满的文本块（之后加入的行不与之前的行合并到同一块）"""
+        for chunk in self.chunker.finish():
+            self._submit(chunk)
+
+    def finish(self, extra_results: Optional[List[Dict]] = None) -> Dict:
+        """
+        等待全部文本块分析完成并合并结果
+
+        参数:
+            extra_results: 需要一并合并的已有文本块结果（含 lines、result），按起始行号与本次结果排序
+        """
+        self.flush()
+
+        try:
+            results = [future.result() for future in self._futures]
+        finally:
+            self.close()
+
+        chunk_results = [{'lines': lines, 'result': result}
+                         for lines, result in zip(self.chunker.chunk_lines, results)]
+        self.chunk_results = sorted(chunk_results + list(extra_results or []), key=lambda chunk: chunk['lines'][0])
+        return merge_ai_summaries([chunk['result'] for chunk in self.chunk_results])
+
+    def close(self):
+        """关闭线程池并取消尚未开始的文本块（解析中途出错时也需调用）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _submit(self, chunk: str):
+        if self._executor is None:
+            # 线程数与客户端并发上限一致，实际请求速率仍由客户端限流
+            self._executor = ThreadPoolExecutor(max_workers=max(self.llm_client.max_concurrency, 1),
+                                                thread_name_prefix='bidspeed-ai')
+        self._futures.append(submit(self._executor, self._analyze_chunk, chunk))
+
+    def _analyze_chunk(self, chunk: str) -> Dict:
+        # 提示词不含块序号，文档局部修改时未变化的块仍能命中响应缓存
+        prompt = MAP_PROMPT.format(content=chunk)
+        response = self.llm_client.chat([{'role': 'user', 'content': prompt}],
+                                        api_key=self.api_key, secret_key=self.secret_key)
+        return parse_ai_result(response.get('result', ''))
+
@@ -0,0 +1,33 @@
+"""
+配置加载模块
+统一读取 config.json，供各功能模块获取配置项
+"""
+import json
+from functools import lru_cache
+from typing import Dict
+
+CONFIG_PATH = 'config.json'
+
+
+@lru_cache(maxsize=1)
+def load_config() -> Dict:
+    """读取配置文件（进程内只读取一次），读取失败时返回空配置"""
+    try:
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def get_config(section: str) -> Dict:
+    """
+    获取某个配置段
+
+    参数:
+        section: 配置段名称，如 'ai_service'
+
+    返回:
+        Dict: 配置段内容，不存在时返回空字典
+    """
+    value = load_config().get(section)
+    return value if isinstance(value, dict) else {}
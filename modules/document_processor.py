@@ -3,38 +3,129 @@
 支持PDF、Word等格式的文档解析
 """
 import os
+import codecs
+import mmap
+import threading
+import zipfile
+from xml.etree import ElementTree
+from concurrent.futures import ProcessPoolExecutor
 import PyPDF2
-from docx import Document
 
-def process_document(file_path):
+from .config_loader import get_config
+from .extraction_cache import ExtractionCache, compute_file_hash
+from .instrumentation import record_cache, record_volume, stage
+from .ocr import get_pdf_ocr, page_fingerprint
+
+# 提取器版本号，修改提取逻辑后需要递增，使旧的提取缓存失效
+EXTRACTOR_VERSION = '3'
+
+SUPPORTED_EXTENSIONS = ['.pdf', '.docx', '.doc', '.txt']
+
+# Word/TXT没有物理分页，按固定行数分块作为"页"
+PAGE_LINES = 200
+
+# DOCX正文中用到的元素
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY, W_P, W_R, W_T = f'{W_NS}body', f'{W_NS}p', f'{W_NS}r', f'{W_NS}t'
+W_TR, W_TC, W_BR, W_TYPE = f'{W_NS}tr', f'{W_NS}tc', f'{W_NS}br', f'{W_NS}type'
+MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+
+# 文字块中表示字符的元素（换行只计文本换行，分页符不输出）
+DOCX_RUN_CHARS = {
+    f'{W_NS}tab': '\t',
+    f'{W_NS}ptab': '\t',
+    W_BR: '\n',
+    f'{W_NS}cr': '\n',
+    f'{W_NS}noBreakHyphen': '-'
+}
+
+# TXT按块解码的块大小，以及判断编码时每处采样的字节数
+TXT_CHUNK_BYTES = 4 * 1024 * 1024
+TXT_SAMPLE_BYTES = 64 * 1024
+
+# BOM -> 编码（UTF-32的BOM以UTF-16的BOM开头，需先检查）
+TXT_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+]
+
+# 每个进程分配的PDF页码段数
+PDF_TASKS_PER_WORKER = 4
+
+_extraction_cache = None
+
+_pdf_executor = None
+_pdf_executor_workers = 0
+_pdf_executor_lock = threading.Lock()
+
+# 批量解析时各工作进程已并行处理不同文档，单份PDF不再启用页级并行
+_pdf_parallel_enabled = True
+
+def get_extraction_cache():
+    """获取进程内共享的提取缓存，配置中关闭缓存时返回None"""
+    global _extraction_cache
+    
+    cache_config = get_config('extraction_cache')
+    if not cache_config.get('enabled', True):
+        return None
+    
+    if _extraction_cache is None:
+        # 扫描页的提取结果取决于OCR是否可用，两种情况分别缓存
+        version = f'{EXTRACTOR_VERSION}+ocr' if get_pdf_ocr() else EXTRACTOR_VERSION
+        _extraction_cache = ExtractionCache(
+            cache_dir=cache_config.get('path', 'data/extraction_cache'),
+            version=version,
+            memory_limit_bytes=int(cache_config.get('memory_limit_mb', 64)) * 1024 * 1024
+        )
+    return _extraction_cache
+
+def process_document(file_path, use_cache=True, file_hash=None):
     """
     处理上传的文档，提取文本内容
     
+    返回结果中包含完整文本（用于入库、提取缓存和近似重复签名），内存占用与文档大小成正比；
+    只需解析时使用 iter_document_pages 逐页读取
+    
     参数:
         file_path: 文件路径
+        use_cache: 是否使用提取缓存（相同内容的文件只提取一次）
+        file_hash: 已知的文件内容哈希（上传时已计算），省略时读取文件计算
     
     返回:
         dict: 包含文件信息和提取内容的字典
     """
     file_extension = os.path.splitext(file_path)[1].lower()
     
+    if file_extension not in SUPPORTED_EXTENSIONS:
+        return {
+            'success': False,
+            'error': '不支持的文件格式'
+        }
+    
     try:
-        if file_extension == '.pdf':
-            text_content = extract_pdf_text(file_path)
-        elif file_extension in ['.docx', '.doc']:
-            text_content = extract_word_text(file_path)
-        elif file_extension == '.txt':
-            text_content = extract_txt_text(file_path)
-        else:
-            return {
-                'success': False,
-                'error': '不支持的文件格式'
-            }
+        file_hash = file_hash or compute_file_hash(file_path)
+        cache = get_extraction_cache() if use_cache else None
+        text_content = cache.get(file_hash) if cache else None
+        from_cache = text_content is not None
+        if cache:
+            record_cache('extraction', from_cache)
+        
+        if text_content is None:
+            with stage('document.extract'):
+                text_content = extract_text(file_path)
+            record_volume('document.extract', bytes=os.path.getsize(file_path), chars=len(text_content))
+            if cache:
+                cache.put(file_hash, text_content)
         
         return {
             'success': True,
             'file_name': os.path.basename(file_path),
             'file_type': file_extension,
+            'file_hash': file_hash,
+            'from_cache': from_cache,
             'text_content': text_content,
             'text_length': len(text_content)
         }
@@ -45,49 +136,355 @@ def process_document(file_path):
             'error': f'文档处理失败: {str(e)}'
         }
 
+def load_cached_text(file_path):
+    """读取已缓存的提取文本，未命中或缓存关闭时返回None"""
+    cache = get_extraction_cache()
+    if cache is None:
+        return None
+    text = cache.get(compute_file_hash(file_path))
+    record_cache('extraction', text is not None)
+    return text
+
+def extract_text(file_path):
+    """提取完整文本（按页拼接）"""
+    return ''.join(page['text'] for page in iter_document_pages(file_path))
+
+def iter_document_pages(file_path):
+    """
+    逐页提取文档文本（生成器）
+    
+    PDF按物理页输出；Word和TXT没有分页信息，按每PAGE_LINES行（段落）分块输出。
+    每页文本都以完整的行结束，按顺序拼接即为完整文本。
+    
+    参数:
+        file_path: 文件路径
+    
+    返回:
+        Iterator[dict]: 页记录，包含页码、文本及其在全文中的字符起止偏移
+    """
+    file_extension = os.path.splitext(file_path)[1].lower()
+    
+    if file_extension == '.pdf':
+        page_texts = _iter_pdf_pages(file_path)
+    elif file_extension in ['.docx', '.doc']:
+        page_texts = _iter_word_pages(file_path)
+    elif file_extension == '.txt':
+        page_texts = _iter_txt_pages(file_path)
+    else:
+        raise Exception('不支持的文件格式')
+    
+    offset = 0
+    for page_number, page_text in enumerate(page_texts, 1):
+        yield {
+            'page_number': page_number,
+            'text': page_text,
+            'start_offset': offset,
+            'end_offset': offset + len(page_text)
+        }
+        offset += len(page_text)
+
+def text_as_pages(text):
+    """将已提取的完整文本包装为单页记录序列"""
+    return [{
+        'page_number': 1,
+        'text': text,
+        'start_offset': 0,
+        'end_offset': len(text)
+    }]
+
 def extract_pdf_text(pdf_path):
     """从PDF文件提取文本"""
-    text = ""
+    return ''.join(_iter_pdf_pages(pdf_path))
+
+def extract_word_text(word_path):
+    """从Word文件提取文本"""
+    return ''.join(_iter_word_pages(word_path))
+
+def extract_txt_text(txt_path):
+    """从TXT文件提取文本"""
+    return ''.join(_iter_txt_pages(txt_path))
+
+def _iter_pdf_pages(pdf_path):
+    """逐页读取PDF文本，页数达到阈值时使用多进程并行提取，没有文字层的扫描页用OCR识别"""
     try:
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text() + "\n"
+        ocr = get_pdf_ocr()
+        pages = _iter_pdf_text_layers(pdf_path, ocr.min_text_chars if ocr else None)
+        if ocr is not None:
+            texts = ocr.fill_pages(pdf_path, pages, parallel=_pdf_parallel_enabled)
+        else:
+            texts = (text for text, _ in pages)
+        for text in texts:
+            yield text + "\n"
     except Exception as e:
         raise Exception(f"PDF解析错误: {str(e)}")
+
+def _iter_pdf_text_layers(pdf_path, ocr_min_chars=None):
+    """
+    逐页读取PDF文字层，输出 (文本, 页面内容哈希)
+
+    只有文字层少于 ocr_min_chars 个字符（需要OCR）的页面计算内容哈希，其余为None
+    """
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        page_count = len(pdf_reader.pages)
+        workers, threshold = _pdf_parallel_settings()
+        
+        if workers <= 1 or page_count < threshold:
+            for page in pdf_reader.pages:
+                yield _read_pdf_page(page, ocr_min_chars)
+            return
     
-    return text
+    yield from _iter_pdf_pages_parallel(pdf_path, page_count, workers, ocr_min_chars)
 
-def extract_word_text(word_path):
-    """从Word文件提取文本"""
-    text = ""
+def _read_pdf_page(page, ocr_min_chars=None):
+    """读取单页文字层，需要OCR时附带页面内容哈希"""
+    text = page.extract_text()
+    if ocr_min_chars is not None and len(''.join(text.split())) < ocr_min_chars:
+        return text, page_fingerprint(page)
+    return text, None
+
+def disable_parallel_pdf():
+    """关闭当前进程的PDF页级并行提取（在批量解析的工作进程中调用）"""
+    global _pdf_parallel_enabled
+    _pdf_parallel_enabled = False
+
+def _pdf_parallel_settings():
+    """读取并行提取配置，返回 (进程数, 启用并行的页数阈值)"""
+    processing_config = get_config('document_processing')
+    if not _pdf_parallel_enabled:
+        return 1, int(processing_config.get('pdf_parallel_threshold_pages', 50))
+    workers = int(processing_config.get('pdf_workers', 0)) or os.cpu_count() or 1
+    threshold = int(processing_config.get('pdf_parallel_threshold_pages', 50))
+    return workers, threshold
+
+def _get_pdf_executor(workers):
+    """获取进程内共享的PDF提取进程池，避免每份文档都重新启动进程"""
+    global _pdf_executor, _pdf_executor_workers
+    
+    with _pdf_executor_lock:
+        if _pdf_executor is None or _pdf_executor_workers != workers:
+            if _pdf_executor is not None:
+                _pdf_executor.shutdown(wait=False)
+            _pdf_executor = ProcessPoolExecutor(max_workers=workers)
+            _pdf_executor_workers = workers
+        return _pdf_executor
+
+def _iter_pdf_pages_parallel(pdf_path, page_count, workers, ocr_min_chars=None):
+    """将页码范围切分给多个进程提取，按页序输出结果"""
+    # 每个进程分配多段页码，避免个别页面特别慢时其余进程空等
+    task_count = min(page_count, workers * PDF_TASKS_PER_WORKER)
+    pages_per_task = -(-page_count // task_count)
+    ranges = [(start, min(start + pages_per_task, page_count))
+              for start in range(0, page_count, pages_per_task)]
+    
+    executor = _get_pdf_executor(workers)
+    futures = [executor.submit(_extract_pdf_page_range, pdf_path, start, end, ocr_min_chars)
+               for start, end in ranges]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+def _extract_pdf_page_range(pdf_path, start, end, ocr_min_chars=None):
+    """提取PDF中 [start, end) 页的文字层（在子进程中执行）"""
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [_read_pdf_page(pdf_reader.pages[i], ocr_min_chars) for i in range(start, end)]
+
+def _iter_word_pages(word_path):
+    """按段落和表格行分块读取Word文本"""
     try:
-        doc = Document(word_path)
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
+        block = []
+        for line in _iter_docx_lines(word_path):
+            block.append(line + "\n")
+            if len(block) >= PAGE_LINES:
+                yield ''.join(block)
+                block = []
+        if block:
+            yield ''.join(block)
     except Exception as e:
         raise Exception(f"Word解析错误: {str(e)}")
+
+def _iter_docx_lines(word_path):
+    """
+    从ZIP包中直接增量解析正文XML，按文档顺序输出文本行（不构建python-docx对象树）
+
+    每个段落一行；表格每行一行，单元格之间用制表符分隔（单元格内多个段落以空格连接，
+    嵌套表格并入所在单元格）。文本框内的段落并入所在段落，修订中已删除的文字和域代码不输出
+    """
+    if not zipfile.is_zipfile(word_path):
+        raise ValueError('不是有效的DOCX文件')
     
-    return text
+    with zipfile.ZipFile(word_path) as archive:
+        with archive.open(_docx_main_part(archive)) as xml_file:
+            # 容器栈：('p', 文本片段) / ('tc', 段落文本) / ('tr', 单元格文本)
+            stack = []
+            run_depth = 0
+            skip_depth = 0
+            depth = 0
+            body = None
+            for event, elem in ElementTree.iterparse(xml_file, events=('start', 'end')):
+                tag = elem.tag
+                if event == 'start':
+                    depth += 1
+                    if skip_depth or tag == MC_FALLBACK:
+                        # 兼容性内容的备用版本与首选版本重复
+                        skip_depth += 1
+                    elif tag == W_P or tag == W_TC or tag == W_TR:
+                        stack.append((tag, []))
+                    elif tag == W_R:
+                        run_depth += 1
+                    elif tag == W_BODY:
+                        body = elem
+                    continue
+                
+                depth -= 1
+                if skip_depth:
+                    skip_depth -= 1
+                    elem.clear()
+                    continue
+                
+                if tag == W_T:
+                    if stack and stack[-1][0] == W_P:
+                        stack[-1][1].append(elem.text or '')
+                elif tag == W_R:
+                    run_depth -= 1
+                elif run_depth and stack and stack[-1][0] == W_P and tag in DOCX_RUN_CHARS:
+                    if tag != W_BR or elem.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                        stack[-1][1].append(DOCX_RUN_CHARS[tag])
+                elif tag == W_P:
+                    text = ''.join(stack.pop()[1])
+                    if not stack:
+                        yield text
+                    elif stack[-1][0] == W_P:
+                        # 文本框中的段落
+                        if text:
+                            stack[-1][1].append(' ' + text)
+                    else:
+                        stack[-1][1].append(text)
+                    elem.clear()
+                elif tag == W_TC:
+                    cell = ' '.join(text for text in stack.pop()[1] if text)
+                    if stack:
+                        stack[-1][1].append(cell)
+                elif tag == W_TR:
+                    cells = stack.pop()[1]
+                    if not stack:
+                        yield '\t'.join(cells)
+                    else:
+                        stack[-1][1].append(' '.join(cell for cell in cells if cell))
+                    elem.clear()
+                
+                # 正文的直接子元素处理完后释放，内存只与单个段落或表格行有关
+                if depth == 2 and body is not None:
+                    body.clear()
 
-def extract_txt_text(txt_path):
-    """从TXT文件提取文本"""
-    text = ""
+def _docx_main_part(archive):
+    """从包关系中找到正文部件的路径（通常为 word/document.xml）"""
     try:
-        with open(txt_path, 'r', encoding='utf-8') as file:
-            text = file.read()
-    except UnicodeDecodeError:
-        # 尝试其他编码
-        try:
-            with open(txt_path, 'r', encoding='gbk') as file:
-                text = file.read()
-        except Exception as e:
-            raise Exception(f"TXT解析错误: {str(e)}")
+        with archive.open('_rels/.rels') as rels_file:
+            for relationship in ElementTree.parse(rels_file).getroot():
+                if relationship.get('Type', '').endswith('/officeDocument'):
+                    return relationship.get('Target').lstrip('/')
+    except KeyError:
+        pass
+    return 'word/document.xml'
+
+def _iter_txt_pages(txt_path):
+    """
+    按行分块读取TXT文本
+
+    文件以内存映射方式读取：先从有限的采样中判断编码，再按块增量解码，
+    全文只读取一次，内存占用只与块大小有关
+    """
+    try:
+        with open(txt_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                encoding = _detect_txt_encoding(data)
+                block = []
+                remainder = ''
+                for text in _iter_decoded_text(data, encoding):
+                    lines = text.split('\n')
+                    # 只有最后一块可能以不带换行符的行结束
+                    remainder = lines.pop()
+                    if block:
+                        lines = block + lines
+                    full = len(lines) - len(lines) % PAGE_LINES
+                    for start in range(0, full, PAGE_LINES):
+                        yield '\n'.join(lines[start:start + PAGE_LINES]) + '\n'
+                    block = lines[full:]
+                if block or remainder:
+                    yield ('\n'.join(block) + '\n' if block else '') + remainder
     except Exception as e:
         raise Exception(f"TXT解析错误: {str(e)}")
+
+def _iter_decoded_text(data, encoding):
+    """
+    按块增量解码，输出以完整行结束的文本块（行尾统一为\n，与文本模式读取一致）
+
+    个别无法解码的字节替换为U+FFFD，不会因此重新读取整个文件
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    pending = ''
+    for start in range(0, len(data), TXT_CHUNK_BYTES):
+        text = pending + decoder.decode(data[start:start + TXT_CHUNK_BYTES])
+        # \r\n 可能被块边界分开，结尾的 \r 留到下一块处理
+        held = text.endswith('\r')
+        if held:
+            text = text[:-1]
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        cut = text.rfind('\n') + 1
+        pending = text[cut:] + ('\r' if held else '')
+        if cut:
+            yield text[:cut]
     
-    return text
+    tail = (pending + decoder.decode(b'', final=True)).replace('\r\n', '\n').replace('\r', '\n')
+    if tail:
+        yield tail
+
+def _detect_txt_encoding(data):
+    """
+    从文件开头、中间和结尾的采样判断编码
+
+    依次检查BOM、UTF-16特征（大量NUL字节）、UTF-8合法性，否则按GB18030（兼容GBK/GB2312）处理
+    """
+    for bom, encoding in TXT_BOMS:
+        if data[:len(bom)] == bom:
+            return encoding
+    
+    size = len(data)
+    offsets = sorted({0, max(size // 2 - TXT_SAMPLE_BYTES // 2, 0), max(size - TXT_SAMPLE_BYTES, 0)})
+    samples = [data[offset:offset + TXT_SAMPLE_BYTES] for offset in offsets]
+    
+    head = samples[0]
+    if head.count(0) > len(head) // 16:
+        # 没有BOM的UTF-16：ASCII字符的高位字节为0（UTF-8和GB18030文本中不会出现NUL）
+        return 'utf-16-le' if head[1::2].count(0) > head[0::2].count(0) else 'utf-16-be'
+    
+    if all(_is_utf8_sample(sample, offset == 0, offset + len(sample) >= size)
+           for offset, sample in zip(offsets, samples)):
+        return 'utf-8'
+    return 'gb18030'
+
+def _is_utf8_sample(sample, at_start, at_end):
+    """采样是否为合法UTF-8（忽略采样边界处被截断的多字节字符）"""
+    if not at_start:
+        # 跳过开头的续字节（0b10xxxxxx）
+        skip = 0
+        while skip < min(len(sample), 3) and 0x80 <= sample[skip] <= 0xBF:
+            skip += 1
+        sample = sample[skip:]
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        decoder.decode(sample, final=at_end)
+        return True
+    except UnicodeDecodeError:
+        return False
 
 def clean_text(text):
     """清理提取的文本"""
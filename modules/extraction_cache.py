@@ -0,0 +1,117 @@
+"""
+文本提取缓存模块
+以文件内容的SHA-256为键缓存文档提取结果，包含内存LRU层和磁盘持久层
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def compute_file_hash(file_path: str) -> str:
+    """分块读取文件并计算SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """文本提取缓存"""
+
+    def __init__(self, cache_dir: str, version: str, memory_limit_bytes: int = 64 * 1024 * 1024):
+        """
+        初始化缓存
+
+        参数:
+            cache_dir: 磁盘缓存目录
+            version: 提取器版本号，版本不一致的缓存条目视为失效
+            memory_limit_bytes: 内存层容量上限（按文本字符数估算）
+        """
+        self.cache_dir = cache_dir
+        self.version = version
+        self.memory_limit_bytes = memory_limit_bytes
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+
+    def get(self, file_hash: str) -> Optional[str]:
+        """读取缓存文本，未命中时返回None"""
+        with self._lock:
+            text = self._memory.get(file_hash)
+            if text is not None:
+                self._memory.move_to_end(file_hash)
+                return text
+
+        text = self._read_disk(file_hash)
+        if text is not None:
+            self._remember(file_hash, text)
+        return text
+
+    def put(self, file_hash: str, text: str):
+        """写入缓存（同时写入内存层和磁盘层）"""
+        self._write_disk(file_hash, text)
+        self._remember(file_hash, text)
+
+    def clear(self):
+        """清空内存层"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+
+    def _remember(self, file_hash: str, text: str):
+        """放入内存LRU层，超出容量时淘汰最久未使用的条目"""
+        size = len(text)
+        if size > self.memory_limit_bytes:
+            return
+
+        with self._lock:
+            old = self._memory.pop(file_hash, None)
+            if old is not None:
+                self._memory_size -= len(old)
+
+            self._memory[file_hash] = text
+            self._memory_size += size
+
+            while self._memory_size > self.memory_limit_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    def _disk_path(self, file_hash: str) -> str:
+        return os.path.join(self.cache_dir, file_hash[:2], f'{file_hash}.json')
+
+    def _read_disk(self, file_hash: str) -> Optional[str]:
+        path = self._disk_path(file_hash)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except Exception:
+            return None
+
+        # 提取器升级后旧缓存失效
+        if entry.get('version') != self.version:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        return entry.get('text')
+
+    def _write_disk(self, file_hash: str, text: str):
+        path = self._disk_path(file_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # 先写临时文件再替换，避免并发读到半截内容
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'text': text}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
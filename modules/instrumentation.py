@@ -0,0 +1,257 @@
+"""
+性能埋点模块
+记录各处理阶段的耗时、处理量和缓存命中情况：
+进程内汇总为直方图和计数器（Prometheus文本格式输出），
+单次请求内的阶段耗时可附加到响应中，并支持按请求开启cProfile采样
+"""
+import contextvars
+import cProfile
+import io
+import pstats
+import threading
+import time
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Tuple
+
+from .config_loader import get_config
+
+# 阶段耗时直方图的分桶上界（秒）
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_PREFIX = 'bidspeed'
+
+# 当前请求的埋点记录（每个线程/上下文独立）
+_current_trace = contextvars.ContextVar('bidspeed_trace', default=None)
+
+# 同一时间只能有一个cProfile采样
+_profile_lock = threading.Lock()
+
+
+class Histogram:
+    """固定分桶的直方图"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """进程内的指标汇总"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, help_text: str = '', **labels):
+        """记录一次直方图观测值"""
+        key = _label_key(labels)
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name: str, value: float = 1, help_text: str = '', **labels):
+        """累加计数器"""
+        key = _label_key(labels)
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def render(self) -> str:
+        """输出Prometheus文本格式"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                metric = f'{METRIC_PREFIX}_{name}'
+                lines.append(f'# HELP {metric} {self._help.get(name, "")}')
+                lines.append(f'# TYPE {metric} histogram')
+                for key, histogram in sorted(series.items()):
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{metric}_bucket{_format_labels(key, le=_format_value(bound))} {count}')
+                    lines.append(f'{metric}_bucket{_format_labels(key, le="+Inf")} {histogram.count}')
+                    lines.append(f'{metric}_sum{_format_labels(key)} {_format_value(histogram.total)}')
+                    lines.append(f'{metric}_count{_format_labels(key)} {histogram.count}')
+
+            for name, series in sorted(self._counters.items()):
+                metric = f'{METRIC_PREFIX}_{name}'
+                lines.append(f'# HELP {metric} {self._help.get(name, "")}')
+                lines.append(f'# TYPE {metric} counter')
+                for key, value in sorted(series.items()):
+                    lines.append(f'{metric}{_format_labels(key)} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+class Trace:
+    """单次请求内的阶段耗时和处理量"""
+
+    def __init__(self):
+        self.timings = {}
+        self.counts = {}
+        # 线程池中的工作线程也会写入同一请求的记录
+        self._lock = threading.Lock()
+
+    def add_timing(self, stage: str, seconds: float):
+        # 同一阶段多次执行时累加（并发执行的阶段按各线程耗时之和计）
+        with self._lock:
+            self.timings[stage] = round(self.timings.get(stage, 0.0) + seconds * 1000, 3)
+
+    def add_count(self, stage: str, unit: str, value: float):
+        key = f'{stage}.{unit}'
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def to_dict(self) -> Dict:
+        """输出为 metadata.timings 结构（耗时单位毫秒）"""
+        with self._lock:
+            return {'stages_ms': dict(self.timings), 'counts': dict(self.counts)}
+
+
+metrics = MetricsRegistry()
+
+
+def is_enabled() -> bool:
+    return get_config('instrumentation').get('enabled', True)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    记录一个处理阶段的耗时
+
+    用法:
+        with stage('analyzer.scan'):
+            ...
+    """
+    if not is_enabled():
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe('stage_duration_seconds', elapsed, '各处理阶段耗时（秒）', stage=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_timing(name, elapsed)
+
+
+def record_volume(stage_name: str, **volumes):
+    """记录阶段的处理量，如 record_volume('analyzer.scan', lines=1200, chars=56000)"""
+    if not is_enabled():
+        return
+
+    trace = _current_trace.get()
+    for unit, value in volumes.items():
+        metrics.increment('stage_processed_total', value, '各处理阶段的处理量', stage=stage_name, unit=unit)
+        if trace is not None:
+            trace.add_count(stage_name, unit, value)
+
+
+def record_cache(cache: str, hit: bool):
+    """记录一次缓存查询结果"""
+    if not is_enabled():
+        return
+
+    result = 'hit' if hit else 'miss'
+    metrics.increment('cache_requests_total', 1, '缓存查询次数', cache=cache, result=result)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_count(f'cache.{cache}', result, 1)
+
+
+def observe_request(endpoint: str, status: int, seconds: float):
+    """记录一次API请求的耗时"""
+    if not is_enabled():
+        return
+    metrics.observe('request_duration_seconds', seconds, 'API请求耗时（秒）', endpoint=endpoint, status=str(status))
+
+
+@contextmanager
+def trace() -> Iterator[Trace]:
+    """在当前上下文中收集单次请求的阶段耗时"""
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+def submit(executor: Executor, fn: Callable, *args, **kwargs) -> Future:
+    """
+    向线程池提交任务，任务在当前上下文的副本中执行，
+    其阶段耗时和缓存命中计入提交时所在请求的埋点记录
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+@contextmanager
+def profile(enabled: bool = True) -> Iterator[Dict]:
+    """
+    对当前线程执行cProfile采样，结束后把耗时最多的函数写入返回的字典（键为 stats）
+
+    只采样调用线程，线程池中执行的工作不计入；已有其他请求在采样时跳过并在 error 中说明
+    """
+    report = {}
+    if not enabled:
+        yield report
+        return
+    if not _profile_lock.acquire(blocking=False):
+        report['error'] = '其他请求正在采样，本次未采样'
+        yield report
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield report
+    finally:
+        profiler.disable()
+        _profile_lock.release()
+        output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=output)
+        stats.sort_stats('cumulative').print_stats(get_config('instrumentation').get('profile_top', 30))
+        report['stats'] = output.getvalue()
+
+
+def _label_key(labels: Dict) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: Tuple, **extra) -> str:
+    items = list(key) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in items) + '}'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
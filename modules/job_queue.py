@@ -0,0 +1,263 @@
+"""
+异步任务模块
+在有界线程池中执行耗时的解析、方案生成和供应商查找任务，任务状态与结果持久化到磁盘
+"""
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+FINISHED_STATUSES = ('succeeded', 'failed')
+
+# 过期任务文件的清理间隔（秒）
+PURGE_INTERVAL = 3600
+
+
+class QueueFullError(Exception):
+    """等待中的任务过多"""
+
+
+class JobQueue:
+    """异步任务队列"""
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 100,
+                 result_dir: str = 'data/jobs', max_tracked: int = 1000, retention_days: float = 7):
+        """
+        初始化任务队列
+
+        参数:
+            max_workers: 并发执行的任务数
+            max_pending: 排队和执行中的任务上限，超出时拒绝提交
+            result_dir: 任务状态和结果的持久化目录
+            max_tracked: 内存中保留的任务状态数量
+            retention_days: 任务状态和结果文件的保留天数，0表示永久保留
+        """
+        self.max_pending = max_pending
+        self.result_dir = result_dir
+        self.max_tracked = max_tracked
+        self.retention_days = retention_days
+        self._handlers = {}
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bidspeed-job')
+        self._last_purge = 0.0
+        self._purge_lock = threading.Lock()
+        os.makedirs(result_dir, exist_ok=True)
+        self.purge_expired()
+
+    def register(self, job_type: str, handler: Callable[[Dict, Callable[[float], None]], Dict]):
+        """
+        注册任务类型
+
+        参数:
+            job_type: 任务类型名称
+            handler: 处理函数，接收 (任务参数, 进度回调)，返回结果字典
+        """
+        self._handlers[job_type] = handler
+
+    def submit(self, job_type: str, payload: Dict) -> Dict:
+        """
+        提交任务，立即返回任务状态
+
+        参数:
+            job_type: 任务类型
+            payload: 任务参数
+
+        返回:
+            Dict: 任务状态
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f'不支持的任务类型: {job_type}')
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError('任务队列已满，请稍后重试')
+            self._pending += 1
+
+            job = {
+                'id': uuid.uuid4().hex,
+                'type': job_type,
+                'status': 'queued',
+                'progress': 0.0,
+                'error': None,
+                'created_at': datetime.now().isoformat(),
+                'started_at': None,
+                'finished_at': None
+            }
+            self._track(job)
+            snapshot = dict(job)
+
+        try:
+            self._persist(job)
+            self._executor.submit(self._run, job, payload)
+        except Exception:
+            # 任务未能排队，释放占用的名额
+            with self._lock:
+                self._jobs.pop(job['id'], None)
+                self._pending -= 1
+            raise
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """查询任务状态，不存在时返回None"""
+        if not JOB_ID_PATTERN.match(job_id or ''):
+            return None
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+
+        stored = self._load(job_id)
+        if stored is None:
+            return None
+
+        job = stored['job']
+        # 服务重启前未完成的任务已经丢失
+        if job['status'] not in FINISHED_STATUSES:
+            job['status'] = 'failed'
+            job['error'] = '服务重启，任务已中断'
+        return job
+
+    def get_result(self, job_id: str) -> Optional[Dict]:
+        """读取已完成任务的结果，任务未完成或不存在时返回None"""
+        if not JOB_ID_PATTERN.match(job_id or ''):
+            return None
+
+        stored = self._load(job_id)
+        if stored is None or stored['job']['status'] not in FINISHED_STATUSES:
+            return None
+        return stored.get('result')
+
+    def shutdown(self, wait: bool = True):
+        """停止任务线程池"""
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job: Dict, payload: Dict):
+        """在工作线程中执行任务"""
+        def report_progress(value: float):
+            with self._lock:
+                job['progress'] = round(min(max(value, 0.0), 1.0), 2)
+
+        with self._lock:
+            job['status'] = 'running'
+            job['started_at'] = datetime.now().isoformat()
+
+        finished = None
+        try:
+            # 运行状态写入失败不影响任务执行，完成状态仍会再次写入
+            try:
+                self._persist(job)
+            except Exception:
+                pass
+
+            result = None
+            try:
+                result = self._handlers[job['type']](payload, report_progress)
+                status, error = 'succeeded', None
+            except Exception as e:
+                status, error = 'failed', f'任务执行失败: {str(e)}'
+
+            # 先持久化结果再更新内存状态，保证查询到完成状态时结果已可读取
+            with self._lock:
+                finished = dict(job, status=status, error=error, progress=1.0,
+                                finished_at=datetime.now().isoformat())
+            try:
+                self._persist(finished, result)
+            except Exception as e:
+                finished.update(status='failed', error=f'任务结果保存失败: {str(e)}')
+                try:
+                    self._persist(finished)
+                except Exception:
+                    pass
+        finally:
+            with self._lock:
+                job.update(finished or {'status': 'failed', 'error': '任务执行失败', 'progress': 1.0,
+                                        'finished_at': datetime.now().isoformat()})
+                self._pending -= 1
+
+        # 任务完成时顺带清理过期文件，间隔内最多执行一次
+        if time.monotonic() - self._last_purge > PURGE_INTERVAL and self._purge_lock.acquire(blocking=False):
+            try:
+                self.purge_expired()
+            finally:
+                self._purge_lock.release()
+
+    def purge_expired(self) -> int:
+        """
+        删除超过保留天数的任务文件（包括写入中断残留的临时文件），未完成任务的文件保留
+
+        返回:
+            int: 删除的文件数
+        """
+        self._last_purge = time.monotonic()
+        if not self.retention_days:
+            return 0
+
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock:
+            active = {job_id for job_id, job in self._jobs.items() if job['status'] not in FINISHED_STATUSES}
+
+        removed = 0
+        for entry in os.scandir(self.result_dir):
+            if not entry.is_file() or not entry.name.endswith(('.json', '.tmp')):
+                continue
+            if entry.name.split('.', 1)[0] in active:
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _track(self, job: Dict):
+        """记录任务状态，超出数量时丢弃最早的已完成任务（其状态仍可从磁盘读取）"""
+        self._jobs[job['id']] = job
+        if len(self._jobs) <= self.max_tracked:
+            return
+
+        for job_id, tracked in list(self._jobs.items()):
+            if tracked['status'] in FINISHED_STATUSES:
+                del self._jobs[job_id]
+                if len(self._jobs) <= self.max_tracked:
+                    break
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.result_dir, f'{job_id}.json')
+
+    def _persist(self, job: Dict, result: Optional[Dict] = None):
+        """写入任务状态和结果"""
+        with self._lock:
+            snapshot = dict(job)
+
+        path = self._job_path(snapshot['id'])
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'job': snapshot, 'result': result}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _load(self, job_id: str) -> Optional[Dict]:
+        path = self._job_path(job_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
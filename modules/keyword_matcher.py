@@ -0,0 +1,80 @@
+"""
+多关键词匹配模块
+将关键词集合编译为前缀树形式的正则表达式，一次扫描即可找出文本中出现的全部关键词
+"""
+import re
+from typing import Dict, FrozenSet, Iterable, Set
+
+
+def build_trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    将关键词编译为前缀树结构的正则表达式源码
+
+    共享前缀的关键词合并为同一分支，每个位置的匹配代价只与关键词长度有关，
+    与关键词数量无关；同一位置优先匹配最长的关键词。
+
+    参数:
+        keywords: 关键词集合
+
+    返回:
+        str: 正则表达式源码（不含捕获组）
+    """
+    trie = {}
+    for keyword in keywords:
+        if not keyword:
+            continue
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node: Dict) -> str:
+        is_end = '' in node
+        branches = [re.escape(char) + render(child)
+                    for char, child in sorted(node.items()) if char]
+
+        if not branches:
+            return ''
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+
+        body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if is_end else body
+
+    return render(trie)
+
+
+class KeywordMatcher:
+    """多关键词匹配器"""
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        编译关键词
+
+        参数:
+            keywords: 关键词集合
+        """
+        self.keywords = sorted({keyword for keyword in keywords if keyword})
+        self.pattern = build_trie_pattern(self.keywords)
+        # 零宽前瞻使相互重叠的关键词都能被找到
+        self._regex = re.compile(f'(?=({self.pattern}))') if self.keywords else None
+
+        # 每个位置只返回最长的关键词，被它包含的较短关键词通过该表补齐
+        self._contained = {
+            keyword: frozenset(other for other in self.keywords if other in keyword)
+            for keyword in self.keywords
+        }
+
+    def expand(self, keyword: str) -> FrozenSet[str]:
+        """返回被该关键词包含的全部关键词（含自身）"""
+        return self._contained.get(keyword, frozenset())
+
+    def find_all(self, text: str) -> Set[str]:
+        """一次扫描返回文本中出现的全部关键词"""
+        found = set()
+        if self._regex is None:
+            return found
+
+        for match in self._regex.finditer(text):
+            found |= self._contained[match.group(1)]
+        return found
@@ -0,0 +1,140 @@
+"""
+大模型响应缓存模块
+以规范化提示词、模型和参数的哈希为键持久化大模型返回结果，支持过期时间和容量淘汰
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+def normalize_prompt(text: str) -> str:
+    """规范化提示词：合并连续空白，去除首尾空白"""
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class LLMResponseCache:
+    """大模型响应缓存"""
+
+    def __init__(self, path: str = 'data/llm_cache.db', ttl_seconds: float = 7 * 86400,
+                 max_entries: int = 10000, max_size_bytes: int = 256 * 1024 * 1024):
+        """
+        初始化缓存
+
+        参数:
+            path: SQLite数据库文件路径
+            ttl_seconds: 缓存有效期（秒）
+            max_entries: 最大条目数
+            max_size_bytes: 缓存内容总大小上限
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_responses_access ON llm_responses(last_access)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_responses_created ON llm_responses(created_at)')
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(messages: List[Dict], model: str, params: Optional[Dict] = None) -> str:
+        """根据规范化的对话消息、模型和请求参数生成缓存键"""
+        normalized = [
+            {'role': message.get('role'), 'content': normalize_prompt(message.get('content', ''))}
+            for message in messages
+        ]
+        raw = json.dumps({'messages': normalized, 'model': model, 'params': params or {}},
+                         ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """读取缓存，未命中或已过期时返回None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT response, created_at FROM llm_responses WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute('DELETE FROM llm_responses WHERE key = ?', (key,))
+                    self._conn.commit()
+                    self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._conn.execute('UPDATE llm_responses SET last_access = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, response: Dict):
+        """写入缓存，超出容量时按最近访问时间淘汰"""
+        raw = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO llm_responses (key, response, size, created_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, raw, len(raw.encode('utf-8')), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """返回命中统计"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses'
+            ).fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': entries,
+            'size_bytes': size
+        }
+
+    def _evict(self, now: float):
+        """淘汰过期条目，并在超出容量时删除最久未访问的条目"""
+        expired = self._conn.execute(
+            'DELETE FROM llm_responses WHERE created_at < ?', (now - self.ttl_seconds,)
+        ).rowcount
+        self.evictions += max(expired, 0)
+
+        entries, size = self._conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses'
+        ).fetchone()
+        while entries > self.max_entries or size > self.max_size_bytes:
+            rows = self._conn.execute(
+                'SELECT key, size FROM llm_responses ORDER BY last_access LIMIT 64'
+            ).fetchall()
+            if not rows:
+                break
+            for key, entry_size in rows:
+                if entries <= self.max_entries and size <= self.max_size_bytes:
+                    break
+                self._conn.execute('DELETE FROM llm_responses WHERE key = ?', (key,))
+                entries -= 1
+                size -= entry_size
+                self.evictions += 1
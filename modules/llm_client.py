@@ -0,0 +1,321 @@
+"""
+大模型调用模块
+进程内共享的文心一言客户端：连接池复用、令牌桶限流、并发上限、超时与指数退避重试、响应缓存；
+按API Key和Secret Key换取access_token（缓存至过期前）后调用接口
+"""
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config_loader import get_config
+from .instrumentation import record_cache, stage
+from .llm_cache import LLMResponseCache
+
+# 需要重试的HTTP状态码
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# 文心一言以HTTP 200返回的限流类错误码
+RETRY_ERROR_CODES = {4, 18, 336501, 336502}
+
+# access_token无效或已过期，清除缓存的令牌后重新换取
+TOKEN_ERROR_CODES = {110, 111}
+
+DEFAULT_API_URL = "https://aip.baidubce.com/rpc/2.0/ai_custom/v1/wenxinworkshop/chat/completions_pro"
+DEFAULT_TOKEN_URL = "https://aip.baidubce.com/oauth/2.0/token"
+
+# access_token提前刷新的时间（秒），避免请求途中过期
+TOKEN_REFRESH_MARGIN = 300
+
+# .env.example 中的占位值，视为未配置
+PLACEHOLDER_CREDENTIALS = {'your_api_key_here', 'your_secret_key_here'}
+
+
+class LLMError(Exception):
+    """大模型调用失败"""
+
+
+def clean_credential(value: Optional[str]) -> str:
+    """去除首尾空白，未配置或为占位值时返回空字符串"""
+    value = (value or '').strip()
+    return '' if value in PLACEHOLDER_CREDENTIALS else value
+
+
+class TokenBucket:
+    """令牌桶限流器"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        参数:
+            rate: 每秒补充的令牌数（即QPS配额）
+            capacity: 桶容量（允许的突发请求数），默认与rate相同
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取得一个令牌，令牌不足时阻塞等待"""
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class LLMClient:
+    """大模型HTTP客户端"""
+
+    def __init__(self, api_url: str = DEFAULT_API_URL, timeout: float = 30,
+                 qps: float = 2, burst: Optional[float] = None, max_concurrency: int = 4,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 pool_size: int = 10, cache: Optional[LLMResponseCache] = None,
+                 auth: str = 'access_token', token_url: str = DEFAULT_TOKEN_URL):
+        """
+        初始化客户端
+
+        参数:
+            api_url: 接口地址
+            timeout: 单次请求超时（秒）
+            qps: 每秒请求数上限，0表示不限流
+            burst: 允许的突发请求数
+            max_concurrency: 同时进行中的请求数上限
+            max_retries: 失败后的最大重试次数
+            backoff_base: 退避基数（秒），第n次重试最多等待 backoff_base * 2^n
+            backoff_max: 单次退避等待上限（秒）
+            pool_size: 连接池大小
+            cache: 响应缓存，为None时不缓存
+            auth: 鉴权方式，access_token（用API Key和Secret Key换取令牌，作为URL参数）
+                  或 bearer（API Key直接放在Authorization请求头）
+            token_url: 换取access_token的接口地址
+        """
+        if auth not in ('access_token', 'bearer'):
+            raise ValueError(f'不支持的鉴权方式: {auth}')
+        self.api_url = api_url
+        self.auth = auth
+        self.token_url = token_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self._rate_limiter = TokenBucket(qps, burst)
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        # (API Key, Secret Key) -> (access_token, 过期时间)
+        self._tokens = {}
+        self._token_lock = threading.Lock()
+
+        # 长连接复用，避免每次调用重新建立TLS连接
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def has_credentials(self, api_key: str, secret_key: str = '') -> bool:
+        """密钥是否足以按当前鉴权方式调用接口"""
+        return bool(api_key) and (self.auth == 'bearer' or bool(secret_key))
+
+    def chat(self, messages: List[Dict], api_key: str = '', secret_key: str = '',
+             use_cache: bool = True, **params) -> Dict:
+        """
+        调用对话接口
+
+        参数:
+            messages: 对话消息列表
+            api_key: API Key，为空时不鉴权
+            secret_key: Secret Key（access_token鉴权时必需）
+            use_cache: 是否使用响应缓存（相同的提示词、模型和参数直接返回缓存结果）
+            params: 其他请求参数（如temperature）
+
+        返回:
+            Dict: 接口返回的JSON
+        """
+        cache_key = None
+        if use_cache and self.cache is not None:
+            cache_key = self.cache.make_key(messages, self.api_url, params)
+            cached = self.cache.get(cache_key)
+            record_cache('llm', cached is not None)
+            if cached is not None:
+                return cached
+
+        with stage('llm.request'):
+            response = self._request(messages, api_key, secret_key, params)
+        if cache_key is not None:
+            self.cache.put(cache_key, response)
+        return response
+
+    def _request(self, messages: List[Dict], api_key: str, secret_key: str, params: Dict) -> Dict:
+        """发送请求（限流、并发控制和重试）"""
+        payload = {'messages': messages, **params}
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # 退避等待期间不占用并发名额
+                self._backoff(attempt, last_error)
+
+            with self._semaphore:
+                auth = self._auth(api_key, secret_key)
+                self._rate_limiter.acquire()
+                try:
+                    response = self.session.post(self.api_url, json=payload, timeout=self.timeout, **auth)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    last_error = LLMError(f'请求失败: {str(e)}')
+                    continue
+
+            if response.status_code in RETRY_STATUS_CODES:
+                last_error = LLMError(f'HTTP {response.status_code}')
+                last_error.retry_after = self._retry_after(response)
+                continue
+            if response.status_code >= 400:
+                raise LLMError(f'HTTP {response.status_code}: {response.text[:200]}')
+
+            try:
+                data = response.json()
+            except ValueError:
+                raise LLMError('返回内容不是有效的JSON')
+
+            error_code = data.get('error_code')
+            if error_code in TOKEN_ERROR_CODES and self.auth == 'access_token':
+                self._invalidate_token(api_key, secret_key)
+                last_error = LLMError(f"{error_code}: {data.get('error_msg', '')}")
+                last_error.retry_after = 0
+                continue
+            if error_code in RETRY_ERROR_CODES:
+                last_error = LLMError(f"{error_code}: {data.get('error_msg', '')}")
+                continue
+            if error_code:
+                raise LLMError(f"{error_code}: {data.get('error_msg', '')}")
+
+            return data
+
+        raise LLMError(f'重试{self.max_retries}次后仍失败: {last_error}')
+
+    def _auth(self, api_key: str, secret_key: str) -> Dict:
+        """请求的鉴权参数（requests.post 的 headers 或 params）"""
+        if not api_key:
+            return {}
+        if self.auth == 'bearer':
+            return {'headers': {'Authorization': f'Bearer {api_key}'}}
+        return {'params': {'access_token': self._access_token(api_key, secret_key)}}
+
+    def _access_token(self, api_key: str, secret_key: str) -> str:
+        """换取access_token，有效期内复用（同一密钥并发请求时只换取一次）"""
+        if not secret_key:
+            raise LLMError('access_token鉴权需要Secret Key')
+
+        with self._token_lock:
+            cached = self._tokens.get((api_key, secret_key))
+            if cached is not None and time.monotonic() < cached[1]:
+                return cached[0]
+
+            try:
+                response = self.session.post(self.token_url, timeout=self.timeout, params={
+                    'grant_type': 'client_credentials',
+                    'client_id': api_key,
+                    'client_secret': secret_key
+                })
+                data = response.json()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                raise LLMError(f'获取access_token失败: {str(e)}')
+            except ValueError:
+                raise LLMError(f'获取access_token失败: HTTP {response.status_code}')
+
+            token = data.get('access_token')
+            if not token:
+                raise LLMError(f"获取access_token失败: {data.get('error_description') or data.get('error', '')}")
+
+            expires_in = float(data.get('expires_in', 2592000))
+            self._tokens[(api_key, secret_key)] = (
+                token, time.monotonic() + max(expires_in - TOKEN_REFRESH_MARGIN, expires_in / 2))
+            return token
+
+    def _invalidate_token(self, api_key: str, secret_key: str):
+        with self._token_lock:
+            self._tokens.pop((api_key, secret_key), None)
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
+
+    def _backoff(self, attempt: int, last_error: Optional[Exception]):
+        """指数退避（带随机抖动），服务端给出Retry-After时以其为准"""
+        retry_after = getattr(last_error, 'retry_after', None)
+        if retry_after is not None:
+            delay = min(retry_after, self.backoff_max)
+        else:
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        time.sleep(delay)
+
+    def _retry_after(self, response) -> Optional[float]:
+        try:
+            return float(response.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
+
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+# 同一配额由多少个进程分摊（批量解析的每个工作进程各自创建客户端）
+_quota_share = 1
+
+
+def share_llm_quota(processes: int):
+    """
+    多个进程分摊 ai_service 配置的QPS、突发数和并发数，各进程只使用其中 1/processes
+    （在工作进程初始化时、首次获取客户端之前调用）
+    """
+    global _quota_share
+
+    with _llm_client_lock:
+        _quota_share = max(1, int(processes))
+
+
+def get_llm_client() -> LLMClient:
+    """获取进程内共享的大模型客户端（按 config.json 的 ai_service 配置创建）"""
+    global _llm_client
+
+    with _llm_client_lock:
+        if _llm_client is None:
+            ai_config = get_config('ai_service')
+            cache_config = get_config('llm_cache')
+            cache = None
+            if cache_config.get('enabled', True):
+                cache = LLMResponseCache(
+                    path=cache_config.get('path', 'data/llm_cache.db'),
+                    ttl_seconds=cache_config.get('ttl_hours', 168) * 3600,
+                    max_entries=cache_config.get('max_entries', 10000),
+                    max_size_bytes=cache_config.get('max_size_mb', 256) * 1024 * 1024
+                )
+
+            burst = ai_config.get('burst')
+            _llm_client = LLMClient(
+                api_url=ai_config.get('api_endpoint', DEFAULT_API_URL),
+                timeout=ai_config.get('timeout', 30),
+                qps=ai_config.get('qps', 2) / _quota_share,
+                burst=burst / _quota_share if burst else None,
+                max_concurrency=max(1, ai_config.get('max_concurrency', 4) // _quota_share),
+                max_retries=ai_config.get('max_retries', 3),
+                pool_size=ai_config.get('pool_size', 10),
+                cache=cache,
+                auth=ai_config.get('auth', 'access_token'),
+                token_url=ai_config.get('token_url', DEFAULT_TOKEN_URL)
+            )
+        return _llm_client
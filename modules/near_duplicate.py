@@ -0,0 +1,314 @@
+"""
+近似重复标书检测模块
+对提取文本的字符片段（shingle）计算MinHash签名，签名按band切分后写入LSH索引；
+新文档只需查找与其任一band相同的历史文档，再用签名估算相似度，
+查找耗时与历史文档数量基本无关
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .config_loader import get_config
+from .instrumentation import stage
+from .storage import get_storage
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS document_signatures (
+    document_id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS minhash_bands (
+    band_key INTEGER NOT NULL,
+    document_id INTEGER NOT NULL,
+    PRIMARY KEY (band_key, document_id)
+) WITHOUT ROWID;
+'''
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# 滚动哈希的乘数（64位无符号整数运算，溢出即取模）
+SHINGLE_BASE = np.uint64(1099511628211)
+
+# 每批计算的片段数，控制 (排列数 × 片段数) 中间数组的内存
+SIGNATURE_BATCH = 8192
+
+# 哈希排列的随机种子固定，签名写入数据库后才能与之后计算的签名比较
+PERMUTATION_SEED = 20240601
+
+# 清理已删除文档签名的间隔（秒）
+PURGE_INTERVAL = 3600
+
+
+class MinHasher:
+    """MinHash签名计算"""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5):
+        """
+        参数:
+            num_perm: 签名长度（哈希排列数）
+            shingle_size: 片段长度（字符数，去除空白后计算）
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(PERMUTATION_SEED)
+        # 乘法移位哈希族：((x ^ 种子) * 奇数乘数) 的高32位
+        self._seeds = rng.integers(0, 2 ** 63, size=(num_perm, 1), dtype=np.uint64)
+        self._multipliers = rng.integers(0, 2 ** 63, size=(num_perm, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """去除空白后各字符片段的64位哈希（去重）"""
+        normalized = WHITESPACE_PATTERN.sub('', text)
+        codes = np.frombuffer(normalized.encode('utf-32-le'), dtype='<u4').astype(np.uint64)
+        count = len(codes) - self.shingle_size + 1
+        if count <= 0:
+            return np.empty(0, dtype=np.uint64)
+
+        hashes = np.zeros(count, dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            for offset in range(self.shingle_size):
+                hashes = hashes * SHINGLE_BASE + codes[offset:offset + count]
+        return np.unique(hashes)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        计算文本的MinHash签名
+
+        返回:
+            Optional[np.ndarray]: uint32签名，文本短于一个片段时返回None
+        """
+        shingles = self.shingles(text)
+        if not len(shingles):
+            return None
+
+        signature = np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        with np.errstate(over='ignore'):
+            for start in range(0, len(shingles), SIGNATURE_BATCH):
+                batch = shingles[start:start + SIGNATURE_BATCH]
+                hashed = ((batch ^ self._seeds) * self._multipliers) >> np.uint64(32)
+                np.minimum(signature, hashed.min(axis=1).astype(np.uint32), out=signature)
+        return signature
+
+
+def signature_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """两个签名相同位置取值相同的比例（Jaccard相似度的估计）"""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class NearDuplicateIndex:
+    """标书签名的LSH索引（保存在业务数据库中，按文档ID关联）"""
+
+    def __init__(self, path: str = 'data/bidspeed.db', num_perm: int = 128, bands: int = 16,
+                 shingle_size: int = 5, threshold: float = 0.8, max_candidates: int = 50):
+        """
+        参数:
+            path: SQLite数据库文件路径（与 storage.BidStorage 相同）
+            num_perm: 签名长度，须能被 bands 整除
+            bands: band数，每个band含 num_perm/bands 个取值；band越多，相似度较低的文档越容易成为候选
+            shingle_size: 片段长度（字符数）
+            threshold: 判定为近似重复的最低相似度
+            max_candidates: 参与相似度计算的候选文档数上限（按相同band数从多到少）
+        """
+        if num_perm % bands:
+            raise ValueError('签名长度须能被band数整除')
+        self.path = path
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self._purge_lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程使用独立连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """计算文本签名"""
+        with stage('near_duplicate.signature'):
+            return self.hasher.signature(text)
+
+    def add(self, document_id: int, signature: Optional[np.ndarray]):
+        """写入文档签名（同一文档重复写入时覆盖）"""
+        if signature is None:
+            return
+        conn = self._connect()
+        with conn:
+            # 删除旧签名的band（按主键删除，不扫描全表）
+            row = conn.execute('SELECT signature FROM document_signatures WHERE document_id = ?',
+                               (document_id,)).fetchone()
+            if row is not None:
+                conn.executemany('DELETE FROM minhash_bands WHERE band_key = ? AND document_id = ?',
+                                 [(key, document_id) for key in self._band_keys(np.frombuffer(row[0], dtype='<u4'))])
+            conn.execute('INSERT OR REPLACE INTO document_signatures (document_id, signature) VALUES (?, ?)',
+                         (document_id, signature.astype('<u4').tobytes()))
+            conn.executemany('INSERT OR IGNORE INTO minhash_bands (band_key, document_id) VALUES (?, ?)',
+                             [(key, document_id) for key in self._band_keys(signature)])
+
+        # 写入时顺带清理已删除文档的签名，间隔内最多执行一次
+        if time.monotonic() - self._last_purge > PURGE_INTERVAL and self._purge_lock.acquire(blocking=False):
+            try:
+                self.purge_orphans()
+            finally:
+                self._purge_lock.release()
+
+    def purge_orphans(self) -> int:
+        """
+        删除文档已不存在（已被业务数据存储按保留天数清理）的签名和band
+
+        返回:
+            int: 删除的签名数
+        """
+        self._last_purge = time.monotonic()
+        conn = self._connect()
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents'").fetchone() is None:
+            return 0
+
+        with conn:
+            rows = conn.execute(
+                'SELECT document_id, signature FROM document_signatures '
+                'WHERE document_id NOT IN (SELECT id FROM documents)'
+            ).fetchall()
+            for document_id, blob in rows:
+                conn.executemany('DELETE FROM minhash_bands WHERE band_key = ? AND document_id = ?',
+                                 [(key, document_id) for key in self._band_keys(np.frombuffer(blob, dtype='<u4'))])
+                conn.execute('DELETE FROM document_signatures WHERE document_id = ?', (document_id,))
+        return len(rows)
+
+    def query(self, signature: Optional[np.ndarray], exclude_id: Optional[int] = None) -> List[Dict]:
+        """
+        查找相似度不低于阈值的历史文档
+
+        参数:
+            signature: 文档签名
+            exclude_id: 排除的文档ID（文档自身）
+
+        返回:
+            List[Dict]: document_id、similarity，按相似度从高到低
+        """
+        if signature is None:
+            return []
+
+        with stage('near_duplicate.query'):
+            conn = self._connect()
+            keys = self._band_keys(signature)
+            rows = conn.execute(
+                f'SELECT document_id FROM minhash_bands WHERE band_key IN ({",".join("?" * len(keys))})', keys
+            ).fetchall()
+            hits = Counter(document_id for document_id, in rows if document_id != exclude_id)
+            if not hits:
+                return []
+
+            candidates = [document_id for document_id, _ in hits.most_common(self.max_candidates)]
+            rows = conn.execute(
+                f'SELECT document_id, signature FROM document_signatures '
+                f'WHERE document_id IN ({",".join("?" * len(candidates))})', candidates
+            ).fetchall()
+
+            matches = []
+            for document_id, blob in rows:
+                similarity = signature_similarity(signature, np.frombuffer(blob, dtype='<u4'))
+                if similarity >= self.threshold:
+                    matches.append({'document_id': document_id, 'similarity': round(similarity, 4)})
+            matches.sort(key=lambda match: (-match['similarity'], match['document_id']))
+            return matches
+
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        """各band的键（band序号与取值一起哈希为64位有符号整数）"""
+        data = signature.astype('<u4').tobytes()
+        width = self.rows * 4
+        return [
+            int.from_bytes(hashlib.blake2b(band.to_bytes(2, 'little') + data[band * width:(band + 1) * width],
+                                           digest_size=8).digest(), 'little', signed=True)
+            for band in range(self.bands)
+        ]
+
+
+def find_similar_document(storage, index: NearDuplicateIndex, document_id: int, text: str) -> Optional[Dict]:
+    """
+    登记文档指纹，并查找最相近的历史标书
+
+    有多份相似标书时优先返回已解析过的，便于直接复用其解析结果和技术方案
+
+    参数:
+        storage: 业务数据存储（storage.BidStorage）
+        index: 近似重复索引
+        document_id: 文档ID
+        text: 文档提取文本
+
+    返回:
+        Optional[Dict]: document_id、file_name、similarity、analysis_id、solution_id（没有时为None），
+                        没有相似标书时返回None
+    """
+    signature = index.signature(text)
+    matches = index.query(signature, exclude_id=document_id)
+    index.add(document_id, signature)
+
+    similar = None
+    for match in matches:
+        document = storage.get_document(match['document_id'])
+        if document is None:
+            continue
+        analysis = storage.get_latest_analysis(document['id'])
+        solution = storage.get_latest_solution(document['id']) if analysis else None
+        candidate = {
+            'document_id': document['id'],
+            'file_name': document['file_name'],
+            'similarity': match['similarity'],
+            'analysis_id': analysis['analysis_id'] if analysis else None,
+            'solution_id': solution['solution_id'] if solution else None
+        }
+        if analysis is not None:
+            return candidate
+        similar = similar or candidate
+    return similar
+
+
+_near_duplicate_indexes = {}
+_near_duplicate_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index(path: Optional[str] = None) -> Optional[NearDuplicateIndex]:
+    """
+    获取进程内共享的近似重复索引，配置关闭时返回None
+
+    参数:
+        path: 数据库文件路径，默认与共享的业务数据存储相同
+    """
+    config = get_config('near_duplicate')
+    if not config.get('enabled', True):
+        return None
+
+    path = path or get_storage().path
+    with _near_duplicate_index_lock:
+        if path not in _near_duplicate_indexes:
+            _near_duplicate_indexes[path] = NearDuplicateIndex(
+                path=path,
+                num_perm=int(config.get('num_perm', 128)),
+                bands=int(config.get('bands', 16)),
+                shingle_size=int(config.get('shingle_size', 5)),
+                threshold=float(config.get('threshold', 0.8)),
+                max_candidates=int(config.get('max_candidates', 50))
+            )
+        return _near_duplicate_indexes[path]
@@ -0,0 +1,232 @@
+"""
+OCR模块
+识别PDF中没有文字层的页面（扫描件），只把这些页面渲染为图片并用Tesseract识别，
+识别在进程池中按页并行，结果按页面内容哈希缓存
+"""
+import hashlib
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple
+
+from .config_loader import get_config
+from .extraction_cache import ExtractionCache
+from .instrumentation import record_cache, record_volume, stage
+
+# OCR流程版本号，修改渲染或识别逻辑后需要递增，使旧的页面缓存失效
+OCR_VERSION = '1'
+
+_pdf_ocr = None
+_pdf_ocr_lock = threading.Lock()
+
+_ocr_executor = None
+_ocr_executor_workers = 0
+_ocr_executor_lock = threading.Lock()
+
+
+def page_fingerprint(page) -> str:
+    """
+    计算PDF页面的内容哈希（PyPDF2页面对象）
+
+    扫描页的内容流通常只是"绘制图片"的指令，各页相同，因此同时计入页面引用的图片等XObject的原始数据
+    """
+    digest = hashlib.sha256()
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+
+    resources = page.get('/Resources')
+    xobjects = resources.get_object().get('/XObject') if resources is not None else None
+    if xobjects is not None:
+        xobjects = xobjects.get_object()
+        for name in sorted(xobjects):
+            xobject = xobjects[name].get_object()
+            digest.update(name.encode('utf-8'))
+            digest.update(getattr(xobject, '_data', b'') or b'')
+    return digest.hexdigest()
+
+
+def ocr_available(tesseract_cmd: Optional[str] = None, poppler_path: Optional[str] = None) -> bool:
+    """pdf2image、pytesseract 及其依赖的 poppler、tesseract 程序是否都可用"""
+    try:
+        import pdf2image  # noqa: F401
+        import pytesseract
+    except ImportError:
+        return False
+
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception:
+        return False
+    return bool(shutil.which('pdftoppm', path=poppler_path) if poppler_path else shutil.which('pdftoppm'))
+
+
+def ocr_page(pdf_path: str, page_number: int, dpi: int, lang: str,
+             tesseract_cmd: Optional[str] = None, poppler_path: Optional[str] = None) -> str:
+    """渲染并识别单页（页码从1开始，在子进程中执行）"""
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number,
+                               poppler_path=poppler_path)
+    return '\n'.join(pytesseract.image_to_string(image, lang=lang).strip() for image in images)
+
+
+class PdfOCR:
+    """PDF扫描页识别"""
+
+    def __init__(self, dpi: int = 300, lang: str = 'chi_sim+eng', min_text_chars: int = 10, workers: int = 0,
+                 cache: Optional[ExtractionCache] = None, tesseract_cmd: Optional[str] = None,
+                 poppler_path: Optional[str] = None):
+        """
+        参数:
+            dpi: 渲染分辨率
+            lang: Tesseract语言
+            min_text_chars: 文字层去除空白后少于该字符数的页面视为扫描页
+            workers: 识别进程数，0表示CPU核数，1表示在当前进程中逐页识别
+            cache: 页面识别结果缓存（键为页面内容哈希）
+            tesseract_cmd: tesseract程序路径，默认从PATH查找
+            poppler_path: poppler程序目录，默认从PATH查找
+        """
+        self.dpi = dpi
+        self.lang = lang
+        self.min_text_chars = min_text_chars
+        self.workers = workers
+        self.cache = cache
+        self.tesseract_cmd = tesseract_cmd
+        self.poppler_path = poppler_path
+
+    def needs_ocr(self, text: str) -> bool:
+        """页面文字层是否过少（需要识别）"""
+        return len(''.join((text or '').split())) < self.min_text_chars
+
+    def fill_pages(self, pdf_path: str, pages: Iterable[Tuple[str, Optional[str]]],
+                   parallel: bool = True) -> Iterator[str]:
+        """
+        补全扫描页的文本，按页序输出
+
+        文字层足够的页面原样输出；扫描页提交识别后继续读取后续页面，
+        前面的页面识别完成后依次输出，识别失败或结果为空时保留原文字层
+
+        参数:
+            pdf_path: PDF文件路径
+            pages: (文字层文本, 页面内容哈希) 序列，文字层足够的页面哈希可为None
+            parallel: 是否使用进程池并行识别
+
+        返回:
+            Iterator[str]: 各页文本
+        """
+        executor = _get_ocr_executor(self.workers) if parallel and self.workers != 1 else None
+        pending = deque()
+        try:
+            for page_number, (text, fingerprint) in enumerate(pages, 1):
+                if self.needs_ocr(text):
+                    pending.append((text, self._recognize(pdf_path, page_number, fingerprint, executor)))
+                else:
+                    pending.append((text, None))
+                while pending and (pending[0][1] is None or pending[0][1].done()):
+                    yield self._resolve(*pending.popleft())
+            while pending:
+                yield self._resolve(*pending.popleft())
+        finally:
+            for _, future in pending:
+                if future is not None:
+                    future.cancel()
+
+    def _recognize(self, pdf_path: str, page_number: int, fingerprint: Optional[str],
+                   executor: Optional[ProcessPoolExecutor]) -> Future:
+        """提交单页识别（缓存命中时直接返回已完成的Future）"""
+        cache_key = self._cache_key(fingerprint)
+        cached = self.cache.get(cache_key) if self.cache and cache_key else None
+        if self.cache and cache_key:
+            record_cache('ocr', cached is not None)
+
+        future = Future()
+        if cached is not None:
+            future.set_result(cached)
+            return future
+
+        args = (pdf_path, page_number, self.dpi, self.lang, self.tesseract_cmd, self.poppler_path)
+        if executor is None:
+            try:
+                with stage('document.ocr'):
+                    future.set_result(ocr_page(*args))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            future = executor.submit(ocr_page, *args)
+
+        if self.cache and cache_key:
+            future.add_done_callback(lambda done: self._store(cache_key, done))
+        return future
+
+    def _store(self, cache_key: str, future: Future):
+        """识别成功后写入缓存"""
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(cache_key, future.result())
+
+    def _resolve(self, text: str, future: Optional[Future]) -> str:
+        """取出页面的最终文本"""
+        if future is None:
+            return text
+        try:
+            recognized = future.result()
+        except Exception:
+            return text
+        record_volume('document.ocr', pages=1, chars=len(recognized))
+        return recognized if recognized.strip() else text
+
+    def _cache_key(self, fingerprint: Optional[str]) -> Optional[str]:
+        """缓存键：页面内容哈希与渲染分辨率、语言组合"""
+        if not fingerprint:
+            return None
+        return hashlib.sha256(f'{fingerprint}:{self.dpi}:{self.lang}'.encode('utf-8')).hexdigest()
+
+
+def _get_ocr_executor(workers: int) -> ProcessPoolExecutor:
+    """获取进程内共享的识别进程池"""
+    global _ocr_executor, _ocr_executor_workers
+
+    with _ocr_executor_lock:
+        if _ocr_executor is None or _ocr_executor_workers != workers:
+            if _ocr_executor is not None:
+                _ocr_executor.shutdown(wait=False)
+            _ocr_executor = ProcessPoolExecutor(max_workers=workers or None)
+            _ocr_executor_workers = workers
+        return _ocr_executor
+
+
+def get_pdf_ocr() -> Optional[PdfOCR]:
+    """按 config.json 的 ocr 配置创建识别器（进程内共享），关闭或缺少OCR依赖时返回None"""
+    global _pdf_ocr
+
+    ocr_config = get_config('ocr')
+    if not ocr_config.get('enabled', True):
+        return None
+
+    with _pdf_ocr_lock:
+        if _pdf_ocr is None:
+            tesseract_cmd = ocr_config.get('tesseract_cmd')
+            poppler_path = ocr_config.get('poppler_path')
+            if not ocr_available(tesseract_cmd, poppler_path):
+                _pdf_ocr = False
+            else:
+                cache = None
+                if ocr_config.get('cache_path', 'data/ocr_cache'):
+                    cache = ExtractionCache(ocr_config.get('cache_path', 'data/ocr_cache'), OCR_VERSION,
+                                            memory_limit_bytes=8 * 1024 * 1024)
+                _pdf_ocr = PdfOCR(
+                    dpi=int(ocr_config.get('dpi', 300)),
+                    lang=ocr_config.get('lang', 'chi_sim+eng'),
+                    min_text_chars=int(ocr_config.get('min_text_chars', 10)),
+                    workers=int(ocr_config.get('workers', 0)),
+                    cache=cache,
+                    tesseract_cmd=tesseract_cmd,
+                    poppler_path=poppler_path
+                )
+        return _pdf_ocr or None
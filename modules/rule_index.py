@@ -0,0 +1,86 @@
+"""
+评分细则索引模块
+把评分细则的分词结果（中文两字切分、英文单词）建成倒排索引，
+技术规范行按共有词的IDF加权重合度查找最相近的评分细则，耗时与文本长度成正比
+"""
+import math
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from .tokenizer import tokenize
+
+# 分值写法（如"10分"）不参与匹配
+SCORE_PATTERN = re.compile(r'\d+\s*分')
+
+# 出现在超过该数量细则中的词视为停用词（如"要求"），不参与匹配，保证单次查找的工作量有上限
+MAX_POSTINGS = 64
+
+# 至少共有的词数，以及最低的加权重合度（0~1）
+MIN_SHARED_TOKENS = 2
+MIN_SIMILARITY = 0.2
+
+
+def rule_tokens(text: str) -> List[str]:
+    """切分用于匹配的词（去除分值写法）"""
+    return tokenize(SCORE_PATTERN.sub(' ', text))
+
+
+class RuleIndex:
+    """评分细则倒排索引"""
+
+    def __init__(self, rules: List[Dict], max_postings: int = MAX_POSTINGS):
+        """
+        参数:
+            rules: 评分细则列表（含 content）
+            max_postings: 停用词阈值，出现在更多细则中的词不参与匹配
+        """
+        self.rules = rules
+        postings = defaultdict(list)
+        for rule_id, rule in enumerate(rules):
+            for token in set(rule_tokens(rule['content'])):
+                postings[token].append(rule_id)
+
+        self.postings = {token: ids for token, ids in postings.items() if len(ids) <= max_postings}
+        self.stop_tokens = {token for token in postings if token not in self.postings}
+        self.idf = {token: math.log(1 + len(rules) / len(ids)) for token, ids in self.postings.items()}
+        # 细则中没有出现的词按只出现一次计权重，文本中无关内容越多相近程度越低
+        self.unseen_idf = math.log(1 + len(rules))
+        self.rule_weights = [0.0] * len(rules)
+        for token, ids in self.postings.items():
+            for rule_id in ids:
+                self.rule_weights[rule_id] += self.idf[token]
+
+    def match(self, text: str) -> Optional[Dict]:
+        """
+        查找与文本最相近的评分细则
+
+        相近程度为共有词的IDF之和占两者IDF总和的比例（Dice系数），同分时取靠前的细则
+
+        返回:
+            Optional[Dict]: 最相近的评分细则，没有足够相近的细则时返回None
+        """
+        tokens = set(rule_tokens(text)) - self.stop_tokens
+        text_weight = sum(self.idf.get(token, self.unseen_idf) for token in tokens)
+        tokens = [token for token in tokens if token in self.postings]
+        if len(tokens) < MIN_SHARED_TOKENS:
+            return None
+
+        overlap = defaultdict(float)
+        shared = defaultdict(int)
+        for token in tokens:
+            weight = self.idf[token]
+            for rule_id in self.postings[token]:
+                overlap[rule_id] += weight
+                shared[rule_id] += 1
+
+        best_id, best_similarity = None, 0.0
+        for rule_id, weight in overlap.items():
+            if shared[rule_id] < MIN_SHARED_TOKENS:
+                continue
+            similarity = 2 * weight / (text_weight + self.rule_weights[rule_id])
+            if similarity < MIN_SIMILARITY:
+                continue
+            if best_id is None or similarity > best_similarity or (similarity == best_similarity and rule_id < best_id):
+                best_id, best_similarity = rule_id, similarity
+        return self.rules[best_id] if best_id is not None else None
@@ -4,16 +4,20 @@
 """
 import json
 import re
-from typing import Dict, List
+from typing import Dict, List, Set
 from datetime import datetime, timedelta
 
+from .instrumentation import stage
+from .solution_knowledge import get_solution_knowledge
+
 class SolutionGenerator:
     """技术方案生成器"""
     
     def __init__(self):
         """初始化方案生成器"""
-        self.solution_templates = self._load_solution_templates()
-        self.tech_library = self._load_tech_library()
+        self.knowledge = get_solution_knowledge()
+        self.solution_templates = self.knowledge.solution_templates
+        self.tech_library = self.knowledge.tech_library
     
     def generate(self, bid_analysis: Dict) -> Dict:
         """
@@ -26,31 +30,41 @@ class SolutionGenerator:
             Dict: 包含完整技术方案的字典
         """
         # 提取关键需求
-        key_requirements = self._extract_key_requirements(bid_analysis)
+        with stage('solution.requirements'):
+            key_requirements = self._extract_key_requirements(bid_analysis)
         
-        # 匹配技术方案
-        matched_solutions = self._match_solutions(key_requirements)
+        # 匹配技术方案（需求文本只扫描一次，方案类型复用同一结果）
+        with stage('solution.match'):
+            found_keywords = self._find_keywords(key_requirements)
+            matched_solutions = self._match_solutions(found_keywords)
         
         # 生成系统架构
-        system_architecture = self._generate_architecture(key_requirements)
+        with stage('solution.architecture'):
+            system_architecture = self._generate_architecture(key_requirements)
         
         # 生成实施计划
-        implementation_plan = self._generate_implementation_plan(key_requirements)
+        with stage('solution.implementation_plan'):
+            implementation_plan = self._generate_implementation_plan(key_requirements)
         
         # 生成技术偏离表
-        deviation_table = self._generate_deviation_table(bid_analysis)
+        with stage('solution.deviation_table'):
+            deviation_table = self._generate_deviation_table(bid_analysis)
         
         # 生成风险评估
-        risk_assessment = self._generate_risk_assessment(key_requirements)
+        with stage('solution.risk_assessment'):
+            risk_assessment = self._generate_risk_assessment(key_requirements)
         
-        return {
-            'success': True,
-            'solution_overview': {
+        with stage('solution.overview'):
+            solution_overview = {
                 'project_name': self._extract_project_name(bid_analysis),
-                'solution_type': self._determine_solution_type(key_requirements),
+                'solution_type': self._determine_solution_type(found_keywords),
                 'total_budget_estimate': self._estimate_budget(key_requirements),
                 'implementation_duration': self._estimate_duration(key_requirements)
-            },
+            }
+        
+        return {
+            'success': True,
+            'solution_overview': solution_overview,
             'key_requirements': key_requirements,
             'technical_solutions': matched_solutions,
             'system_architecture': system_architecture,
@@ -60,67 +74,6 @@ class SolutionGenerator:
             'generated_at': datetime.now().isoformat()
         }
     
-    def _load_solution_templates(self) -> Dict:
-        """加载方案模板库"""
-        return {
-            '云计算方案': {
-                'keywords': ['云平台', '虚拟化', 'IaaS', 'PaaS', 'SaaS'],
-                'template': {
-                    'architecture': ['云服务器', '负载均衡', '云数据库', '云存储'],
-                    'advantages': ['弹性扩展', '按需付费', '高可用性', '运维简单'],
-                    'implementation': ['环境规划', '迁移方案', '安全配置', '监控部署']
-                }
-            },
-            '大数据方案': {
-                'keywords': ['大数据', '数据分析', 'Hadoop', 'Spark', '数据仓库'],
-                'template': {
-                    'architecture': ['数据采集', '数据存储', '数据处理', '数据展示'],
-                    'advantages': ['海量数据处理', '实时分析', '智能决策', '数据挖掘'],
-                    'implementation': ['平台搭建', '数据建模', 'ETL开发', '报表开发']
-                }
-            },
-            'AI智能方案': {
-                'keywords': ['人工智能', '机器学习', '深度学习', 'AI', '算法'],
-                'template': {
-                    'architecture': ['数据预处理', '模型训练', '模型部署', '智能应用'],
-                    'advantages': ['智能识别', '自动决策', '预测分析', '效率提升'],
-                    'implementation': ['数据准备', '算法选择', '模型训练', '系统集成']
-                }
-            },
-            '物联网方案': {
-                'keywords': ['物联网', 'IoT', '传感器', '智能设备', '边缘计算'],
-                'template': {
-                    'architecture': ['感知层', '网络层', '平台层', '应用层'],
-                    'advantages': ['实时监控', '远程控制', '数据采集', '智能管理'],
-                    'implementation': ['设备部署', '网络配置', '平台开发', '应用集成']
-                }
-            }
-        }
-    
-    def _load_tech_library(self) -> Dict:
-        """加载技术库"""
-        return {
-            '服务器': {
-                'Intel': ['Xeon Silver', 'Xeon Gold', 'Xeon Platinum'],
-                'AMD': ['EPYC 7002', 'EPYC 7003', 'EPYC 9000'],
-                'specs': ['双路CPU', '128GB内存', '2TB SSD']
-            },
-            '网络设备': {
-                'Cisco': ['Catalyst 9000', 'ASR 1000', 'ISR 4000'],
-                'Huawei': ['CloudEngine', 'NetEngine', 'USG6000'],
-                'H3C': ['S12500', 'MSR3600', 'SecPath F1000']
-            },
-            '数据库': {
-                'Oracle': ['Oracle 19c', 'Oracle 21c'],
-                'MySQL': ['MySQL 8.0', 'MySQL 8.4'],
-                'PostgreSQL': ['PostgreSQL 14', 'PostgreSQL 15']
-            },
-            '操作系统': {
-                'Linux': ['CentOS 8', 'Ubuntu 20.04', 'Red Hat 8'],
-                'Windows': ['Windows Server 2019', 'Windows Server 2022']
-            }
-        }
-    
     def _extract_key_requirements(self, bid_analysis: Dict) -> List[Dict]:
         """提取关键需求"""
         requirements = []
@@ -150,32 +103,24 @@ class SolutionGenerator:
         
         return requirements[:20]  # 限制数量
     
-    def _match_solutions(self, requirements: List[Dict]) -> List[Dict]:
+    def _find_keywords(self, requirements: List[Dict]) -> Set[str]:
+        """找出需求文本中出现的全部模板和方案类型关键词"""
+        requirement_text = ' '.join([req['description'] for req in requirements])
+        return self.knowledge.find_keywords(requirement_text)
+    
+    def _match_solutions(self, found_keywords: Set[str]) -> List[Dict]:
         """匹配技术方案"""
         matched = []
         
-        # 分析需求文本，匹配对应方案
-        requirement_text = ' '.join([req['description'] for req in requirements])
-        
-        for solution_name, solution_data in self.solution_templates.items():
-            score = 0
-            matched_keywords = []
-            
-            # 计算匹配度
-            for keyword in solution_data['keywords']:
-                if keyword in requirement_text:
-                    score += 1
-                    matched_keywords.append(keyword)
-            
-            if score > 0:
-                matched.append({
-                    'solution_name': solution_name,
-                    'match_score': score,
-                    'matched_keywords': matched_keywords,
-                    'architecture': solution_data['template']['architecture'],
-                    'advantages': solution_data['template']['advantages'],
-                    'implementation_steps': solution_data['template']['implementation']
-                })
+        for hit in self.knowledge.template_hits(found_keywords):
+            matched.append({
+                'solution_name': hit['name'],
+                'match_score': len(hit['matched_keywords']),
+                'matched_keywords': hit['matched_keywords'],
+                'architecture': hit['template']['architecture'],
+                'advantages': hit['template']['advantages'],
+                'implementation_steps': hit['template']['implementation']
+            })
         
         # 按匹配度排序
         matched.sort(key=lambda x: x['match_score'], reverse=True)
@@ -369,20 +314,9 @@ class SolutionGenerator:
         
         return '未命名项目'
     
-    def _determine_solution_type(self, requirements: List[Dict]) -> str:
+    def _determine_solution_type(self, found_keywords: Set[str]) -> str:
         """确定方案类型"""
-        requirement_text = ' '.join([req['description'] for req in requirements])
-        
-        if any(word in requirement_text for word in ['云', '虚拟化', 'SaaS']):
-            return '云计算解决方案'
-        elif any(word in requirement_text for word in ['大数据', '数据分析', '数据仓库']):
-            return '大数据解决方案'
-        elif any(word in requirement_text for word in ['AI', '人工智能', '机器学习']):
-            return 'AI智能解决方案'
-        elif any(word in requirement_text for word in ['物联网', 'IoT', '传感器']):
-            return '物联网解决方案'
-        else:
-            return '信息化系统解决方案'
+        return self.knowledge.solution_type(found_keywords)
     
     def _estimate_budget(self, requirements: List[Dict]) -> str:
         """估算预算"""
@@ -0,0 +1,80 @@
+"""
+方案知识库模块
+方案模板、方案类型和技术库保存在数据文件中，进程内只加载一次；
+全部模板和方案类型的关键词编译为一个多关键词匹配器，一次扫描需求文本即可得到各模板的命中情况
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Set
+
+from .config_loader import get_config
+from .keyword_matcher import KeywordMatcher
+
+KNOWLEDGE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'solution_knowledge.json')
+
+_solution_knowledge = None
+_solution_knowledge_lock = threading.Lock()
+
+
+class SolutionKnowledge:
+    """方案知识库"""
+
+    def __init__(self, data: Dict):
+        """
+        参数:
+            data: 知识库内容（solution_templates、solution_types、default_solution_type、tech_library）
+        """
+        self.solution_templates = data.get('solution_templates', {})
+        self.solution_types = data.get('solution_types', [])
+        self.default_solution_type = data.get('default_solution_type', '信息化系统解决方案')
+        self.tech_library = data.get('tech_library', {})
+
+        keywords = [keyword for template in self.solution_templates.values() for keyword in template['keywords']]
+        keywords += [keyword for solution_type in self.solution_types for keyword in solution_type['keywords']]
+        self.matcher = KeywordMatcher(keywords)
+
+    def find_keywords(self, text: str) -> Set[str]:
+        """一次扫描返回文本中出现的全部模板和方案类型关键词"""
+        return self.matcher.find_all(text)
+
+    def template_hits(self, found: Set[str]) -> List[Dict]:
+        """
+        各模板命中的关键词
+
+        参数:
+            found: find_keywords() 的结果
+
+        返回:
+            List[Dict]: 有命中的模板（按模板顺序），含 name、template、matched_keywords（按模板关键词顺序）
+        """
+        hits = []
+        for name, template in self.solution_templates.items():
+            matched = [keyword for keyword in template['keywords'] if keyword in found]
+            if matched:
+                hits.append({'name': name, 'template': template['template'], 'matched_keywords': matched})
+        return hits
+
+    def solution_type(self, found: Set[str]) -> str:
+        """按顺序取第一个有关键词命中的方案类型，都未命中时返回默认类型"""
+        for solution_type in self.solution_types:
+            if any(keyword in found for keyword in solution_type['keywords']):
+                return solution_type['name']
+        return self.default_solution_type
+
+
+def load_knowledge(path: str = KNOWLEDGE_PATH) -> SolutionKnowledge:
+    """读取知识库文件"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return SolutionKnowledge(json.load(f))
+
+
+def get_solution_knowledge() -> SolutionKnowledge:
+    """获取进程内共享的方案知识库（路径取 config.json 的 solution_generator.knowledge_path）"""
+    global _solution_knowledge
+
+    with _solution_knowledge_lock:
+        if _solution_knowledge is None:
+            path = get_config('solution_generator').get('knowledge_path') or KNOWLEDGE_PATH
+            _solution_knowledge = load_knowledge(path)
+        return _solution_knowledge
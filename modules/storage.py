@@ -0,0 +1,406 @@
+"""
+数据存储模块
+使用SQLite持久化上传记录、文档、提取文本、解析结果、技术方案和供应商查找结果
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from .config_loader import get_config
+from .instrumentation import record_cache
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_hash TEXT NOT NULL UNIQUE,
+    file_name TEXT NOT NULL,
+    file_type TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    text_length INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_hash TEXT NOT NULL,
+    original_name TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    uploaded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_uploads_hash ON uploads(file_hash);
+
+CREATE TABLE IF NOT EXISTS document_texts (
+    document_id INTEGER PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+    text TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    result TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_document ON analyses(document_id, id);
+
+CREATE TABLE IF NOT EXISTS analysis_indexes (
+    analysis_id INTEGER PRIMARY KEY REFERENCES analyses(id) ON DELETE CASCADE,
+    section_index TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS solutions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    analysis_id INTEGER REFERENCES analyses(id) ON DELETE SET NULL,
+    result TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_solutions_analysis ON solutions(analysis_id, id);
+
+CREATE TABLE IF NOT EXISTS supplier_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    solution_id INTEGER REFERENCES solutions(id) ON DELETE SET NULL,
+    requirements TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_supplier_results_solution ON supplier_results(solution_id, id);
+'''
+
+# 过期记录的清理间隔（秒）
+PURGE_INTERVAL = 3600
+
+
+class ResultCache:
+    """进程内的结果缓存：按条目数LRU淘汰，超过有效期的条目失效"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600):
+        """
+        参数:
+            max_entries: 最大条目数，0表示不缓存
+            ttl_seconds: 条目有效期（秒）
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Dict]:
+        """读取缓存，未命中或已过期时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value: Dict):
+        """写入缓存"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class BidStorage:
+    """业务数据存储"""
+
+    def __init__(self, path: str = 'data/bidspeed.db', retention_days: float = 30,
+                 cache_entries: int = 256, cache_ttl_seconds: float = 3600):
+        """
+        初始化存储并建表
+
+        参数:
+            path: SQLite数据库文件路径
+            retention_days: 解析结果、技术方案和供应商结果的保留天数，0表示永久保留
+            cache_entries: 内存中缓存的结果数量
+            cache_ttl_seconds: 内存缓存有效期（秒）
+        """
+        self.path = path
+        self.retention_days = retention_days
+        # 方案生成和供应商查找按ID读取刚保存的结果，热数据直接从内存返回
+        self._cache = ResultCache(cache_entries, cache_ttl_seconds)
+        self._last_purge = 0.0
+        self._purge_lock = threading.Lock()
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.commit()
+        self.purge_expired()
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程使用独立连接（WAL模式下读写互不阻塞）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    # ---------- 上传记录 ----------
+
+    def save_upload(self, file_hash: str, original_name: str, file_path: str, size: int) -> int:
+        """记录一次上传（相同内容的文件共用一个blob，每次上传的原始文件名单独记录），返回上传ID"""
+        conn = self._connect()
+        with conn:
+            return conn.execute(
+                'INSERT INTO uploads (file_hash, original_name, file_path, size, uploaded_at) VALUES (?, ?, ?, ?, ?)',
+                (file_hash, original_name, file_path, size, _now())
+            ).lastrowid
+
+    def get_upload(self, upload_id: int) -> Optional[Dict]:
+        """按ID查询上传记录"""
+        row = self._connect().execute('SELECT * FROM uploads WHERE id = ?', (upload_id,)).fetchone()
+        return dict(row) if row else None
+
+    # ---------- 文档 ----------
+
+    def save_document(self, file_hash: str, file_name: str, file_type: str,
+                      file_path: str, text: str) -> int:
+        """
+        保存文档及其提取文本，相同内容的文档只保存一次
+
+        返回:
+            int: 文档ID
+        """
+        existing = self.get_document_by_hash(file_hash)
+        if existing:
+            return existing['id']
+
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO documents (file_hash, file_name, file_type, file_path, text_length, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (file_hash, file_name, file_type, file_path, len(text), _now())
+            )
+            if cursor.rowcount == 0:
+                # 并发上传同一文件时由另一请求先写入
+                return self.get_document_by_hash(file_hash)['id']
+
+            document_id = cursor.lastrowid
+            conn.execute('INSERT INTO document_texts (document_id, text) VALUES (?, ?)', (document_id, text))
+        return document_id
+
+    def get_document(self, document_id: int) -> Optional[Dict]:
+        """按ID查询文档信息"""
+        row = self._connect().execute('SELECT * FROM documents WHERE id = ?', (document_id,)).fetchone()
+        return dict(row) if row else None
+
+    def get_document_by_hash(self, file_hash: str) -> Optional[Dict]:
+        """按内容哈希查询文档信息"""
+        row = self._connect().execute('SELECT * FROM documents WHERE file_hash = ?', (file_hash,)).fetchone()
+        return dict(row) if row else None
+
+    def get_document_text(self, document_id: int) -> Optional[str]:
+        """读取文档的提取文本"""
+        row = self._connect().execute(
+            'SELECT text FROM document_texts WHERE document_id = ?', (document_id,)
+        ).fetchone()
+        return row['text'] if row else None
+
+    # ---------- 解析结果 ----------
+
+    def save_analysis(self, document_id: int, result: Dict, section_index: Optional[Dict] = None) -> int:
+        """保存解析结果，返回解析ID（section_index 为修订版增量解析使用的段落索引，单独保存）"""
+        analysis_id = self._insert_result(
+            'INSERT INTO analyses (document_id, result, created_at) VALUES (?, ?, ?)',
+            (document_id, _dumps(result), _now())
+        )
+        if section_index is not None:
+            conn = self._connect()
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO analysis_indexes (analysis_id, section_index) VALUES (?, ?)',
+                             (analysis_id, _dumps(section_index)))
+        self._cache.put(('analysis', analysis_id),
+                        dict(result, analysis_id=analysis_id, document_id=document_id))
+        return analysis_id
+
+    def get_analysis(self, analysis_id: int) -> Optional[Dict]:
+        """按ID读取解析结果（返回的结果可能与缓存共享，调用方不应修改）"""
+        cached = self._cache.get(('analysis', analysis_id))
+        record_cache('result', cached is not None)
+        if cached is not None:
+            return cached
+
+        row = self._connect().execute(
+            'SELECT id, document_id, result FROM analyses WHERE id = ?', (analysis_id,)
+        ).fetchone()
+        result = self._load_analysis(row)
+        if result is not None:
+            self._cache.put(('analysis', analysis_id), result)
+        return result
+
+    def get_latest_analysis(self, document_id: int) -> Optional[Dict]:
+        """读取文档最近一次的解析结果"""
+        row = self._connect().execute(
+            'SELECT id FROM analyses WHERE document_id = ? ORDER BY id DESC LIMIT 1', (document_id,)
+        ).fetchone()
+        return self.get_analysis(row['id']) if row else None
+
+    def get_analysis_index(self, analysis_id: int) -> Optional[Dict]:
+        """读取解析结果的段落索引"""
+        row = self._connect().execute(
+            'SELECT section_index FROM analysis_indexes WHERE analysis_id = ?', (analysis_id,)
+        ).fetchone()
+        return json.loads(row['section_index']) if row else None
+
+    def _load_analysis(self, row) -> Optional[Dict]:
+        if row is None:
+            return None
+        result = json.loads(row['result'])
+        result['analysis_id'] = row['id']
+        result['document_id'] = row['document_id']
+        return result
+
+    # ---------- 技术方案 ----------
+
+    def save_solution(self, analysis_id: Optional[int], result: Dict) -> int:
+        """保存技术方案，返回方案ID"""
+        solution_id = self._insert_result(
+            'INSERT INTO solutions (analysis_id, result, created_at) VALUES (?, ?, ?)',
+            (analysis_id, _dumps(result), _now())
+        )
+        self._cache.put(('solution', solution_id),
+                        dict(result, solution_id=solution_id, analysis_id=analysis_id))
+        return solution_id
+
+    def get_solution(self, solution_id: int) -> Optional[Dict]:
+        """按ID读取技术方案（返回的结果可能与缓存共享，调用方不应修改）"""
+        cached = self._cache.get(('solution', solution_id))
+        record_cache('result', cached is not None)
+        if cached is not None:
+            return cached
+
+        row = self._connect().execute(
+            'SELECT id, analysis_id, result FROM solutions WHERE id = ?', (solution_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        result = json.loads(row['result'])
+        result['solution_id'] = row['id']
+        result['analysis_id'] = row['analysis_id']
+        self._cache.put(('solution', solution_id), result)
+        return result
+
+    def get_latest_solution(self, document_id: int) -> Optional[Dict]:
+        """读取文档最近一次生成的技术方案"""
+        row = self._connect().execute(
+            'SELECT solutions.id FROM solutions JOIN analyses ON solutions.analysis_id = analyses.id '
+            'WHERE analyses.document_id = ? ORDER BY solutions.id DESC LIMIT 1', (document_id,)
+        ).fetchone()
+        return self.get_solution(row['id']) if row else None
+
+    # ---------- 供应商查找结果 ----------
+
+    def save_supplier_result(self, solution_id: Optional[int], requirements: Dict, result: Dict) -> int:
+        """保存供应商查找结果，返回记录ID"""
+        return self._insert_result(
+            'INSERT INTO supplier_results (solution_id, requirements, result, created_at) VALUES (?, ?, ?, ?)',
+            (solution_id, _dumps(requirements), _dumps(result), _now())
+        )
+
+    def get_supplier_result(self, result_id: int) -> Optional[Dict]:
+        """按ID读取供应商查找结果"""
+        row = self._connect().execute(
+            'SELECT id, solution_id, result FROM supplier_results WHERE id = ?', (result_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        result = json.loads(row['result'])
+        result['supplier_result_id'] = row['id']
+        result['solution_id'] = row['solution_id']
+        return result
+
+    # ---------- 过期清理 ----------
+
+    def purge_expired(self) -> int:
+        """
+        删除超过保留天数的解析结果、技术方案和供应商结果，
+        以及超过保留天数、已没有解析结果且期间未被再次上传的文档（提取文本随之删除）
+
+        返回:
+            int: 删除的记录数
+        """
+        self._last_purge = time.monotonic()
+        if not self.retention_days:
+            return 0
+
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        conn = self._connect()
+        with conn:
+            removed = 0
+            for table in ('supplier_results', 'solutions', 'analyses'):
+                removed += conn.execute(f'DELETE FROM {table} WHERE created_at < ?', (cutoff,)).rowcount
+            removed += conn.execute(
+                'DELETE FROM documents WHERE created_at < ? '
+                'AND NOT EXISTS (SELECT 1 FROM analyses WHERE analyses.document_id = documents.id) '
+                'AND NOT EXISTS (SELECT 1 FROM uploads WHERE uploads.file_hash = documents.file_hash '
+                'AND uploads.uploaded_at >= ?)',
+                (cutoff, cutoff)
+            ).rowcount
+        if removed:
+            self._cache.clear()
+        return removed
+
+    def _insert_result(self, sql: str, params: tuple) -> int:
+        conn = self._connect()
+        with conn:
+            row_id = conn.execute(sql, params).lastrowid
+
+        # 写入时顺带清理过期记录，间隔内最多执行一次
+        if time.monotonic() - self._last_purge > PURGE_INTERVAL and self._purge_lock.acquire(blocking=False):
+            try:
+                self.purge_expired()
+            finally:
+                self._purge_lock.release()
+        return row_id
+
+
+def _dumps(value: Dict) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> BidStorage:
+    """获取进程内共享的存储实例（路径取 DATABASE_PATH 环境变量或 config.json 的 database.path）"""
+    global _storage
+
+    with _storage_lock:
+        if _storage is None:
+            db_config = get_config('database')
+            _storage = BidStorage(
+                path=os.getenv('DATABASE_PATH') or db_config.get('path', 'data/bidspeed.db'),
+                retention_days=db_config.get('retention_days', 30),
+                cache_entries=db_config.get('result_cache_entries', 256),
+                cache_ttl_seconds=db_config.get('result_cache_ttl_minutes', 60) * 60
+            )
+        return _storage
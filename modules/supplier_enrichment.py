@@ -0,0 +1,104 @@
+"""
+供应商信息补充模块
+把各供应商的联系信息、信用等级、资质等查询并发提交到有界线程池，
+每项查询从开始执行时单独计时（在线程池中排队的时间不计入），超时或失败时使用默认值并记录原因，其余结果照常返回；
+线程池被卡住的查询占满时，排队超过超时时间仍未开始的查询直接取消，整次补充最多耗时两倍超时时间
+"""
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional
+
+from .config_loader import get_config
+from .instrumentation import submit
+
+
+class SupplierEnricher:
+    """并发的供应商信息补充"""
+
+    def __init__(self, lookups: Dict[str, Callable[[str], Any]], defaults: Optional[Dict[str, Any]] = None,
+                 timeout: float = 5.0, executor: Optional[ThreadPoolExecutor] = None):
+        """
+        参数:
+            lookups: 字段名 -> 查询函数（参数为公司名称），结果按此顺序写入供应商信息
+            defaults: 查询超时或失败时各字段使用的默认值
+            timeout: 单项查询的超时时间（秒，从该查询开始执行时计算；排队超过该时间仍未开始的查询取消）
+            executor: 执行查询的线程池，默认使用进程内共享的线程池
+        """
+        self.lookups = lookups
+        self.defaults = defaults or {}
+        self.timeout = timeout
+        self.executor = executor or get_enrichment_executor()
+
+    def enrich(self, suppliers: List[Dict]) -> List[Dict]:
+        """
+        补充供应商详细信息
+
+        参数:
+            suppliers: 供应商列表，每项需包含 name
+
+        返回:
+            List[Dict]: 补充后的供应商列表；有查询未成功时，
+                        enrichment_errors 中记录各字段的失败原因
+        """
+        futures = [
+            {field: self._submit(lookup, supplier['name']) for field, lookup in self.lookups.items()}
+            for supplier in suppliers
+        ]
+        # 查询须在此时间前开始执行，开始后再有 timeout 秒完成
+        start_deadline = time.monotonic() + self.timeout
+
+        enriched = []
+        for supplier, supplier_futures in zip(suppliers, futures):
+            detailed_info = dict(supplier)
+            errors = {}
+            for field, (future, started) in supplier_futures.items():
+                try:
+                    # 等待查询开始执行，再按开始时间计算剩余时间；
+                    # 排队超时的查询取消（取消失败说明恰好开始执行，照常等待）
+                    if not started.wait(max(start_deadline - time.monotonic(), 0)) and future.cancel():
+                        raise FutureTimeoutError()
+                    started.wait()
+                    detailed_info[field] = future.result(timeout=max(started.at + self.timeout - time.monotonic(), 0))
+                except FutureTimeoutError:
+                    # 超时的查询结束后结果丢弃
+                    detailed_info[field] = copy.deepcopy(self.defaults.get(field))
+                    errors[field] = f'查询超时（{self.timeout}秒）'
+                except Exception as e:
+                    detailed_info[field] = copy.deepcopy(self.defaults.get(field))
+                    errors[field] = f'查询失败: {str(e)}'
+
+            if errors:
+                detailed_info['enrichment_errors'] = errors
+            enriched.append(detailed_info)
+
+        return enriched
+
+    def _submit(self, lookup: Callable[[str], Any], company_name: str):
+        """提交查询，返回 (future, 开始执行事件)，事件的 at 属性为开始执行的时间"""
+        started = threading.Event()
+
+        def run():
+            started.at = time.monotonic()
+            started.set()
+            return lookup(company_name)
+
+        return submit(self.executor, run), started
+
+
+_enrichment_executor = None
+_enrichment_executor_lock = threading.Lock()
+
+
+def get_enrichment_executor() -> ThreadPoolExecutor:
+    """获取进程内共享的查询线程池（大小取 config.json 的 supplier_enrichment.max_workers）"""
+    global _enrichment_executor
+
+    with _enrichment_executor_lock:
+        if _enrichment_executor is None:
+            max_workers = get_config('supplier_enrichment').get('max_workers', 32)
+            _enrichment_executor = ThreadPoolExecutor(max_workers=max_workers,
+                                                      thread_name_prefix='bidspeed-enrich')
+        return _enrichment_executor
@@ -5,15 +5,41 @@
 import re
 import json
 import requests
-from typing import Dict, List
+from typing import Dict, List, Optional
 from bs4 import BeautifulSoup
 import time
 
+from .config_loader import get_config
+from .instrumentation import stage
+from .supplier_enrichment import SupplierEnricher
+from .supplier_index import extract_brands, get_supplier_index
+from .supplier_profile_cache import get_supplier_profile_cache
+from .supplier_ranking import get_supplier_ranker
+from .tokenizer import tokenize
+
+# 供应商信息查询失败时使用的默认值
+ENRICHMENT_DEFAULTS = {
+    'contact_info': {
+        'contact_person': '销售经理',
+        'phone': '待查询',
+        'email': '待查询',
+        'address': '待查询'
+    },
+    'credit_rating': '未知',
+    'business_scope': [],
+    'past_projects': [],
+    'certifications': []
+}
+
 class SupplierFinder:
     """供应商查找器"""
     
     def __init__(self):
         """初始化查找器"""
+        # 本地供应商目录索引，网络搜索只在索引未命中时使用
+        self.index = get_supplier_index()
+        self.top_k = get_config('supplier_index').get('top_k', 20)
+        self.ranker = get_supplier_ranker()
         self.search_engines = {
             'baidu': 'https://www.baidu.com/s?wd=',
             'bing': 'https://www.bing.com/search?q='
@@ -21,6 +47,24 @@ class SupplierFinder:
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
+        lookups = {
+            'contact_info': self._get_contact_info,
+            'credit_rating': self._get_credit_rating,
+            'business_scope': self._get_business_scope,
+            'past_projects': self._get_past_projects,
+            'certifications': self._get_certifications
+        }
+        # 常见供应商的档案直接从缓存读取，过期的在后台刷新
+        profile_cache = get_supplier_profile_cache()
+        if profile_cache is not None:
+            lookups = {field: profile_cache.wrap(field, lookup) for field, lookup in lookups.items()}
+        
+        # 各供应商的各项信息并发查询
+        self.enricher = SupplierEnricher(
+            lookups=lookups,
+            defaults=ENRICHMENT_DEFAULTS,
+            timeout=get_config('supplier_enrichment').get('lookup_timeout', 5)
+        )
     
     def find(self, requirements: Dict) -> Dict:
         """
@@ -33,19 +77,20 @@ class SupplierFinder:
             Dict: 包含前3家供应商信息的字典
         """
         # 提取搜索关键词
-        keywords = self._extract_keywords(requirements)
+        with stage('supplier.keywords'):
+            keywords = self._extract_keywords(requirements)
         
         # 搜索供应商
-        suppliers = self._search_suppliers(keywords)
+        with stage('supplier.search'):
+            suppliers = self._search_suppliers(keywords)
         
         # 获取详细信息
-        detailed_suppliers = self._enrich_supplier_info(suppliers)
+        with stage('supplier.enrich'):
+            detailed_suppliers = self._enrich_supplier_info(suppliers)
         
         # 评分排序
-        ranked_suppliers = self._rank_suppliers(detailed_suppliers, requirements)
-        
-        # 返回前3家
-        top3 = ranked_suppliers[:3]
+        with stage('supplier.rank'):
+            top3 = self._rank_suppliers(detailed_suppliers, requirements, top_k=3)
         
         return {
             'success': True,
@@ -76,28 +121,34 @@ class SupplierFinder:
         keywords.append('供应商')
         keywords.append('厂商')
         
-        # 去重
-        keywords = list(set(keywords))
+        # 去重（保持顺序，产品名称优先）
+        keywords = list(dict.fromkeys(keywords))
         return keywords[:5]  # 限制关键词数量
     
     def _extract_brands(self, text: str) -> List[str]:
         """从文本中提取品牌名称"""
-        # 常见IT品牌列表
-        known_brands = [
-            'Dell', 'HP', 'Lenovo', 'Huawei', 'H3C', 'Cisco', 
-            'IBM', 'Oracle', 'Microsoft', 'Intel', 'AMD',
-            '华为', '联想', '浪潮', '曙光', '新华三', '中兴'
-        ]
-        
-        brands = []
-        for brand in known_brands:
-            if brand.lower() in text.lower() or brand in text:
-                brands.append(brand)
-        
-        return brands
+        return extract_brands(text)
     
     def _search_suppliers(self, keywords: List[str]) -> List[Dict]:
-        """搜索供应商（模拟搜索结果）"""
+        """从本地供应商目录检索，未命中时使用网络搜索结果（不写入目录，避免覆盖已整理的供应商信息）"""
+        results = self.index.search(' '.join(keywords), self.top_k)
+        if not results:
+            return self._web_search_suppliers(keywords)
+        
+        suppliers = []
+        for result in results:
+            matched_terms = set(result['matched_terms'])
+            supplier = result['supplier']
+            supplier['matched_keywords'] = [
+                keyword for keyword in keywords
+                if tokenize(keyword) and set(tokenize(keyword)) <= matched_terms
+            ]
+            supplier['relevance_score'] = result['score']
+            suppliers.append(supplier)
+        return suppliers
+    
+    def _web_search_suppliers(self, keywords: List[str]) -> List[Dict]:
+        """网络搜索供应商（模拟搜索结果）"""
         # 实际应用中这里应该调用真实的搜索API或爬虫
         # 这里使用模拟数据演示
         
@@ -138,22 +189,9 @@ class SupplierFinder:
     
     def _enrich_supplier_info(self, suppliers: List[Dict]) -> List[Dict]:
         """补充供应商详细信息"""
-        enriched = []
-        
-        for supplier in suppliers:
-            # 实际应用中这里应该查询企业信用信息系统
-            # 这里使用模拟数据
-            detailed_info = {
-                **supplier,
-                'contact_info': self._get_contact_info(supplier['name']),
-                'credit_rating': self._get_credit_rating(supplier['name']),
-                'business_scope': self._get_business_scope(supplier['name']),
-                'past_projects': self._get_past_projects(supplier['name']),
-                'certifications': self._get_certifications(supplier['name'])
-            }
-            enriched.append(detailed_info)
-        
-        return enriched
+        # 实际应用中这里应该查询企业信用信息系统
+        # 这里使用模拟数据
+        return self.enricher.enrich(suppliers)
     
     def _get_contact_info(self, company_name: str) -> Dict:
         """获取联系信息（模拟）"""
@@ -207,6 +245,9 @@ class SupplierFinder:
     
     def _get_business_scope(self, company_name: str) -> List[str]:
         """获取经营范围"""
+        catalogued = self.index.get(company_name)
+        if catalogued and catalogued.get('business_scope'):
+            return catalogued['business_scope']
         return [
             '计算机软硬件开发与销售',
             '系统集成服务',
@@ -240,6 +281,9 @@ class SupplierFinder:
     
     def _get_certifications(self, company_name: str) -> List[str]:
         """获取资质证书"""
+        catalogued = self.index.get(company_name)
+        if catalogued and catalogued.get('certifications'):
+            return catalogued['certifications']
         return [
             'ISO9001质量管理体系认证',
             'ISO27001信息安全管理体系认证',
@@ -248,46 +292,10 @@ class SupplierFinder:
             '高新技术企业证书'
         ]
     
-    def _rank_suppliers(self, suppliers: List[Dict], requirements: Dict) -> List[Dict]:
-        """对供应商进行评分排序"""
-        scored_suppliers = []
-        
-        for supplier in suppliers:
-            score = 0
-            scoring_detail = {}
-            
-            # 信用等级评分（30分）
-            credit_scores = {'AAA': 30, 'AA+': 25, 'AA': 20, 'A+': 15}
-            credit_score = credit_scores.get(supplier['credit_rating'], 10)
-            score += credit_score
-            scoring_detail['credit_score'] = credit_score
-            
-            # 历史业绩评分（30分）
-            past_projects = supplier.get('past_projects', [])
-            project_score = min(len(past_projects) * 10, 30)
-            score += project_score
-            scoring_detail['project_score'] = project_score
-            
-            # 资质证书评分（20分）
-            certifications = supplier.get('certifications', [])
-            cert_score = min(len(certifications) * 4, 20)
-            score += cert_score
-            scoring_detail['cert_score'] = cert_score
-            
-            # 关键词匹配度评分（20分）
-            matched_keywords = supplier.get('matched_keywords', [])
-            keyword_score = min(len(matched_keywords) * 10, 20)
-            score += keyword_score
-            scoring_detail['keyword_score'] = keyword_score
-            
-            supplier['total_score'] = score
-            supplier['scoring_detail'] = scoring_detail
-            scored_suppliers.append(supplier)
-        
-        # 按总分排序
-        scored_suppliers.sort(key=lambda x: x['total_score'], reverse=True)
-        
-        return scored_suppliers
+    def _rank_suppliers(self, suppliers: List[Dict], requirements: Dict, top_k: Optional[int] = None) -> List[Dict]:
+        """对供应商进行评分排序（权重按招标类别取自 supplier_ranking 配置），返回前top_k家"""
+        category = requirements.get('category') or requirements.get('industry')
+        return self.ranker.rank(suppliers, category=category, top_k=top_k)
 
 
 def find_suppliers(requirements: Dict) -> Dict:
@@ -307,4 +315,24 @@ def find_suppliers(requirements: Dict) -> Dict:
         Dict: 供应商查找结果
     """
     finder = SupplierFinder()
-    return finder.find(requirements)
\ No newline at end of file
+    return finder.find(requirements)
+
+def requirements_from_key_requirements(key_requirements: List[Dict], category: Optional[str] = None) -> Dict:
+    """
+    把技术方案中的关键需求列表转换为供应商需求
+    
+    参数:
+        key_requirements: 技术方案的 key_requirements
+        category: 招标类别（如技术方案的 solution_type），用于选择评分权重
+    
+    返回:
+        Dict: find_suppliers 所需的供应商需求
+    """
+    return {
+        'product_names': [],
+        'tech_requirements': [
+            item.get('description', '') for item in key_requirements if isinstance(item, dict)
+        ],
+        'industry': 'IT设备',
+        'category': category
+    }
@@ -0,0 +1,450 @@
+"""
+供应商检索模块
+本地供应商目录的倒排索引：按名称、经营范围、资质、产品线和品牌检索，BM25排序。
+新增和更新的供应商先写入内存缓冲区，flush() 时落盘为只读索引段；
+索引段的倒排表以内存映射方式读取，更新通过删除标记实现，compact() 合并索引段
+"""
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .config_loader import get_config
+from .supplier_profile_cache import normalize_company_name
+from .tokenizer import tokenize
+
+# 常见IT品牌列表
+KNOWN_BRANDS = [
+    'Dell', 'HP', 'Lenovo', 'Huawei', 'H3C', 'Cisco',
+    'IBM', 'Oracle', 'Microsoft', 'Intel', 'AMD',
+    '华为', '联想', '浪潮', '曙光', '新华三', '中兴'
+]
+
+# 各字段的词频权重
+FIELD_BOOSTS = {
+    'name': 3,
+    'brands': 2,
+    'product_lines': 2,
+    'business_scope': 1,
+    'certifications': 1,
+    'description': 1
+}
+
+# 倒排表记录：文档ID、加权词频
+POSTING_DTYPE = np.dtype([('doc', '<u4'), ('tf', '<f4')])
+
+MANIFEST_NAME = 'manifest.json'
+
+CATALOGUE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'supplier_catalogue.json')
+
+
+def extract_brands(text: str) -> List[str]:
+    """从文本中提取品牌名称"""
+    brands = []
+    for brand in KNOWN_BRANDS:
+        if brand.lower() in text.lower() or brand in text:
+            brands.append(brand)
+    return brands
+
+
+def supplier_terms(supplier: Dict) -> Dict[str, float]:
+    """计算供应商各检索词的加权词频（品牌另外从名称、描述和产品线中识别）"""
+    fields = dict(supplier)
+    text = ' '.join([supplier.get('name', ''), supplier.get('description', '')] + supplier.get('product_lines', []))
+    fields['brands'] = list(dict.fromkeys(supplier.get('brands', []) + extract_brands(text)))
+
+    terms = defaultdict(float)
+    for field, boost in FIELD_BOOSTS.items():
+        value = fields.get(field) or ''
+        if isinstance(value, list):
+            value = ' '.join(value)
+        for token in tokenize(value):
+            terms[token] += boost
+    return dict(terms)
+
+
+class Segment:
+    """只读索引段：词典和文档信息在内存中，倒排表以内存映射方式读取"""
+
+    def __init__(self, directory: str, name: str):
+        self.name = name
+        self.directory = directory
+        with open(os.path.join(directory, f'{name}.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        self.terms = meta['terms']
+        self.docs = {int(doc_id): doc for doc_id, doc in meta['docs'].items()}
+        self.doc_ids = np.array(sorted(self.docs), dtype=np.uint32)
+        self.lengths = np.array([self.docs[doc_id]['length'] for doc_id in self.doc_ids], dtype=np.float32)
+
+        postings_path = os.path.join(directory, f'{name}.post')
+        if os.path.getsize(postings_path):
+            self.postings = np.memmap(postings_path, dtype=POSTING_DTYPE, mode='r')
+        else:
+            self.postings = np.empty(0, dtype=POSTING_DTYPE)
+
+    def postings_for(self, term: str) -> np.ndarray:
+        entry = self.terms.get(term)
+        if entry is None:
+            return self.postings[:0]
+        start, count = entry
+        return self.postings[start:start + count]
+
+    def lengths_for(self, doc_ids: np.ndarray) -> np.ndarray:
+        return self.lengths[np.searchsorted(self.doc_ids, doc_ids)]
+
+    def paths(self) -> List[str]:
+        return [os.path.join(self.directory, f'{self.name}.json'), os.path.join(self.directory, f'{self.name}.post')]
+
+    def close(self):
+        mmap = getattr(self.postings, '_mmap', None)
+        self.postings = np.empty(0, dtype=POSTING_DTYPE)
+        if mmap is not None:
+            mmap.close()
+
+    @staticmethod
+    def write(directory: str, name: str, docs: Dict[int, Dict], postings: Dict[str, Dict[int, float]]):
+        """写入索引段（倒排表为连续的定长记录，词典记录各词的起止位置）"""
+        terms = {}
+        records = []
+        for term in sorted(postings):
+            entries = sorted(postings[term].items())
+            terms[term] = [len(records), len(entries)]
+            records.extend(entries)
+
+        array = np.array(records, dtype=POSTING_DTYPE)
+        postings_path = os.path.join(directory, f'{name}.post')
+        with open(f'{postings_path}.tmp', 'wb') as f:
+            f.write(array.tobytes())
+        os.replace(f'{postings_path}.tmp', postings_path)
+
+        meta_path = os.path.join(directory, f'{name}.json')
+        with open(f'{meta_path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'terms': terms, 'docs': {str(doc_id): doc for doc_id, doc in docs.items()}},
+                      f, ensure_ascii=False)
+        os.replace(f'{meta_path}.tmp', meta_path)
+
+
+class SupplierIndex:
+    """供应商倒排索引"""
+
+    def __init__(self, index_dir: str = 'data/supplier_index', k1: float = 1.2, b: float = 0.75,
+                 flush_threshold: int = 500, max_segments: int = 8):
+        """
+        打开（或新建）索引
+
+        参数:
+            index_dir: 索引目录
+            k1, b: BM25参数
+            flush_threshold: 缓冲区文档数达到该值时自动落盘
+            max_segments: 索引段数量超过该值时自动合并
+        """
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self.flush_threshold = flush_threshold
+        self.max_segments = max_segments
+        self._lock = threading.RLock()
+        os.makedirs(index_dir, exist_ok=True)
+
+        manifest = self._read_manifest()
+        self._next_doc_id = manifest['next_doc_id']
+        self._next_segment = manifest['next_segment']
+        self._deleted = set(manifest['deleted'])
+        self._segments = [Segment(index_dir, name) for name in manifest['segments']]
+        # 最近一次导入的供应商目录：文件内容哈希和其中供应商的规范化名称
+        self._catalogue_hash = manifest.get('catalogue_hash')
+        self._catalogue_keys = manifest.get('catalogue_keys', [])
+
+        # 有效文档：规范化名称 -> 文档ID，文档ID -> (文档长度, 所在索引段，缓冲区中为None)
+        self._keys = {}
+        self._live = {}
+        for segment in self._segments:
+            for doc_id, doc in segment.docs.items():
+                if doc_id not in self._deleted:
+                    self._keys[doc['key']] = doc_id
+                    self._live[doc_id] = (doc['length'], segment)
+        self._total_length = sum(length for length, _ in self._live.values())
+
+        self._buffer_docs = {}
+        self._buffer_postings = defaultdict(dict)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, supplier: Dict) -> int:
+        """
+        添加供应商，同名（规范化后）的供应商已存在时替换为新内容
+
+        返回:
+            int: 文档ID
+        """
+        key = normalize_company_name(supplier['name'])
+        terms = supplier_terms(supplier)
+        length = sum(terms.values())
+
+        with self._lock:
+            self._remove_key(key)
+
+            doc_id = self._next_doc_id
+            self._next_doc_id += 1
+            self._buffer_docs[doc_id] = {'key': key, 'length': length, 'supplier': supplier}
+            for term, tf in terms.items():
+                self._buffer_postings[term][doc_id] = tf
+            self._keys[key] = doc_id
+            self._live[doc_id] = (length, None)
+            self._total_length += length
+
+            if len(self._buffer_docs) >= self.flush_threshold:
+                self.flush()
+        return doc_id
+
+    def remove(self, name: str) -> bool:
+        """删除供应商，不存在时返回False"""
+        with self._lock:
+            return self._remove_key(normalize_company_name(name))
+
+    def get(self, name: str) -> Optional[Dict]:
+        """按公司名称读取供应商信息"""
+        with self._lock:
+            doc_id = self._keys.get(normalize_company_name(name))
+            if doc_id is None:
+                return None
+            return dict(self._doc(doc_id)['supplier'])
+
+    def search(self, query: str, top_k: int = 10) -> List[Dict]:
+        """
+        BM25检索
+
+        参数:
+            query: 查询文本
+            top_k: 返回的结果数
+
+        返回:
+            List[Dict]: 按相关度降序排列，每项包含 supplier、score、matched_terms
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            doc_count = len(self._live)
+            if not terms or not doc_count or top_k <= 0:
+                return []
+            avg_length = self._total_length / doc_count
+            deleted = np.fromiter(self._deleted, dtype=np.uint32, count=len(self._deleted))
+
+            doc_parts = []
+            score_parts = []
+            term_docs = {}
+            for term in terms:
+                docs, tfs, lengths = self._collect_postings(term, deleted)
+                if not len(docs):
+                    continue
+
+                df = len(docs)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths / avg_length)
+                doc_parts.append(docs)
+                score_parts.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+                term_docs[term] = docs
+
+            if not doc_parts:
+                return []
+
+            unique_docs, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+
+            # 只对前k个结果排序（同分按文档ID）
+            k = min(top_k, len(unique_docs))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.lexsort((unique_docs[top], -scores[top]))]
+
+            results = []
+            for index in top:
+                doc_id = int(unique_docs[index])
+                results.append({
+                    'supplier': dict(self._doc(doc_id)['supplier']),
+                    'score': round(float(scores[index]), 4),
+                    'matched_terms': [term for term, docs in term_docs.items() if (docs == doc_id).any()]
+                })
+            return results
+
+    def sync_catalogue(self, path: str = CATALOGUE_PATH) -> bool:
+        """
+        导入供应商目录：目录文件内容与上次导入时相同则跳过，
+        否则重新导入全部条目，并删除上次导入而新目录中已没有的供应商
+
+        返回:
+            bool: 是否重新导入
+        """
+        with open(path, 'rb') as f:
+            content = f.read()
+        catalogue_hash = hashlib.sha256(content).hexdigest()
+
+        with self._lock:
+            if catalogue_hash == self._catalogue_hash:
+                return False
+
+            suppliers = json.loads(content.decode('utf-8'))
+            keys = [normalize_company_name(supplier['name']) for supplier in suppliers]
+            for key in set(self._catalogue_keys) - set(keys):
+                self._remove_key(key)
+            for supplier in suppliers:
+                self.add(supplier)
+
+            self._catalogue_hash = catalogue_hash
+            self._catalogue_keys = keys
+            # 替换的条目在旧索引段中只是标记删除，重新导入后合并索引段
+            self.compact()
+            return True
+
+    def flush(self):
+        """把缓冲区写为新的索引段"""
+        with self._lock:
+            if self._buffer_docs:
+                name = self._new_segment_name()
+                Segment.write(self.index_dir, name, self._buffer_docs, self._buffer_postings)
+                segment = Segment(self.index_dir, name)
+                self._segments.append(segment)
+                for doc_id in self._buffer_docs:
+                    self._live[doc_id] = (self._live[doc_id][0], segment)
+                self._buffer_docs = {}
+                self._buffer_postings = defaultdict(dict)
+
+            self._write_manifest()
+            if len(self._segments) > self.max_segments:
+                self.compact()
+
+    def compact(self):
+        """合并全部索引段和缓冲区，清除已删除的文档"""
+        with self._lock:
+            docs = {doc_id: self._doc(doc_id) for doc_id in sorted(self._live)}
+            postings = defaultdict(dict)
+            for doc_id, doc in docs.items():
+                for term, tf in supplier_terms(doc['supplier']).items():
+                    postings[term][doc_id] = tf
+
+            old_segments = self._segments
+            name = self._new_segment_name()
+            Segment.write(self.index_dir, name, docs, postings)
+            segment = Segment(self.index_dir, name)
+
+            self._segments = [segment]
+            self._live = {doc_id: (length, segment) for doc_id, (length, _) in self._live.items()}
+            self._deleted = set()
+            self._buffer_docs = {}
+            self._buffer_postings = defaultdict(dict)
+            self._write_manifest()
+
+            for old in old_segments:
+                old.close()
+                for path in old.paths():
+                    if os.path.exists(path):
+                        os.remove(path)
+
+    def close(self):
+        """落盘并关闭内存映射"""
+        with self._lock:
+            self.flush()
+            for segment in self._segments:
+                segment.close()
+
+    def _collect_postings(self, term: str, deleted: np.ndarray):
+        """汇总各索引段和缓冲区中某个词的倒排记录（排除已删除文档）"""
+        doc_parts, tf_parts, length_parts = [], [], []
+        for segment in self._segments:
+            postings = segment.postings_for(term)
+            if len(postings):
+                docs = np.asarray(postings['doc'])
+                doc_parts.append(docs)
+                tf_parts.append(np.asarray(postings['tf'], dtype=np.float64))
+                length_parts.append(segment.lengths_for(docs).astype(np.float64))
+
+        buffered = self._buffer_postings.get(term)
+        if buffered:
+            doc_parts.append(np.fromiter(buffered.keys(), dtype=np.uint32, count=len(buffered)))
+            tf_parts.append(np.fromiter(buffered.values(), dtype=np.float64, count=len(buffered)))
+            length_parts.append(np.array([self._buffer_docs[doc_id]['length'] for doc_id in buffered],
+                                         dtype=np.float64))
+
+        if not doc_parts:
+            return np.empty(0, dtype=np.uint32), np.empty(0), np.empty(0)
+
+        docs, tfs, lengths = np.concatenate(doc_parts), np.concatenate(tf_parts), np.concatenate(length_parts)
+        if len(deleted):
+            keep = ~np.isin(docs, deleted)
+            docs, tfs, lengths = docs[keep], tfs[keep], lengths[keep]
+        return docs, tfs, lengths
+
+    def _doc(self, doc_id: int) -> Dict:
+        segment = self._live[doc_id][1]
+        return self._buffer_docs[doc_id] if segment is None else segment.docs[doc_id]
+
+    def _remove_key(self, key: str) -> bool:
+        doc_id = self._keys.pop(key, None)
+        if doc_id is None:
+            return False
+
+        length, segment = self._live.pop(doc_id)
+        self._total_length -= length
+        if segment is None:
+            # 尚未落盘的文档直接从缓冲区删除
+            for term in supplier_terms(self._buffer_docs.pop(doc_id)['supplier']):
+                self._buffer_postings[term].pop(doc_id, None)
+        else:
+            self._deleted.add(doc_id)
+        return True
+
+    def _new_segment_name(self) -> str:
+        name = f'seg_{self._next_segment:06d}'
+        self._next_segment += 1
+        return name
+
+    def _read_manifest(self) -> Dict:
+        path = os.path.join(self.index_dir, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return {'segments': [], 'next_doc_id': 0, 'next_segment': 0, 'deleted': []}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        path = os.path.join(self.index_dir, MANIFEST_NAME)
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump({
+                'segments': [segment.name for segment in self._segments],
+                'next_doc_id': self._next_doc_id,
+                'next_segment': self._next_segment,
+                'deleted': sorted(self._deleted),
+                'catalogue_hash': self._catalogue_hash,
+                'catalogue_keys': self._catalogue_keys
+            }, f, ensure_ascii=False)
+        os.replace(f'{path}.tmp', path)
+
+
+def load_catalogue(path: str = CATALOGUE_PATH) -> List[Dict]:
+    """读取供应商目录"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+_supplier_index = None
+_supplier_index_lock = threading.Lock()
+
+
+def get_supplier_index() -> SupplierIndex:
+    """
+    获取进程内共享的供应商索引（路径取 config.json 的 supplier_index.path），
+    供应商目录文件（supplier_index.catalogue_path，默认内置目录）有修改时重新导入
+    """
+    global _supplier_index
+
+    with _supplier_index_lock:
+        if _supplier_index is None:
+            index_config = get_config('supplier_index')
+            index = SupplierIndex(index_config.get('path', 'data/supplier_index'))
+            index.sync_catalogue(index_config.get('catalogue_path') or CATALOGUE_PATH)
+            _supplier_index = index
+        return _supplier_index
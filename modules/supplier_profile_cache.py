@@ -0,0 +1,183 @@
+"""
+供应商档案缓存模块
+以规范化公司名称为键持久化供应商的联系信息、信用等级、资质等查询结果，
+各字段有独立的有效期，过期后先返回旧值并在后台刷新
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .config_loader import get_config
+from .instrumentation import record_cache
+
+# 各字段默认有效期（小时）：信用等级每天更新，资质证书每月更新
+DEFAULT_TTL_HOURS = {
+    'contact_info': 168,
+    'credit_rating': 24,
+    'business_scope': 720,
+    'past_projects': 168,
+    'certifications': 720
+}
+
+# 比较公司名称时忽略的组织形式后缀
+COMPANY_SUFFIX_PATTERN = re.compile(r'(股份有限公司|有限责任公司|有限公司|股份公司|集团公司|公司)$')
+
+
+def normalize_company_name(name: str) -> str:
+    """
+    规范化公司名称：全角转半角、去除空白和括号中的地区说明、去除组织形式后缀、英文转小写
+
+    例如 "联想（北京）有限公司 " 与 "联想(北京)有限公司" 得到相同的结果
+    """
+    text = unicodedata.normalize('NFKC', name or '')
+    text = re.sub(r'\s+', '', text)
+    text = re.sub(r'\((中国|北京|上海|深圳|广州)\)', r'\1', text)
+    text = COMPANY_SUFFIX_PATTERN.sub('', text)
+    return text.lower()
+
+
+class SupplierProfileCache:
+    """供应商档案缓存"""
+
+    def __init__(self, path: str = 'data/supplier_profiles.db', ttl_hours: Optional[Dict[str, float]] = None,
+                 default_ttl_hours: float = 168, max_stale_factor: float = 4, refresh_workers: int = 2):
+        """
+        初始化缓存
+
+        参数:
+            path: SQLite数据库文件路径
+            ttl_hours: 各字段的有效期（小时），未配置的字段使用 default_ttl_hours
+            default_ttl_hours: 默认有效期（小时）
+            max_stale_factor: 过期后仍可返回旧值的时长（有效期的倍数），超过后同步重新查询
+            refresh_workers: 后台刷新线程数
+        """
+        self.ttl_seconds = {field: hours * 3600 for field, hours in {**DEFAULT_TTL_HOURS, **(ttl_hours or {})}.items()}
+        self.default_ttl_seconds = default_ttl_hours * 3600
+        self.max_stale_factor = max_stale_factor
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._refresh_executor = ThreadPoolExecutor(max_workers=refresh_workers,
+                                                    thread_name_prefix='bidspeed-profile-refresh')
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS supplier_profiles (
+                company_key TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (company_key, field)
+            )
+        ''')
+        self._conn.commit()
+
+    def get(self, company_name: str, field: str) -> Optional[Tuple[Any, float]]:
+        """读取缓存的字段值，返回 (值, 已缓存秒数)，未缓存时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, fetched_at FROM supplier_profiles WHERE company_key = ? AND field = ?',
+                (normalize_company_name(company_name), field)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), time.time() - row[1]
+
+    def put(self, company_name: str, field: str, value: Any):
+        """写入字段值"""
+        raw = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO supplier_profiles (company_key, field, value, fetched_at) VALUES (?, ?, ?, ?)',
+                (normalize_company_name(company_name), field, raw, time.time())
+            )
+            self._conn.commit()
+
+    def fetch(self, company_name: str, field: str, lookup: Callable[[str], Any]) -> Any:
+        """
+        读取字段值：有效期内直接返回缓存；过期不久的返回旧值并在后台刷新；
+        未缓存或过期太久时同步查询并写入缓存
+
+        参数:
+            company_name: 公司名称
+            field: 字段名
+            lookup: 查询函数（参数为公司名称）
+        """
+        ttl = self.ttl_seconds.get(field, self.default_ttl_seconds)
+        cached = self.get(company_name, field)
+        record_cache('supplier_profile', cached is not None)
+
+        if cached is not None:
+            value, age = cached
+            if age <= ttl:
+                return value
+            if age <= ttl * self.max_stale_factor:
+                self._refresh_in_background(company_name, field, lookup)
+                return value
+
+        value = lookup(company_name)
+        self.put(company_name, field, value)
+        return value
+
+    def wrap(self, field: str, lookup: Callable[[str], Any]) -> Callable[[str], Any]:
+        """返回带缓存的查询函数"""
+        return lambda company_name: self.fetch(company_name, field, lookup)
+
+    def wait_for_refreshes(self, timeout: float = 30) -> bool:
+        """等待进行中的后台刷新完成，超时返回False"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._refreshing:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def _refresh_in_background(self, company_name: str, field: str, lookup: Callable[[str], Any]):
+        """后台刷新字段值，同一字段同时只刷新一次，刷新失败时保留旧值"""
+        key = (normalize_company_name(company_name), field)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.put(company_name, field, lookup(company_name))
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_executor.submit(refresh)
+
+
+_profile_cache = None
+_profile_cache_lock = threading.Lock()
+
+
+def get_supplier_profile_cache() -> Optional[SupplierProfileCache]:
+    """获取进程内共享的供应商档案缓存（按 config.json 的 supplier_profile_cache 配置创建），关闭时返回None"""
+    global _profile_cache
+
+    cache_config = get_config('supplier_profile_cache')
+    if not cache_config.get('enabled', True):
+        return None
+
+    with _profile_cache_lock:
+        if _profile_cache is None:
+            _profile_cache = SupplierProfileCache(
+                path=cache_config.get('path', 'data/supplier_profiles.db'),
+                ttl_hours=cache_config.get('ttl_hours'),
+                max_stale_factor=cache_config.get('max_stale_factor', 4)
+            )
+        return _profile_cache
@@ -0,0 +1,127 @@
+"""
+供应商评分模块
+把全部候选供应商的信用、业绩、资质和关键词匹配整理为特征矩阵，一次向量化计算总分，
+按招标类别使用不同权重，只对前k名排序
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .config_loader import get_config
+
+# 特征顺序（与权重、评分明细字段一一对应）
+FEATURES = ['credit', 'projects', 'certifications', 'keywords']
+
+SCORE_FIELDS = {
+    'credit': 'credit_score',
+    'projects': 'project_score',
+    'certifications': 'cert_score',
+    'keywords': 'keyword_score'
+}
+
+# 各项满分（即默认权重）
+DEFAULT_WEIGHTS = {'credit': 30, 'projects': 30, 'certifications': 20, 'keywords': 20}
+
+# 信用等级对应的得分比例，未知等级按1/3计
+CREDIT_LEVELS = {'AAA': 1.0, 'AA+': 25 / 30, 'AA': 20 / 30, 'A+': 15 / 30}
+UNKNOWN_CREDIT_LEVEL = 10 / 30
+
+# 计数类特征达到满分所需的数量：3个项目、5项资质、2个关键词
+SATURATION = {'projects': 3, 'certifications': 5, 'keywords': 2}
+
+
+def build_feature_matrix(suppliers: List[Dict]) -> np.ndarray:
+    """
+    构建特征矩阵（行为供应商，列为 FEATURES），各特征归一化到0~1
+    """
+    count = len(suppliers)
+    credit = np.fromiter((CREDIT_LEVELS.get(s.get('credit_rating'), UNKNOWN_CREDIT_LEVEL) for s in suppliers),
+                         dtype=np.float64, count=count)
+    counts = np.array([
+        [len(s.get('past_projects') or []), len(s.get('certifications') or []), len(s.get('matched_keywords') or [])]
+        for s in suppliers
+    ], dtype=np.float64).reshape(count, 3)
+    saturation = np.array([SATURATION['projects'], SATURATION['certifications'], SATURATION['keywords']],
+                          dtype=np.float64)
+    return np.column_stack([credit, np.minimum(counts / saturation, 1.0)])
+
+
+class SupplierRanker:
+    """供应商评分排序"""
+
+    def __init__(self, default_weights: Optional[Dict[str, float]] = None,
+                 category_weights: Optional[Dict[str, Dict[str, float]]] = None):
+        """
+        参数:
+            default_weights: 默认权重（各项满分），缺少的项使用 DEFAULT_WEIGHTS
+            category_weights: 招标类别 -> 权重，类别名称包含在招标类别中即匹配
+        """
+        self.default_weights = {**DEFAULT_WEIGHTS, **(default_weights or {})}
+        self.category_weights = {
+            category: {**self.default_weights, **weights} for category, weights in (category_weights or {}).items()
+        }
+
+    def weights_for(self, category: Optional[str]) -> Dict[str, float]:
+        """取招标类别对应的权重"""
+        if category:
+            for name, weights in self.category_weights.items():
+                if name in category:
+                    return weights
+        return self.default_weights
+
+    def rank(self, suppliers: List[Dict], category: Optional[str] = None,
+             top_k: Optional[int] = None) -> List[Dict]:
+        """
+        评分并返回前k名（同分保持原顺序）
+
+        参数:
+            suppliers: 候选供应商，会写入 total_score 和 scoring_detail
+            category: 招标类别
+            top_k: 返回数量，None表示全部
+
+        返回:
+            List[Dict]: 按总分降序排列的供应商
+        """
+        if not suppliers:
+            return []
+
+        weights = self.weights_for(category)
+        weight_vector = np.array([weights[feature] for feature in FEATURES], dtype=np.float64)
+        feature_scores = build_feature_matrix(suppliers) * weight_vector
+        # 舍去浮点误差，避免同分供应商因误差改变先后顺序
+        totals = np.round(feature_scores.sum(axis=1), 6)
+
+        count = len(suppliers)
+        k = count if top_k is None else max(min(top_k, count), 0)
+        if k == 0:
+            return []
+        if k == count:
+            top = np.arange(count)
+        else:
+            # 先用部分排序求出第k名的分数，只对不低于该分数的候选排序（同分时第k名附近也按原顺序取）
+            threshold = -np.partition(-totals, k - 1)[k - 1]
+            top = np.flatnonzero(totals >= threshold)
+        top = top[np.lexsort((top, -totals[top]))][:k]
+
+        ranked = []
+        for index in top:
+            supplier = suppliers[index]
+            supplier['total_score'] = _as_number(totals[index])
+            supplier['scoring_detail'] = {
+                SCORE_FIELDS[feature]: _as_number(feature_scores[index, column])
+                for column, feature in enumerate(FEATURES)
+            }
+            ranked.append(supplier)
+        return ranked
+
+
+def _as_number(value: float):
+    """整数分值输出为int，其余保留两位小数"""
+    value = round(float(value), 2)
+    return int(value) if value.is_integer() else value
+
+
+def get_supplier_ranker() -> SupplierRanker:
+    """按 config.json 的 supplier_ranking 配置创建评分器"""
+    ranking_config = get_config('supplier_ranking')
+    return SupplierRanker(ranking_config.get('default_weights'), ranking_config.get('category_weights'))
@@ -0,0 +1,28 @@
+"""
+分词模块
+中文按相邻两字切分（bigram），英文和数字按单词切分，用于检索索引
+"""
+import re
+import unicodedata
+from typing import List
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+|[㐀-鿿豈-﫿]+')
+
+CJK_RUN_PATTERN = re.compile(r'[㐀-鿿豈-﫿]')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    切分文本
+
+    全角字符先转为半角、英文转小写；连续中文按相邻两字切分，单个汉字保留为一个词
+
+    例如 "华为服务器 Intel Xeon" -> ['华为', '为服', '服务', '务器', 'intel', 'xeon']
+    """
+    tokens = []
+    for run in TOKEN_PATTERN.findall(unicodedata.normalize('NFKC', text or '').lower()):
+        if CJK_RUN_PATTERN.match(run) and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
@@ -0,0 +1,104 @@
+"""
+上传文件存储模块
+上传内容分块写入临时文件的同时计算SHA-256，写完后按内容哈希改名为blob文件，
+相同内容的文件只保存一份，原始文件名作为元数据记录在数据库中
+"""
+import hashlib
+import os
+import uuid
+from typing import BinaryIO, Dict
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class HashingFile:
+    """边写入边计算SHA-256的临时文件（只支持从头顺序写入，之后可读取）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._file = open(path, 'w+b')
+
+    def write(self, data: bytes) -> int:
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+    def __getattr__(self, name):
+        # read/seek/close 等操作交给底层文件
+        return getattr(self._file, name)
+
+
+class UploadStore:
+    """按内容寻址的上传文件存储"""
+
+    def __init__(self, root: str = 'uploads'):
+        """
+        参数:
+            root: 存储根目录，blob保存在 root/blobs/<哈希前两位>/，写入中的临时文件在 root/tmp/
+        """
+        self.root = root
+        self.blob_dir = os.path.join(root, 'blobs')
+        self.tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def create_temp(self) -> HashingFile:
+        """创建写入中的临时文件（可作为Flask/Werkzeug接收上传文件的流）"""
+        return HashingFile(os.path.join(self.tmp_dir, f'{uuid.uuid4().hex}.part'))
+
+    def commit(self, temp: HashingFile, filename: str) -> Dict:
+        """
+        把写完的临时文件转为blob，相同内容已存在时丢弃临时文件
+
+        参数:
+            temp: create_temp() 返回的临时文件
+            filename: 原始文件名（只使用其扩展名，文档解析按扩展名识别格式）
+
+        返回:
+            Dict: file_hash、file_path（blob路径）、size、deduplicated（是否已有相同内容）
+        """
+        temp.close()
+        file_hash = temp.hexdigest()
+        blob_path = self.blob_path(file_hash, filename)
+        deduplicated = os.path.exists(blob_path)
+        if deduplicated:
+            os.remove(temp.path)
+        else:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            # 同一目录树内改名是原子操作，并发上传相同内容时后写入者覆盖的内容相同
+            os.replace(temp.path, blob_path)
+        return {'file_hash': file_hash, 'file_path': blob_path, 'size': temp.size, 'deduplicated': deduplicated}
+
+    def discard(self, temp: HashingFile):
+        """删除未提交的临时文件"""
+        temp.close()
+        if os.path.exists(temp.path):
+            os.remove(temp.path)
+
+    def save(self, stream: BinaryIO, filename: str) -> Dict:
+        """
+        分块保存任意文件流（返回值同 commit）
+
+        流本身就是 create_temp() 创建的临时文件时直接提交，不再复制
+        """
+        if isinstance(stream, HashingFile):
+            return self.commit(stream, filename)
+
+        temp = self.create_temp()
+        try:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                temp.write(chunk)
+        except Exception:
+            self.discard(temp)
+            raise
+        return self.commit(temp, filename)
+
+    def blob_path(self, file_hash: str, filename: str) -> str:
+        """内容哈希对应的blob路径（保留扩展名）"""
+        return os.path.join(self.blob_dir, file_hash[:2], file_hash + os.path.splitext(filename)[1].lower())
+
@@ -30,6 +30,267 @@ def test_document_processor():
         print(f"✗ 模块导入失败: {e}")
         return False
 
+def test_document_pages():
+    """测试逐页提取"""
+    print("\n=== 测试逐页提取 ===")
+    try:
+        from modules.document_processor import iter_document_pages, extract_text
+        
+        test_file = 'test_data/sample_bid.txt'
+        pages = list(iter_document_pages(test_file))
+        offset = 0
+        for page in pages:
+            if page['start_offset'] != offset or page['end_offset'] != offset + len(page['text']):
+                print(f"✗ 第{page['page_number']}页偏移量错误")
+                return False
+            offset = page['end_offset']
+        
+        if ''.join(page['text'] for page in pages) != extract_text(test_file):
+            print("✗ 逐页文本与完整文本不一致")
+            return False
+        
+        print("✓ 逐页提取正常")
+        print(f"  - 页数: {len(pages)}")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_pdf_parallel():
+    """测试PDF多进程并行提取"""
+    print("\n=== 测试PDF并行提取 ===")
+    try:
+        import tempfile
+        import PyPDF2
+        from benchmarks.corpus import generate_lines, write_pdf
+        from modules import document_processor
+        from modules.config_loader import get_config
+        
+        processing_config = get_config('document_processing')
+        saved_config = dict(processing_config)
+        try:
+            with tempfile.TemporaryDirectory() as work_dir:
+                pdf_path = os.path.join(work_dir, '标书.pdf')
+                write_pdf(pdf_path, generate_lines(400, seed=3), lines_per_page=40)
+                expected = [page.extract_text() for page in PyPDF2.PdfReader(pdf_path).pages]
+                
+                # 页数达到阈值时按页码范围分给进程池提取，结果按页序逐页与顺序提取一致
+                processing_config.update(pdf_workers=2, pdf_parallel_threshold_pages=4)
+                if document_processor._pdf_parallel_settings() != (2, 4):
+                    print("✗ 并行提取配置读取错误")
+                    return False
+                parallel = [text for text, _ in document_processor._iter_pdf_text_layers(pdf_path)]
+                if document_processor._pdf_executor is None or document_processor._pdf_executor_workers != 2:
+                    print("✗ 未使用进程池提取")
+                    return False
+                if parallel != expected:
+                    print("✗ 并行提取结果与顺序提取不一致")
+                    return False
+                if document_processor._get_pdf_executor(2) is not document_processor._pdf_executor:
+                    print("✗ 进程池未复用")
+                    return False
+                
+                # 关闭并行后走顺序提取
+                document_processor.disable_parallel_pdf()
+                if document_processor._pdf_parallel_settings()[0] != 1:
+                    print("✗ 关闭并行后进程数不为1")
+                    return False
+                document_processor._pdf_executor.shutdown()
+                document_processor._pdf_executor = None
+                sequential = [text for text, _ in document_processor._iter_pdf_text_layers(pdf_path)]
+                if sequential != expected or document_processor._pdf_executor is not None:
+                    print("✗ 关闭并行后仍使用进程池")
+                    return False
+        finally:
+            processing_config.clear()
+            processing_config.update(saved_config)
+            document_processor._pdf_parallel_enabled = True
+        
+        print("✓ PDF并行提取正常")
+        print(f"  - 页数: {len(expected)}")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_docx_streaming():
+    """测试DOCX流式解析"""
+    print("\n=== 测试DOCX流式解析 ===")
+    try:
+        import os
+        import tempfile
+        from docx import Document
+        from modules.document_processor import extract_word_text
+        
+        with tempfile.TemporaryDirectory() as work_dir:
+            path = os.path.join(work_dir, '标书.docx')
+            document = Document()
+            document.add_paragraph('三、技术参数')
+            paragraph = document.add_paragraph('CPU')
+            paragraph.add_run('\t≥32核')
+            table = document.add_table(rows=2, cols=3)
+            for row, cells in enumerate([['序号', '参数', '评分'], ['1', '内存≥128GB', '5分']]):
+                for column, text in enumerate(cells):
+                    table.cell(row, column).text = text
+            table.cell(1, 1).add_paragraph('支持扩展')
+            document.add_paragraph('四、评分标准')
+            document.save(path)
+            
+            # 段落和表格行按文档顺序输出，单元格之间以制表符分隔
+            expected = '三、技术参数\nCPU\t≥32核\n序号\t参数\t评分\n1\t内存≥128GB 支持扩展\t5分\n四、评分标准\n'
+            if extract_word_text(path) != expected:
+                print(f"✗ 解析结果错误: {extract_word_text(path)!r}")
+                return False
+        
+        print("✓ DOCX流式解析正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_txt_encoding():
+    """测试TXT编码识别和流式解码"""
+    print("\n=== 测试TXT编码识别 ===")
+    try:
+        import os
+        import tempfile
+        from modules import document_processor
+        from modules.document_processor import extract_txt_text
+        
+        text = '\r\n'.join(f'第{i}条 技术要求：服务器配置 CPU≥32核' for i in range(500)) + '\r\n'
+        expected = text.replace('\r\n', '\n')
+        with tempfile.TemporaryDirectory() as work_dir:
+            path = os.path.join(work_dir, '标书.txt')
+            original_chunk = document_processor.TXT_CHUNK_BYTES
+            # 块很小时多字节字符和 \r\n 会被块边界切开
+            document_processor.TXT_CHUNK_BYTES = 7
+            try:
+                for encoding in ['utf-8', 'utf-8-sig', 'gbk', 'gb18030', 'utf-16']:
+                    with open(path, 'wb') as f:
+                        f.write(text.encode(encoding))
+                    if extract_txt_text(path) != expected:
+                        print(f"✗ {encoding} 编码解码错误")
+                        return False
+            finally:
+                document_processor.TXT_CHUNK_BYTES = original_chunk
+            
+            # 开头是纯ASCII、中间才出现GBK中文时，中间的采样仍能识别出GBK
+            with open(path, 'wb') as f:
+                f.write(b'a' * 200000 + '技术要求'.encode('gbk') + b'b' * 200000)
+            if '技术要求' not in extract_txt_text(path):
+                print("✗ GBK编码识别错误")
+                return False
+        
+        print("✓ TXT编码识别正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_pdf_ocr():
+    """测试扫描页OCR"""
+    print("\n=== 测试扫描页OCR ===")
+    try:
+        import os
+        import tempfile
+        import PyPDF2
+        from PIL import Image, ImageDraw
+        from benchmarks.corpus import generate_lines, write_pdf
+        from modules import ocr
+        from modules.document_processor import _iter_pdf_text_layers
+        from modules.extraction_cache import ExtractionCache
+        
+        with tempfile.TemporaryDirectory() as work_dir:
+            # 构造第1页有文字层、第2~3页为扫描图片的PDF
+            images = []
+            for index in range(2):
+                image = Image.new('RGB', (200, 200), 'white')
+                ImageDraw.Draw(image).text((10, 10 + 50 * index), f'scan {index}', fill='black')
+                images.append(image)
+            images[0].save(os.path.join(work_dir, 'scan.pdf'), save_all=True, append_images=images[1:])
+            write_pdf(os.path.join(work_dir, 'text.pdf'), generate_lines(30, 1))
+            writer = PyPDF2.PdfWriter()
+            for name in ['text.pdf', 'scan.pdf']:
+                for page in PyPDF2.PdfReader(os.path.join(work_dir, name)).pages:
+                    writer.add_page(page)
+            pdf_path = os.path.join(work_dir, 'mixed.pdf')
+            writer.write(pdf_path)
+            
+            pages = list(_iter_pdf_text_layers(pdf_path, ocr_min_chars=10))
+            if pages[0][1] is not None or not pages[1][1] or pages[1][1] == pages[2][1]:
+                print("✗ 扫描页识别错误")
+                return False
+            
+            # 本机不一定安装Tesseract，用替身记录需要识别的页码
+            recognized = []
+            original_ocr_page = ocr.ocr_page
+            ocr.ocr_page = lambda path, page_number, *args: recognized.append(page_number) or f'第{page_number}页识别结果'
+            try:
+                pdf_ocr = ocr.PdfOCR(workers=1, cache=ExtractionCache(os.path.join(work_dir, 'ocr_cache'), '1'))
+                texts = list(pdf_ocr.fill_pages(pdf_path, iter(pages)))
+                # 再次处理时命中页面缓存
+                list(pdf_ocr.fill_pages(pdf_path, iter(pages)))
+            finally:
+                ocr.ocr_page = original_ocr_page
+            
+            if texts[0] != pages[0][0] or texts[1:] != ['第2页识别结果', '第3页识别结果'] or recognized != [2, 3]:
+                print(f"✗ OCR结果错误: {recognized}")
+                return False
+        
+        print("✓ 扫描页OCR正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_extraction_cache():
+    """测试文本提取缓存"""
+    print("\n=== 测试文本提取缓存 ===")
+    try:
+        import tempfile
+        from modules.extraction_cache import ExtractionCache
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = ExtractionCache(cache_dir, version='1', memory_limit_bytes=10)
+            cache.put('a' * 64, '标书正文内容')
+            cache.put('b' * 64, '另一份标书正文')
+            
+            # 内存层容量不足时仍可从磁盘层读取
+            if cache.get('a' * 64) != '标书正文内容':
+                print("✗ 缓存读取失败")
+                return False
+            
+            # 提取器版本变更后缓存失效
+            upgraded = ExtractionCache(cache_dir, version='2')
+            if upgraded.get('a' * 64) is not None:
+                print("✗ 版本变更后缓存未失效")
+                return False
+        
+        print("✓ 文本提取缓存正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_keyword_matcher():
+    """测试多关键词匹配"""
+    print("\n=== 测试多关键词匹配 ===")
+    try:
+        from modules.keyword_matcher import KeywordMatcher
+        
+        matcher = KeywordMatcher(['大数据', '数据分析', '数据', '云', '云平台'])
+        found = matcher.find_all('建设大数据分析云平台')
+        expected = {'大数据', '数据分析', '数据', '云', '云平台'}
+        if found != expected:
+            print(f"✗ 匹配结果错误: {found}")
+            return False
+        
+        print("✓ 多关键词匹配正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
 def test_bid_analyzer():
     """测试标书解析模块"""
     print("\n=== 测试标书解析模块 ===")
@@ -55,6 +316,327 @@ def test_bid_analyzer():
         print(f"✗ 模块测试失败: {e}")
         return False
 
+def test_rule_index():
+    """测试评分细则匹配"""
+    print("\n=== 测试评分细则匹配 ===")
+    try:
+        import time
+        from modules.rule_index import RuleIndex
+        
+        rules = [
+            {'line_number': 1, 'content': '服务器CPU性能（10分）', 'score': 10},
+            {'line_number': 2, 'content': '售后服务响应时间（5分）', 'score': 5},
+            {'line_number': 3, 'content': '项目实施方案（8分）', 'score': 8}
+        ]
+        index = RuleIndex(rules)
+        cases = [('服务器CPU配置：≥32核', 10), ('售后服务要求：7×24小时响应', 5), ('机柜颜色要求：黑色', 0)]
+        for text, expected in cases:
+            rule = index.match(text)
+            score = rule['score'] if rule else 0
+            if score != expected:
+                print(f"✗ 匹配错误: {text} -> {score}，应为 {expected}")
+                return False
+        
+        # 大量细则时单次查找只访问共有词的倒排表
+        many = [{'line_number': i, 'content': f'指标{i:05d}项技术参数第{i}条（{i % 10}分）', 'score': i % 10}
+                for i in range(20000)]
+        start = time.time()
+        big_index = RuleIndex(many)
+        for i in range(0, 20000, 10):
+            big_index.match(f'指标{i:05d}项')
+        elapsed = time.time() - start
+        if elapsed > 10:
+            print(f"✗ 大量细则匹配过慢: {elapsed:.1f}秒")
+            return False
+        
+        print("✓ 评分细则匹配正常")
+        print(f"  - 20000条细则建索引并查找2000次耗时: {elapsed:.2f}秒")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_amendment_analysis():
+    """测试修订版增量解析"""
+    print("\n=== 测试修订版增量解析 ===")
+    try:
+        import json
+        import threading
+        from modules.bid_analyzer import BidAnalyzer
+        
+        class FakeClient:
+            max_concurrency = 2
+            
+            def __init__(self):
+                self.calls = 0
+                self.lock = threading.Lock()
+            
+            def chat(self, messages, api_key=None, secret_key=None):
+                with self.lock:
+                    self.calls += 1
+                first_line = messages[0]['content'].split('标书内容：\n', 1)[1].split('\n', 1)[0]
+                return {'result': json.dumps({'关键技术要点': [first_line]}, ensure_ascii=False)}
+        
+        with open('test_data/sample_bid.txt', 'r', encoding='utf-8') as f:
+            text = f.read() * 4
+        amended = text.replace('1. 技术方案（40分）', '1. 技术方案（45分）', 1).replace(
+            '三、', '三、补充：新增配置要求，内存≥256GB\n三、', 1)
+        
+        analyzer = BidAnalyzer(api_key='test', secret_key='test')
+        analyzer.chunk_tokens = 300
+        analyzer.llm_client = FakeClient()
+        base = analyzer.analyze(text)
+        full_calls = analyzer.llm_client.calls
+        
+        analyzer.llm_client = FakeClient()
+        result = analyzer.analyze_amendment(amended, base['section_index'])
+        incremental_calls = analyzer.llm_client.calls
+        
+        # 提取结果与完整重新解析一致，AI调用次数只与变化的段落有关
+        analyzer.llm_client = FakeClient()
+        full = analyzer.analyze(amended)
+        for key in ('key_sections', 'tech_specifications', 'scoring_rules', 'tech_checklist'):
+            if result[key] != full[key]:
+                print(f"✗ 增量解析结果与完整解析不一致: {key}")
+                return False
+        if result['section_index']['blocks'] != full['section_index']['blocks']:
+            print("✗ 段落索引不一致")
+            return False
+        if not 0 < incremental_calls < full_calls or result['amendment']['reused_blocks'] == 0:
+            print(f"✗ 未复用原版结果: {incremental_calls}/{full_calls} {result['amendment']}")
+            return False
+        
+        # 未修改的文档不调用AI
+        analyzer.llm_client = FakeClient()
+        unchanged = analyzer.analyze_amendment(amended, result['section_index'])
+        if analyzer.llm_client.calls != 0 or unchanged['ai_summary'] != result['ai_summary']:
+            print("✗ 未修改的文档重新调用了AI")
+            return False
+        
+        print("✓ 修订版增量解析正常")
+        print(f"  - AI调用次数: 完整解析 {full_calls} 次，增量解析 {incremental_calls} 次")
+        print(f"  - 变更: {len(result['amendment']['changes'])} 处，"
+              f"复用段落 {result['amendment']['reused_blocks']}/{result['amendment']['total_blocks']}")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_llm_client():
+    """测试大模型客户端（本地模拟服务）"""
+    print("\n=== 测试大模型客户端 ===")
+    try:
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from modules.llm_client import LLMClient
+        
+        calls = []
+        
+        class StubHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                calls.append(self.client_address)
+                # 第一次返回429，之后正常返回
+                status = 429 if len(calls) == 1 else 200
+                body = json.dumps({'result': '{"核心需求总结": "测试"}'}).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            client = LLMClient(api_url=f'http://127.0.0.1:{server.server_port}/chat',
+                               timeout=5, qps=100, backoff_base=0.01)
+            response = client.chat([{'role': 'user', 'content': '你好'}])
+            response = client.chat([{'role': 'user', 'content': '你好'}])
+            client.close()
+        finally:
+            server.shutdown()
+        
+        if json.loads(response['result']) != {'核心需求总结': '测试'} or len(calls) != 3:
+            print("✗ 重试或返回结果异常")
+            return False
+        
+        # 三次请求复用同一个连接
+        if len({address for address in calls}) != 1:
+            print("✗ 未复用连接")
+            return False
+        
+        # access_token鉴权：令牌换取一次后复用，服务端返回令牌过期时重新换取
+        from urllib.parse import parse_qs, urlparse
+        from modules.llm_client import clean_credential
+        token_requests = []
+        chat_tokens = []
+        expired = set()
+        
+        class TokenHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if url.path == '/token':
+                    token_requests.append(query)
+                    data = {'access_token': f'token-{len(token_requests)}', 'expires_in': 2592000}
+                else:
+                    chat_tokens.append(query.get('access_token'))
+                    if query.get('access_token') in expired:
+                        data = {'error_code': 111, 'error_msg': 'Access token expired'}
+                    else:
+                        data = {'result': 'ok'}
+                body = json.dumps(data).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer(('127.0.0.1', 0), TokenHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            base_url = f'http://127.0.0.1:{server.server_port}'
+            client = LLMClient(api_url=f'{base_url}/chat', token_url=f'{base_url}/token',
+                               timeout=5, qps=100, backoff_base=0.01)
+            for _ in range(2):
+                client.chat([{'role': 'user', 'content': '你好'}], api_key='ak', secret_key='sk')
+            expired.add('token-1')
+            client.chat([{'role': 'user', 'content': '你好'}], api_key='ak', secret_key='sk')
+            client.close()
+        finally:
+            server.shutdown()
+        
+        if chat_tokens != ['token-1', 'token-1', 'token-1', 'token-2'] or len(token_requests) != 2 or \
+                token_requests[0] != {'grant_type': 'client_credentials', 'client_id': 'ak', 'client_secret': 'sk'}:
+            print(f"✗ access_token鉴权异常: {chat_tokens} {token_requests}")
+            return False
+        
+        # .env.example 的占位值视为未配置
+        if clean_credential('your_api_key_here') or client.has_credentials('ak', clean_credential('your_secret_key_here')):
+            print("✗ 占位密钥未视为未配置")
+            return False
+        
+        print("✓ 大模型客户端正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_llm_cache():
+    """测试大模型响应缓存"""
+    print("\n=== 测试大模型响应缓存 ===")
+    try:
+        import os
+        import tempfile
+        from modules.llm_cache import LLMResponseCache
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = LLMResponseCache(os.path.join(cache_dir, 'llm.db'), max_entries=2)
+            
+            # 空白差异不影响缓存键
+            key = cache.make_key([{'role': 'user', 'content': '分析  标书\n'}], 'wenxin')
+            if key != cache.make_key([{'role': 'user', 'content': '分析 标书'}], 'wenxin'):
+                print("✗ 提示词规范化失败")
+                return False
+            
+            cache.put(key, {'result': '1'})
+            cache.put('k2', {'result': '2'})
+            cache.get(key)
+            cache.put('k3', {'result': '3'})
+            
+            # 超出容量时淘汰最久未访问的条目
+            if cache.get('k2') is not None or cache.get(key) != {'result': '1'}:
+                print("✗ 容量淘汰异常")
+                return False
+            
+            stats = cache.stats()
+            print("✓ 大模型响应缓存正常")
+            print(f"  - 命中/未命中: {stats['hits']}/{stats['misses']}")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_chunked_analysis():
+    """测试分块AI分析"""
+    print("\n=== 测试分块AI分析 ===")
+    try:
+        from modules.chunked_analysis import SectionChunker, estimate_tokens, merge_ai_summaries
+        
+        with open('test_data/sample_bid.txt', 'r', encoding='utf-8') as f:
+            lines = [line for line in f.read().split('\n') if line.strip()] * 20
+        
+        chunker = SectionChunker(token_budget=200)
+        chunks = []
+        for line in lines:
+            chunks.extend(chunker.add_line(line, line[:2] in ('一、', '二、', '三、', '四、', '五、', '六、')))
+        chunks.extend(chunker.finish())
+        
+        # 全文都被覆盖，且每块不超过预算
+        if '\n'.join(chunks).split('\n') != lines or max(estimate_tokens(chunk) for chunk in chunks) > 200:
+            print("✗ 文本切块异常")
+            return False
+        
+        merged = merge_ai_summaries([
+            {'核心需求总结': '服务器采购', '关键技术要点': ['双路CPU']},
+            {'核心需求总结': '软件开发', '关键技术要点': ['双路CPU', '微服务架构']}
+        ])
+        if merged != {'核心需求总结': '服务器采购；软件开发', '关键技术要点': ['双路CPU', '微服务架构']}:
+            print(f"✗ 结果合并异常: {merged}")
+            return False
+        
+        # 读取页面中途出错时，AI分析线程池也被关闭
+        import threading
+        import time
+        from modules.bid_analyzer import BidAnalyzer
+        
+        class SlowClient:
+            max_concurrency = 2
+            
+            def chat(self, messages, api_key=None, secret_key=None):
+                time.sleep(0.05)
+                return {'result': '{}'}
+        
+        def failing_pages():
+            yield {'page_number': 1, 'text': '\n'.join(lines) + '\n'}
+            raise IOError('读取失败')
+        
+        analyzer = BidAnalyzer(api_key='test', secret_key='test')
+        analyzer.chunk_tokens = 200
+        analyzer.llm_client = SlowClient()
+        try:
+            analyzer.analyze_pages(failing_pages())
+            print("✗ 读取错误未抛出")
+            return False
+        except IOError:
+            pass
+        for _ in range(50):
+            if not any(thread.name.startswith('bidspeed-ai') for thread in threading.enumerate()):
+                break
+            time.sleep(0.02)
+        else:
+            print("✗ 出错后AI分析线程池未关闭")
+            return False
+        
+        print("✓ 分块AI分析正常")
+        print(f"  - 文本块数: {len(chunks)}")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
 def test_solution_generator():
     """测试方案生成模块"""
     print("\n=== 测试方案生成模块 ===")
@@ -89,6 +671,53 @@ def test_solution_generator():
         print(f"✗ 模块测试失败: {e}")
         return False
 
+def test_solution_knowledge():
+    """测试方案知识库"""
+    print("\n=== 测试方案知识库 ===")
+    try:
+        import time
+        from modules.solution_generator import SolutionGenerator
+        from modules.solution_knowledge import SolutionKnowledge, get_solution_knowledge
+        
+        if get_solution_knowledge() is not get_solution_knowledge():
+            print("✗ 知识库未在进程内共享")
+            return False
+        
+        generator = SolutionGenerator()
+        requirements = [{'description': '建设大数据平台，支持Spark数据分析'}, {'description': '部署IoT传感器'}]
+        found = generator._find_keywords(requirements)
+        matched = generator._match_solutions(found)
+        if [(m['solution_name'], m['matched_keywords']) for m in matched] != [
+                ('大数据方案', ['大数据', '数据分析', 'Spark']), ('物联网方案', ['IoT', '传感器'])]:
+            print(f"✗ 方案匹配错误: {matched}")
+            return False
+        if generator._determine_solution_type(found) != '大数据解决方案':
+            print(f"✗ 方案类型错误: {generator._determine_solution_type(found)}")
+            return False
+        if generator._determine_solution_type(generator._find_keywords([{'description': '办公系统'}])) != '信息化系统解决方案':
+            print("✗ 默认方案类型错误")
+            return False
+        
+        # 模板数量增加到数百个时仍只扫描一次需求文本
+        templates = {f'方案{i}': {'keywords': [f'关键词{i}甲', f'关键词{i}乙'],
+                                  'template': {'architecture': [], 'advantages': [], 'implementation': []}}
+                     for i in range(500)}
+        knowledge = SolutionKnowledge({'solution_templates': templates})
+        text = '，'.join(f'需求关键词{i}甲' for i in range(0, 500, 7)) * 20
+        start = time.time()
+        hits = knowledge.template_hits(knowledge.find_keywords(text))
+        elapsed = time.time() - start
+        if [hit['name'] for hit in hits] != [f'方案{i}' for i in range(0, 500, 7)]:
+            print("✗ 大量模板匹配错误")
+            return False
+        
+        print("✓ 方案知识库正常")
+        print(f"  - 500个模板匹配耗时: {elapsed * 1000:.1f}毫秒")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
 def test_supplier_finder():
     """测试供应商查找模块"""
     print("\n=== 测试供应商查找模块 ===")
@@ -118,6 +747,745 @@ def test_supplier_finder():
         print(f"✗ 模块测试失败: {e}")
         return False
 
+def test_supplier_enrichment():
+    """测试供应商信息并发补充（本地模拟服务）"""
+    print("\n=== 测试供应商信息补充 ===")
+    try:
+        import threading
+        import time
+        import requests
+        from concurrent.futures import ThreadPoolExecutor
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from modules.supplier_enrichment import SupplierEnricher
+        
+        class StubHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                # /slow 0.2秒后返回，/hang 超过查询超时，/fail 返回500
+                if self.path.startswith('/slow'):
+                    time.sleep(0.2)
+                elif self.path.startswith('/hang'):
+                    time.sleep(1.5)
+                status = 500 if self.path.startswith('/fail') else 200
+                body = self.path.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        
+        def lookup(path):
+            def fetch(company_name):
+                response = requests.get(f'{base_url}/{path}?name={company_name}', timeout=5)
+                response.raise_for_status()
+                return response.text
+            return fetch
+        
+        executor = ThreadPoolExecutor(max_workers=16)
+        try:
+            enricher = SupplierEnricher(
+                lookups={'contact_info': lookup('slow'), 'business_scope': lookup('slow'),
+                         'credit_rating': lookup('fail'), 'certifications': lookup('hang')},
+                defaults={'credit_rating': '未知', 'certifications': []},
+                timeout=0.6,
+                executor=executor
+            )
+            started = time.monotonic()
+            suppliers = enricher.enrich([{'name': f'公司{i}'} for i in range(3)])
+            elapsed = time.monotonic() - started
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            server.shutdown()
+        
+        # 12项查询并发执行，耗时约为单项超时而不是各项之和
+        if elapsed > 1.2:
+            print(f"✗ 查询未并发执行，耗时 {elapsed:.2f} 秒")
+            return False
+        
+        supplier = suppliers[1]
+        if not supplier['contact_info'].startswith('/slow') or supplier['credit_rating'] != '未知' \
+                or supplier['certifications'] != [] \
+                or set(supplier['enrichment_errors']) != {'credit_rating', 'certifications'}:
+            print(f"✗ 部分结果处理错误: {supplier}")
+            return False
+        
+        # 超时从查询开始执行时计算，在线程池中排队的时间不计入
+        def slow_lookup(company_name):
+            time.sleep(0.2)
+            return company_name
+        
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            queued = SupplierEnricher(lookups={'contact_info': slow_lookup, 'business_scope': slow_lookup},
+                                      timeout=0.3, executor=executor).enrich([{'name': '公司'}])[0]
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if 'enrichment_errors' in queued or queued['business_scope'] != '公司':
+            print(f"✗ 排队时间计入了查询超时: {queued}")
+            return False
+        
+        # 卡住的查询占满线程池时，排队的查询取消，整次补充不超过两倍超时时间
+        release = threading.Event()
+        
+        def blocking_lookup(company_name):
+            release.wait(5)
+            return company_name
+        
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            started = time.monotonic()
+            blocked = SupplierEnricher(lookups={'contact_info': blocking_lookup, 'credit_rating': blocking_lookup},
+                                       defaults={'credit_rating': '未知'}, timeout=0.3,
+                                       executor=executor).enrich([{'name': f'公司{i}'} for i in range(3)])
+            elapsed_blocked = time.monotonic() - started
+        finally:
+            release.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+        if elapsed_blocked > 0.7 or any(set(supplier['enrichment_errors']) != {'contact_info', 'credit_rating'}
+                                        for supplier in blocked) or blocked[2]['credit_rating'] != '未知':
+            print(f"✗ 线程池占满时补充未按时返回: {elapsed_blocked:.2f} 秒 {blocked}")
+            return False
+        
+        print(f"✓ 供应商信息补充正常（耗时 {elapsed:.2f} 秒）")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_supplier_profile_cache():
+    """测试供应商档案缓存"""
+    print("\n=== 测试供应商档案缓存 ===")
+    try:
+        import tempfile
+        from modules.supplier_profile_cache import SupplierProfileCache
+        
+        calls = []
+        
+        def lookup(company_name):
+            calls.append(company_name)
+            return f'AAA-{len(calls)}'
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = SupplierProfileCache(path=os.path.join(cache_dir, 'profiles.db'),
+                                         ttl_hours={'credit_rating': 1}, max_stale_factor=4)
+            first = cache.fetch('浪潮电子信息产业股份有限公司', 'credit_rating', lookup)
+            # 名称规范化后命中同一条缓存
+            second = cache.fetch(' 浪潮电子信息产业股份有限公司', 'credit_rating', lookup)
+            if first != second or len(calls) != 1:
+                print("✗ 缓存未命中")
+                return False
+            
+            # 过期后先返回旧值，后台刷新
+            cache._conn.execute('UPDATE supplier_profiles SET fetched_at = fetched_at - 7200')
+            stale = cache.fetch('浪潮电子信息产业股份有限公司', 'credit_rating', lookup)
+            cache.wait_for_refreshes()
+            refreshed = cache.fetch('浪潮电子信息产业股份有限公司', 'credit_rating', lookup)
+            if stale != 'AAA-1' or refreshed != 'AAA-2':
+                print(f"✗ 后台刷新错误: {stale}, {refreshed}")
+                return False
+        
+        print("✓ 供应商档案缓存正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_supplier_index():
+    """测试供应商检索索引"""
+    print("\n=== 测试供应商检索索引 ===")
+    try:
+        import tempfile
+        from modules.supplier_index import SupplierIndex, load_catalogue
+        
+        with tempfile.TemporaryDirectory() as index_dir:
+            index = SupplierIndex(index_dir, flush_threshold=8, max_segments=2)
+            for supplier in load_catalogue():
+                index.add(supplier)
+            index.flush()
+            
+            top = index.search('防火墙 网络安全', top_k=3)
+            if len(top) != 3 or '防火' not in top[0]['matched_terms']:
+                print(f"✗ 检索结果错误: {top}")
+                return False
+            
+            # 增量更新后重新打开索引，更新仍然有效
+            index.add({'name': '华为技术有限公司', 'product_lines': ['量子计算机']})
+            index.close()
+            index = SupplierIndex(index_dir)
+            results = index.search('量子计算机', top_k=5)
+            if len(index) != len(load_catalogue()) or results[0]['supplier'].get('product_lines') != ['量子计算机']:
+                print("✗ 增量更新失败")
+                return False
+            index.compact()
+            
+            # 检索未命中时使用的网络搜索结果不写入目录，已有的目录信息保持不变
+            from modules.supplier_finder import SupplierFinder
+            finder = SupplierFinder()
+            finder.index = index
+            before = index.get('浪潮电子信息产业股份有限公司')
+            if not finder._search_suppliers(['不存在的关键词甲乙丙']):
+                print("✗ 未命中时没有返回网络搜索结果")
+                return False
+            if index.get('浪潮电子信息产业股份有限公司') != before or len(index) != len(load_catalogue()):
+                print("✗ 网络搜索结果覆盖了目录信息")
+                return False
+            index.close()
+        
+        # 供应商目录文件修改后重新导入，未修改时不重复导入
+        import json
+        with tempfile.TemporaryDirectory() as index_dir:
+            catalogue = load_catalogue()
+            catalogue_path = os.path.join(index_dir, 'catalogue.json')
+            with open(catalogue_path, 'w', encoding='utf-8') as f:
+                json.dump(catalogue, f, ensure_ascii=False)
+            index = SupplierIndex(os.path.join(index_dir, 'index'))
+            if not index.sync_catalogue(catalogue_path) or index.sync_catalogue(catalogue_path):
+                print("✗ 目录导入判断错误")
+                return False
+            index.close()
+            
+            edited = [dict(catalogue[0], description='目录更新后的介绍')] + catalogue[2:]
+            with open(catalogue_path, 'w', encoding='utf-8') as f:
+                json.dump(edited, f, ensure_ascii=False)
+            index = SupplierIndex(os.path.join(index_dir, 'index'))
+            if not index.sync_catalogue(catalogue_path):
+                print("✗ 目录修改后未重新导入")
+                return False
+            index.close()
+            index = SupplierIndex(os.path.join(index_dir, 'index'))
+            if index.sync_catalogue(catalogue_path) or len(index) != len(edited) or \
+                    index.get(catalogue[0]['name'])['description'] != '目录更新后的介绍' or \
+                    index.get(catalogue[1]['name']) is not None:
+                print("✗ 重新导入后目录内容不一致")
+                return False
+            index.close()
+        
+        print("✓ 供应商检索索引正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_supplier_ranking():
+    """测试供应商评分"""
+    print("\n=== 测试供应商评分 ===")
+    try:
+        from modules.supplier_ranking import SupplierRanker
+        
+        suppliers = [
+            {'name': 'A', 'credit_rating': 'AA', 'past_projects': [1], 'certifications': [], 'matched_keywords': ['x']},
+            {'name': 'B', 'credit_rating': 'AAA', 'past_projects': [1, 2, 3, 4], 'certifications': [1, 2, 3],
+             'matched_keywords': []},
+            {'name': 'C', 'credit_rating': 'A+', 'past_projects': [], 'certifications': [1, 2, 3, 4, 5, 6],
+             'matched_keywords': ['x', 'y']},
+            {'name': 'D', 'credit_rating': 'AA', 'past_projects': [1], 'certifications': [], 'matched_keywords': ['x']}
+        ]
+        ranker = SupplierRanker(category_weights={'云计算': {'credit': 0, 'projects': 0, 'keywords': 80}})
+        
+        # 默认权重与原有的30/30/20/20评分一致，同分保持原顺序
+        ranked = ranker.rank([dict(s) for s in suppliers])
+        if [(s['name'], s['total_score']) for s in ranked] != [('B', 72), ('C', 55), ('A', 40), ('D', 40)]:
+            print(f"✗ 评分结果错误: {[(s['name'], s['total_score']) for s in ranked]}")
+            return False
+        if ranked[0]['scoring_detail'] != {'credit_score': 30, 'project_score': 30, 'cert_score': 12, 'keyword_score': 0}:
+            print(f"✗ 评分明细错误: {ranked[0]['scoring_detail']}")
+            return False
+        
+        # 只取前2名；按招标类别使用不同权重
+        top = ranker.rank([dict(s) for s in suppliers], category='云计算解决方案', top_k=2)
+        if [s['name'] for s in top] != ['C', 'A']:
+            print(f"✗ 类别权重未生效: {[s['name'] for s in top]}")
+            return False
+        
+        print("✓ 供应商评分正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_job_queue():
+    """测试异步任务队列"""
+    print("\n=== 测试异步任务队列 ===")
+    try:
+        import tempfile
+        import time
+        from modules.job_queue import JobQueue
+        
+        with tempfile.TemporaryDirectory() as result_dir:
+            queue = JobQueue(max_workers=2, result_dir=result_dir)
+            queue.register('echo', lambda payload, progress: {'echo': payload['value']})
+            
+            job = queue.submit('echo', {'value': 42})
+            for _ in range(50):
+                if queue.get(job['id'])['status'] == 'succeeded':
+                    break
+                time.sleep(0.02)
+            queue.shutdown()
+            
+            # 结果已持久化，新实例也能读取
+            result = JobQueue(result_dir=result_dir).get_result(job['id'])
+            if result != {'echo': 42}:
+                print(f"✗ 任务结果错误: {result}")
+                return False
+            
+            # 结果无法保存时任务标记为失败，不残留临时文件，排队计数恢复
+            finished_id = job['id']
+            queue = JobQueue(max_workers=1, result_dir=result_dir)
+            queue.register('broken', lambda payload, progress: {'value': object()})
+            job = queue.submit('broken', {})
+            queue.shutdown()
+            status = queue.get(job['id'])
+            if status['status'] != 'failed' or '保存失败' not in status['error'] or queue._pending != 0 or \
+                    any(name.endswith('.tmp') for name in os.listdir(result_dir)):
+                print(f"✗ 结果保存失败处理错误: {status}")
+                return False
+            
+            # 提交时状态写入失败，任务不进入队列，名额释放
+            queue = JobQueue(max_workers=1, max_pending=1, result_dir=result_dir)
+            queue.register('echo', lambda payload, progress: payload)
+            persist = queue._persist
+            
+            def failing_persist(job, result=None):
+                raise OSError('磁盘已满')
+            
+            queue._persist = failing_persist
+            for _ in range(2):
+                try:
+                    queue.submit('echo', {})
+                    print("✗ 状态写入失败未抛出")
+                    return False
+                except OSError:
+                    pass
+            queue._persist = persist
+            if queue._pending != 0 or queue._jobs:
+                print(f"✗ 提交失败后名额未释放: {queue._pending}")
+                return False
+            queue.submit('echo', {})
+            queue.shutdown()
+            
+            # 超过保留天数的任务文件在启动时清理
+            expired_path = os.path.join(result_dir, f"{job['id']}.json")
+            os.utime(expired_path, (time.time() - 8 * 86400,) * 2)
+            JobQueue(result_dir=result_dir, retention_days=7)
+            if os.path.exists(expired_path) or not os.path.exists(os.path.join(result_dir, f'{finished_id}.json')):
+                print("✗ 过期任务文件未清理")
+                return False
+        
+        print("✓ 异步任务队列正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_upload_storage():
+    """测试上传文件存储"""
+    print("\n=== 测试上传文件存储 ===")
+    try:
+        import hashlib
+        import io
+        import os
+        import tempfile
+        from modules.upload_storage import UploadStore
+        
+        with tempfile.TemporaryDirectory() as root:
+            store = UploadStore(root)
+            content = '技术要求：服务器配置\n'.encode('utf-8') * 1000
+            
+            first = store.save(io.BytesIO(content), '标书.txt')
+            second = store.save(io.BytesIO(content), '标书（副本）.TXT')
+            if first['file_hash'] != hashlib.sha256(content).hexdigest() or first['deduplicated']:
+                print(f"✗ 保存结果错误: {first}")
+                return False
+            
+            # 相同内容只保存一份，临时文件已清理
+            if not second['deduplicated'] or second['file_path'] != first['file_path'] or os.listdir(store.tmp_dir):
+                print(f"✗ 去重失败: {second}")
+                return False
+            with open(first['file_path'], 'rb') as f:
+                if f.read() != content:
+                    print("✗ 保存内容错误")
+                    return False
+            
+            temp = store.create_temp()
+            temp.write(b'partial')
+            store.discard(temp)
+            if os.listdir(store.tmp_dir):
+                print("✗ 临时文件未删除")
+                return False
+        
+        print("✓ 上传文件存储正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_storage():
+    """测试数据存储"""
+    print("\n=== 测试数据存储 ===")
+    try:
+        import tempfile
+        from modules.storage import BidStorage
+        
+        with tempfile.TemporaryDirectory() as data_dir:
+            db_path = os.path.join(data_dir, 'bidspeed.db')
+            storage = BidStorage(db_path)
+            document_id = storage.save_document('abc', '标书.txt', 'txt', 'uploads/1.txt', '标书内容')
+            # 相同内容的文档只保存一次
+            if storage.save_document('abc', '副本.txt', 'txt', 'uploads/2.txt', '标书内容') != document_id:
+                print("✗ 文档去重失败")
+                return False
+            upload_id = storage.save_upload('abc', '副本.txt', 'uploads/blobs/ab/abc.txt', 12)
+            if storage.get_upload(upload_id)['original_name'] != '副本.txt':
+                print("✗ 上传记录读取失败")
+                return False
+            
+            analysis_id = storage.save_analysis(document_id, {'success': True, 'scoring_rules': []},
+                                                section_index={'version': 1, 'blocks': []})
+            solution_id = storage.save_solution(analysis_id, {'success': True})
+            
+            # 重新打开数据库后仍可按ID读取
+            storage = BidStorage(db_path)
+            analysis = storage.get_latest_analysis(document_id)
+            if analysis['analysis_id'] != analysis_id or storage.get_solution(solution_id)['analysis_id'] != analysis_id:
+                print("✗ 读取保存的结果失败")
+                return False
+            if storage.get_document_text(document_id) != '标书内容':
+                print("✗ 读取文档文本失败")
+                return False
+            if storage.get_analysis_index(analysis_id) != {'version': 1, 'blocks': []} or \
+                    'section_index' in analysis:
+                print("✗ 段落索引读取失败")
+                return False
+            
+            # 过期清理：解析结果过期后，文档及其文本一并删除；期间再次上传过的文档保留
+            reuploaded_id = storage.save_document('def', '再次上传.txt', 'txt', 'uploads/3.txt', '标书内容')
+            storage.save_upload('def', '再次上传.txt', 'uploads/3.txt', 12)
+            conn = storage._connect()
+            with conn:
+                for table in ('documents', 'analyses', 'solutions'):
+                    conn.execute(f"UPDATE {table} SET created_at = '2000-01-01T00:00:00'")
+                conn.execute("UPDATE uploads SET uploaded_at = '2000-01-01T00:00:00' WHERE file_hash = 'abc'")
+            storage.purge_expired()
+            if storage.get_document(document_id) is not None or storage.get_document_text(document_id) is not None:
+                print("✗ 过期文档未清理")
+                return False
+            if storage.get_document(reuploaded_id) is None:
+                print("✗ 近期上传的文档被清理")
+                return False
+        
+        print("✓ 数据存储正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_result_cache():
+    """测试结果缓存的淘汰与过期"""
+    print("\n=== 测试结果缓存 ===")
+    try:
+        import tempfile
+        import time
+        from modules.config_loader import get_config
+        from modules.storage import BidStorage, ResultCache
+        
+        db_config = get_config('database')
+        if 'result_cache_entries' not in db_config or 'result_cache_ttl_minutes' not in db_config:
+            print("✗ 缺少结果缓存配置")
+            return False
+        
+        # 按条目数LRU淘汰：最近读取过的条目保留
+        cache = ResultCache(max_entries=2, ttl_seconds=60)
+        cache.put(0, {'id': 0})
+        cache.put(1, {'id': 1})
+        cache.get(0)
+        cache.put(2, {'id': 2})
+        if cache.get(1) is not None or cache.get(0) != {'id': 0} or cache.get(2) != {'id': 2}:
+            print("✗ 结果缓存淘汰失败")
+            return False
+        
+        # 条目数为0时不缓存
+        disabled = ResultCache(max_entries=0)
+        disabled.put(0, {'id': 0})
+        if disabled.get(0) is not None:
+            print("✗ 关闭的结果缓存仍然写入")
+            return False
+        
+        # 超过有效期的条目失效
+        expiring = ResultCache(max_entries=4, ttl_seconds=0.05)
+        expiring.put('a', {'id': 'a'})
+        if expiring.get('a') != {'id': 'a'}:
+            print("✗ 有效期内的条目读取失败")
+            return False
+        time.sleep(0.1)
+        if expiring.get('a') is not None:
+            print("✗ 过期条目仍然返回")
+            return False
+        
+        # 缓存过期或被淘汰后，按ID读取回落到数据库
+        with tempfile.TemporaryDirectory() as data_dir:
+            storage = BidStorage(os.path.join(data_dir, 'bidspeed.db'), cache_entries=1, cache_ttl_seconds=0.05)
+            document_id = storage.save_document('abc', '标书.txt', 'txt', 'uploads/1.txt', '标书内容')
+            first_id = storage.save_analysis(document_id, {'success': True, 'project_name': '一'})
+            second_id = storage.save_analysis(document_id, {'success': True, 'project_name': '二'})
+            if storage.get_analysis(first_id)['project_name'] != '一':
+                print("✗ 淘汰后读取解析结果失败")
+                return False
+            time.sleep(0.1)
+            if storage.get_analysis(second_id)['project_name'] != '二':
+                print("✗ 过期后读取解析结果失败")
+                return False
+        
+        print("✓ 结果缓存正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_near_duplicate():
+    """测试近似重复标书检测"""
+    print("\n=== 测试近似重复标书检测 ===")
+    try:
+        import tempfile
+        import time
+        import numpy as np
+        from modules.near_duplicate import NearDuplicateIndex, find_similar_document
+        from modules.storage import BidStorage
+        
+        with open('test_data/sample_bid.txt', 'r', encoding='utf-8') as f:
+            text = f.read()
+        near_copy = text.replace('1. 技术方案（40分）', '1. 技术方案（45分）') + '\n补充条款：质保期五年'
+        unrelated = '采购办公桌椅一批，交货期三十天，质保一年，送货上门安装。' * 5
+        
+        with tempfile.TemporaryDirectory() as data_dir:
+            db_path = os.path.join(data_dir, 'bidspeed.db')
+            storage = BidStorage(db_path)
+            index = NearDuplicateIndex(db_path)
+            
+            original_id = storage.save_document('h1', '原标书.txt', '.txt', 'uploads/1.txt', text)
+            if find_similar_document(storage, index, original_id, text) is not None:
+                print("✗ 空索引返回了相似标书")
+                return False
+            analysis_id = storage.save_analysis(original_id, {'success': True})
+            solution_id = storage.save_solution(analysis_id, {'success': True})
+            
+            # 近似副本返回原标书的解析结果和技术方案；无关标书不返回
+            copy_id = storage.save_document('h2', '重新招标.txt', '.txt', 'uploads/2.txt', near_copy)
+            similar = find_similar_document(storage, index, copy_id, near_copy)
+            if not similar or similar['document_id'] != original_id or similar['analysis_id'] != analysis_id \
+                    or similar['solution_id'] != solution_id or similar['similarity'] < 0.8:
+                print(f"✗ 未识别近似重复标书: {similar}")
+                return False
+            other_id = storage.save_document('h3', '办公家具.txt', '.txt', 'uploads/3.txt', unrelated)
+            if find_similar_document(storage, index, other_id, unrelated) is not None:
+                print("✗ 无关标书被识别为近似重复")
+                return False
+            
+            # 文档被清理后，其签名和band一并删除
+            storage._connect().execute('DELETE FROM documents WHERE id = ?', (other_id,))
+            storage._connect().commit()
+            if index.purge_orphans() != 1 or index.query(index.signature(unrelated)):
+                print("✗ 已删除文档的签名未清理")
+                return False
+            
+            # 索引中有大量签名时单次查找的耗时
+            rng = np.random.default_rng(0)
+            for document_id in range(100, 3100):
+                index.add(document_id, rng.integers(0, 2 ** 32, 128, dtype=np.uint64).astype(np.uint32))
+            signature = index.signature(near_copy)
+            start = time.perf_counter()
+            for _ in range(100):
+                matches = index.query(signature, exclude_id=copy_id)
+            elapsed = (time.perf_counter() - start) / 100
+            if [match['document_id'] for match in matches] != [original_id]:
+                print(f"✗ 查找结果错误: {matches}")
+                return False
+        
+        print("✓ 近似重复标书检测正常")
+        print(f"  - 相似度: {similar['similarity']}")
+        print(f"  - 3000份签名中单次查找耗时: {elapsed * 1000:.3f}毫秒")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_batch_processor():
+    """测试批量解析"""
+    print("\n=== 测试批量解析 ===")
+    try:
+        import os
+        import tempfile
+        import zipfile
+        from openpyxl import load_workbook
+        from modules.batch_processor import collect_batch_files, run_batch
+        from modules.storage import BidStorage
+        
+        with tempfile.TemporaryDirectory() as work_dir:
+            source = os.path.join(work_dir, 'tenders')
+            os.makedirs(os.path.join(source, '二标段'))
+            with open(os.path.join(source, '一标段.txt'), 'w', encoding='utf-8') as f:
+                f.write("项目概况\n技术要求\n服务器配置：双路CPU\n技术方案（20分）\n")
+            with open(os.path.join(source, '二标段', '损坏.pdf'), 'w') as f:
+                f.write('not a pdf')
+            
+            storage = BidStorage(os.path.join(work_dir, 'bidspeed.db'))
+            summary_path = os.path.join(work_dir, 'summary.xlsx')
+            records = list(run_batch(source, storage=storage, workers=1, summary_path=summary_path))
+            documents = {record['file']: record for record in records if record['type'] == 'document'}
+            if not documents['一标段.txt']['success'] or documents[os.path.join('二标段', '损坏.pdf')]['success']:
+                print(f"✗ 批量解析结果错误: {records}")
+                return False
+            if storage.get_analysis(documents['一标段.txt']['analysis_id']) is None:
+                print("✗ 解析结果未入库")
+                return False
+            
+            # 汇总表逐份记录结果；再次解析时复用已入库的结果
+            sheet = load_workbook(summary_path).active
+            if sheet.max_row != 3:
+                print("✗ 汇总表行数错误")
+                return False
+            error_column = next(cell.column_letter for cell in sheet[1] if cell.value == '错误信息')
+            if sheet.column_dimensions[error_column].width != 40:
+                print("✗ 错误信息列宽设置错误")
+                return False
+            records = list(run_batch(source, storage=storage, workers=1, summary_path=summary_path))
+            if records[-1]['reused'] != 1:
+                print(f"✗ 未复用已有结果: {records[-1]}")
+                return False
+            
+            # 压缩包中指向解压目录之外的条目被拒绝
+            archive_path = os.path.join(work_dir, 'evil.zip')
+            with zipfile.ZipFile(archive_path, 'w') as archive:
+                archive.writestr('../evil.txt', 'x')
+            try:
+                collect_batch_files(archive_path, os.path.join(work_dir, 'extract'))
+                print("✗ 未拒绝非法路径")
+                return False
+            except ValueError:
+                pass
+            
+            # 接口传入的服务器路径只允许在批量解析目录之内
+            from modules.batch_processor import resolve_server_path
+            if resolve_server_path('tenders', work_dir) != os.path.realpath(source) or \
+                    resolve_server_path(source, work_dir) != os.path.realpath(source):
+                print("✗ 批量解析目录内的路径被拒绝")
+                return False
+            for path, root in [('../', source), ('/etc', work_dir), ('tenders', None), ('missing', work_dir)]:
+                try:
+                    resolve_server_path(path, root)
+                    print(f"✗ 未拒绝路径: {path}")
+                    return False
+                except ValueError:
+                    pass
+            
+            # 只解压支持的文件类型
+            archive_path = os.path.join(work_dir, 'tenders.zip')
+            with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr('一标段.txt', '技术要求')
+                archive.writestr('二标段.txt', '技术要求')
+                archive.writestr('setup.exe', 'x')
+                archive.writestr('__MACOSX/._一标段.txt', 'x')
+            files, root = collect_batch_files(archive_path, os.path.join(work_dir, 'unzipped'))
+            if [os.path.relpath(path, root) for path in files] != ['一标段.txt', '二标段.txt'] or \
+                    sorted(os.listdir(root)) != ['一标段.txt', '二标段.txt']:
+                print(f"✗ 压缩包文件筛选错误: {os.listdir(root)}")
+                return False
+            
+            # 文件数或解压后总大小超过上限时，写入任何文件之前拒绝
+            from modules.batch_processor import _extract_zip
+            with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr('一标段.txt', '0' * 4096)
+                archive.writestr('二标段.txt', '0' * 4096)
+            for max_files, max_bytes in [(1, 1024 * 1024), (10, 6000)]:
+                extract_dir = os.path.join(work_dir, f'limited_{max_files}')
+                try:
+                    _extract_zip(archive_path, extract_dir, max_files, max_bytes)
+                    print("✗ 未拒绝超出上限的压缩包")
+                    return False
+                except ValueError:
+                    pass
+                if os.path.exists(extract_dir) and os.listdir(extract_dir):
+                    print("✗ 拒绝前已写入文件")
+                    return False
+        
+        print("✓ 批量解析正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_benchmark_corpus():
+    """测试基准测试语料生成"""
+    print("\n=== 测试基准测试语料 ===")
+    try:
+        import tempfile
+        from benchmarks.corpus import generate_corpus, generate_lines
+        from modules.document_processor import extract_text
+        
+        lines = generate_lines(300, seed=1)
+        if lines != generate_lines(300, seed=1) or len(lines) != 300:
+            print("✗ 语料生成结果不稳定")
+            return False
+        
+        expected = [line.strip() for line in lines if line.strip()]
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            for entry in generate_corpus(corpus_dir, [300], seed=1):
+                extracted = [line.strip() for line in extract_text(entry['path']).split('\n') if line.strip()]
+                if extracted != expected:
+                    print(f"✗ {entry['format']} 语料提取内容不一致")
+                    return False
+        
+        print("✓ 基准测试语料正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
+def test_instrumentation():
+    """测试性能埋点"""
+    print("\n=== 测试性能埋点 ===")
+    try:
+        from modules.instrumentation import metrics, record_cache, stage, trace
+        
+        with trace() as current:
+            with stage('test.stage'):
+                record_cache('test', True)
+        
+        if 'test.stage' not in current.to_dict()['stages_ms'] or current.counts.get('cache.test.hit') != 1:
+            print(f"✗ 请求内埋点记录错误: {current.to_dict()}")
+            return False
+        
+        # 线程池中执行的阶段计入提交任务的请求
+        from concurrent.futures import ThreadPoolExecutor
+        from modules.instrumentation import submit
+        
+        def worker_stage():
+            with stage('test.worker'):
+                record_cache('test', False)
+        
+        with ThreadPoolExecutor(max_workers=2) as executor, trace() as current:
+            for future in [submit(executor, worker_stage) for _ in range(4)]:
+                future.result()
+        if 'test.worker' not in current.timings or current.counts.get('cache.test.miss') != 4:
+            print(f"✗ 线程池中的埋点未计入请求: {current.to_dict()}")
+            return False
+        
+        output = metrics.render()
+        if 'bidspeed_stage_duration_seconds_count{stage="test.stage"}' not in output:
+            print("✗ 指标输出缺少阶段耗时")
+            return False
+        
+        print("✓ 性能埋点正常")
+        return True
+    except Exception as e:
+        print(f"✗ 模块测试失败: {e}")
+        return False
+
 def main():
     """主测试函数"""
     print("\n" + "="*50)
@@ -128,9 +1496,34 @@ def main():
     
     # 测试各个模块
     results.append(("文档处理", test_document_processor()))
+    results.append(("逐页提取", test_document_pages()))
+    results.append(("PDF并行提取", test_pdf_parallel()))
+    results.append(("DOCX流式解析", test_docx_streaming()))
+    results.append(("TXT编码识别", test_txt_encoding()))
+    results.append(("扫描页OCR", test_pdf_ocr()))
+    results.append(("提取缓存", test_extraction_cache()))
+    results.append(("关键词匹配", test_keyword_matcher()))
     results.append(("标书解析", test_bid_analyzer()))
+    results.append(("评分细则匹配", test_rule_index()))
+    results.append(("大模型客户端", test_llm_client()))
+    results.append(("响应缓存", test_llm_cache()))
+    results.append(("分块分析", test_chunked_analysis()))
+    results.append(("修订版增量解析", test_amendment_analysis()))
     results.append(("方案生成", test_solution_generator()))
+    results.append(("方案知识库", test_solution_knowledge()))
     results.append(("供应商查找", test_supplier_finder()))
+    results.append(("供应商信息补充", test_supplier_enrichment()))
+    results.append(("供应商档案缓存", test_supplier_profile_cache()))
+    results.append(("供应商检索索引", test_supplier_index()))
+    results.append(("供应商评分", test_supplier_ranking()))
+    results.append(("异步任务", test_job_queue()))
+    results.append(("上传文件存储", test_upload_storage()))
+    results.append(("数据存储", test_storage()))
+    results.append(("结果缓存", test_result_cache()))
+    results.append(("近似重复检测", test_near_duplicate()))
+    results.append(("批量解析", test_batch_processor()))
+    results.append(("基准测试语料", test_benchmark_corpus()))
+    results.append(("性能埋点", test_instrumentation()))
     
     # 输出测试总结
     print("\n" + "="*50)